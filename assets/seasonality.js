@@ -0,0 +1,34 @@
+// Seasonality page: redraws the graph from the review cube kept in the browser, so toggling the MinMax
+// normalization needs no server round trip.
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    seasonality: {
+        draw: function (data, normalize) {
+            if (!data) {
+                return window.dash_clientside.no_update;
+            }
+            const figure = JSON.parse(JSON.stringify(data.figure));
+            if (!normalize || normalize.length === 0 || !data.cube) {
+                return figure;
+            }
+
+            figure.data.forEach(function (trace, i) {
+                // review counts per month summed over the selected years, then scaled to [0, 1] per city
+                const sums = Array.from({length: 12}, function (_, month) {
+                    return data.cube[i].reduce(function (total, year) {
+                        return total + (year[month] === null ? 0 : year[month]);
+                    }, 0);
+                });
+                const lo = Math.min.apply(null, sums);
+                const hi = Math.max.apply(null, sums);
+                trace.y = sums.map(function (value) {
+                    return hi > lo ? (value - lo) / (hi - lo) : null;
+                });
+            });
+            figure.layout.title = Object.assign({}, figure.layout.title,
+                                                {text: "Seasonality Trends Over Time (Normalized)"});
+            figure.layout.yaxis = Object.assign({}, figure.layout.yaxis,
+                                                {title: {text: "Reviewed Listings [arb.]"}, tickformat: "%.0f"});
+            return figure;
+        }
+    }
+});
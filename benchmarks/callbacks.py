@@ -0,0 +1,219 @@
+# ======================================================================================================================
+# import standard library packages
+# ----------------------------------------------------------------------------------------------------------------------
+import os
+import sys
+import json
+import time
+import statistics
+from pathlib import Path
+from argparse import ArgumentParser
+from configparser import ConfigParser
+
+ROOT = Path(os.path.dirname(os.path.abspath(__file__))).parent
+sys.path.insert(0, str(ROOT))
+
+# ======================================================================================================================
+# import local packages
+# ----------------------------------------------------------------------------------------------------------------------
+from benchmarks.synthetic import add_generator_args, ensure_data, generator_from_args
+
+
+DATA_DIR = ROOT/".cache"/"benchmarks"/"data"
+BASELINE = ROOT/"benchmarks"/"baselines"/"callbacks.json"
+PHASES = ["query", "shaping", "figure", "serialize", "total"]
+
+# selections timed on top of the [warmup] defaults: the finest granularity and a wider city selection
+EXTRA_CASES = {
+    "hosts.update_graph": [[["London", "Paris", "Brooklyn", "Rome"], "day"]],
+    "reviews.update_review_trend": [[["London", "Paris", "Brooklyn", "Rome"], "day"]],
+    "seasonality.update_cube": [[["London", "Paris", "Brooklyn", "Rome"], list(range(2015, 2025))]],
+    "popularity.update_popularity_graph": [[1, "day", "London", 15]],
+}
+
+
+def write_config(path, data_dir, rollups, isolated=True):
+    """Point the app at the synthetic snapshot, with every cache and background work off when ``isolated``.
+
+    Isolated runs measure the real work of each callback, otherwise the app keeps its configuration and only the
+    caches it writes to disk move next to the data.
+    """
+    cfg = ConfigParser()
+    cfg.read_dict({
+        "database": {"backend": "duckdb"},
+        "snapshot": {"dir": str(data_dir)},
+        "cache": {"disk_dir": str(data_dir/"cache")},
+        "rollups": {"enabled": str(rollups).lower(), "dir": str(data_dir/"rollups")},
+    })
+    if isolated:
+        cfg.read_dict({
+            "cache": {"enabled": "false", "disk_enabled": "false", "figures_enabled": "false"},
+            "warmup": {"enabled": "false"},
+            "background": {"enabled": "false"},
+        })
+    with open(path, "w") as f:
+        cfg.write(f)
+    return path
+
+
+# -- phases ------------------------------------------------------------------------------------------------------------
+class _FigureClock:
+    """Stands in for a page's ``px`` or ``go`` module and notes when the page first calls into plotly."""
+
+    def __init__(self, module, started):
+        self._module = module
+        self._started = started
+
+    def __getattr__(self, name):
+        value = getattr(self._module, name)
+        if not callable(value):
+            return value
+
+        def timed(*args, **kwargs):
+            if not self._started:
+                self._started.append(time.perf_counter())
+            return value(*args, **kwargs)
+        return timed
+
+
+def measure(module, callback, args):
+    """Run one callback and split its time into query, shaping, figure construction and serialization.
+
+    Query time is what the callback's queries took, figure time runs from the first plotly call to the return and
+    shaping is the rest; serialization is the JSON encoding Dash does before answering.
+    """
+    from plotly.io.json import to_json_plotly
+    from pages import metrics
+
+    started = []
+    plotly_modules = {name: getattr(module, name) for name in ("px", "go") if hasattr(module, name)}
+    for name, plotly_module in plotly_modules.items():
+        setattr(module, name, _FigureClock(plotly_module, started))
+    token = metrics.start_callback(metrics.callback_label(callback))
+    try:
+        start = time.perf_counter()
+        result = callback(*args)
+        end = time.perf_counter()
+        query = metrics.query_time()
+    finally:
+        for name, plotly_module in plotly_modules.items():
+            setattr(module, name, plotly_module)
+    body = to_json_plotly(result)
+    serialized = time.perf_counter()
+    metrics.finish_callback(token, len(body))
+
+    figure = end - started[0] if started else 0.0
+    return {"query": query, "shaping": max(end - start - query - figure, 0.0), "figure": figure,
+            "serialize": serialized - end, "total": serialized - start, "bytes": len(body)}
+
+
+def get_cases(warmup):
+    cases = [(label, args) for label, args in warmup.selections()]
+    cases += [(label.lower(), args) for label, selections in EXTRA_CASES.items() for args in selections]
+    return cases
+
+
+# -- benchmark ---------------------------------------------------------------------------------------------------------
+def run_benchmark(repeat=5, rollups=False, params=None):
+    import trendbnb
+    from pages.utils import engine
+
+    if rollups:
+        from pages.rollups import build_rollups
+        build_rollups(engine, verbose=False)
+
+    report = {"synthetic": params, "rollups": rollups, "repeat": repeat, "cpus": os.cpu_count(), "cases": {}}
+    for label, args in get_cases(trendbnb.warmup):
+        page, function = label.split(".", 1)
+        module = trendbnb.import_page(trendbnb.warmup.page_names[page])
+        callback = getattr(module, function)
+        case = f"{module.__name__.rsplit('.', 1)[-1]}.{function} {json.dumps(args)}"
+        # the first run pays for imports, Parquet metadata and plotly's validators, none of which recur
+        measure(module, callback, args)
+        runs = [measure(module, callback, args) for _ in range(repeat)]
+        report["cases"][case] = {f"{phase}_ms": round(statistics.median(run[phase] for run in runs) * 1000, 2)
+                                 for phase in PHASES}
+        report["cases"][case]["bytes"] = runs[-1]["bytes"]
+        print(f"{case}: {report['cases'][case]['total_ms']:.1f} ms", file=sys.stderr)
+    return report
+
+
+def compare(report, baseline, tolerance=0.25, min_ms=5.0):
+    """Return one row per case and phase with the baseline's time, the current one and whether it regressed.
+
+    A phase regressed when it takes more than ``tolerance`` longer than in the baseline and at least ``min_ms`` more,
+    so the noise of phases taking a few milliseconds does not count.
+    """
+    rows = []
+    for case, current in report["cases"].items():
+        previous = baseline["cases"].get(case)
+        if previous is None:
+            continue
+        for phase in PHASES:
+            new, old = current[f"{phase}_ms"], previous[f"{phase}_ms"]
+            rows.append({"case": case, "phase": phase, "baseline_ms": old, "current_ms": new,
+                         "ratio": round(new / old, 2) if old else None,
+                         "regressed": new > old * (1 + tolerance) and new - old >= min_ms})
+    return rows
+
+
+def print_report(report, comparison=None):
+    print(f"{len(report['cases'])} cases, median of {report['repeat']} runs, rollups={report['rollups']}, "
+          f"{report['cpus']} CPUs")
+    print(f"\n{'case':<72}" + "".join(f"{phase + ' ms':>14}" for phase in PHASES))
+    for case, timings in report["cases"].items():
+        print(f"{case[:71]:<72}" + "".join(f"{timings[phase + '_ms']:>14.1f}" for phase in PHASES))
+    if comparison:
+        print(f"\n{'compared to baseline':<72}{'phase':>14}{'baseline ms':>14}{'current ms':>14}{'ratio':>14}")
+        for row in comparison:
+            if row["regressed"] or row["phase"] == "total":
+                flag = "  REGRESSED" if row["regressed"] else ""
+                print(f"{row['case'][:71]:<72}{row['phase']:>14}{row['baseline_ms']:>14.1f}{row['current_ms']:>14.1f}"
+                      f"{row['ratio'] or 0:>14.2f}{flag}")
+
+
+def main():
+    parser = ArgumentParser(prog="python -m benchmarks.callbacks",
+                            description="time every page callback on synthetic data, phase by phase")
+    add_generator_args(parser)
+    parser.add_argument("--data", default=str(DATA_DIR), help="where the synthetic snapshot is generated")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--rollups", action="store_true", help="build the rollups and let the pages read them")
+    parser.add_argument("--json", help="write the report to this file")
+    parser.add_argument("--baseline", default=str(BASELINE), help="report to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="slowdown of a phase counted as a regression")
+    parser.add_argument("--check", action="store_true", help="exit with status 1 if any phase regressed")
+    args = parser.parse_args()
+
+    data_dir = Path(args.data).absolute()
+    generator = generator_from_args(args)
+    ensure_data(data_dir, generator)
+    # the app reads its configuration when it is imported, so the override has to be in place before that
+    os.environ["TRENDBNB_CONFIG"] = str(write_config(data_dir/"benchmark.ini", data_dir, args.rollups))
+
+    report = run_benchmark(args.repeat, args.rollups, generator.params())
+    comparison = None
+    baseline_path = Path(args.baseline)
+    if baseline_path.exists() and not args.save_baseline:
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+        if (baseline["synthetic"], baseline["rollups"]) != (report["synthetic"], report["rollups"]):
+            print("the baseline was measured on other data or with other settings, comparing anyway")
+        comparison = compare(report, baseline, args.tolerance)
+        report["regressions"] = [row for row in comparison if row["regressed"]]
+    print_report(report, comparison)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(baseline_path, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.check and report.get("regressions"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# ======================================================================================================================
+# import standard library packages
+# ----------------------------------------------------------------------------------------------------------------------
+import os
+import sys
+import json
+import time
+import statistics
+from pathlib import Path
+from argparse import ArgumentParser
+
+# ======================================================================================================================
+# import non-standard library packages
+# ----------------------------------------------------------------------------------------------------------------------
+import sqlalchemy as sa
+
+ROOT = Path(os.path.dirname(os.path.abspath(__file__))).parent
+sys.path.insert(0, str(ROOT))
+
+# ======================================================================================================================
+# import local packages
+# ----------------------------------------------------------------------------------------------------------------------
+from pages.cache import frame_bytes
+from pages.fetch import DEFAULT_ARRAYSIZE, fetch_frame, read_frame
+
+
+# a page-shaped result: entity, YYYYMM period, integer count and an aggregate that comes back as DECIMAL
+QUERY = """
+    SELECT
+        'City ' || CAST(range % 50 AS VARCHAR) AS City,
+        200000 + CAST(range % 1200 AS INTEGER) AS ReviewDate,
+        CAST(range % 977 AS BIGINT) AS ReviewCount,
+        CAST(range % 10007 AS DECIMAL(18, 4)) / 100 AS AvgReviewScore
+    FROM range(:Rows)
+    """
+DTYPES = {"reviewdate": "int64", "reviewcount": "int64", "avgreviewscore": "float64"}
+
+
+# -- benchmark ---------------------------------------------------------------------------------------------------------
+def run_benchmark(rows=1_000_000, repeat=3, arraysize=DEFAULT_ARRAYSIZE):
+    engine = sa.create_engine("duckdb:///:memory:")
+    methods = {
+        "read_sql": lambda connection: read_frame(connection, sa.text(QUERY), {"Rows": rows}, DTYPES),
+        "typed_batched": lambda connection: fetch_frame(connection, QUERY, {"Rows": rows}, DTYPES, arraysize,
+                                                        arrow=False),
+        "typed_arrow": lambda connection: fetch_frame(connection, QUERY, {"Rows": rows}, DTYPES, arraysize),
+    }
+    report = {"rows": rows, "repeat": repeat, "arraysize": arraysize, "methods": {}}
+    with engine.connect() as connection:
+        for method, fetch in methods.items():
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                df = fetch(connection)
+                timings.append(time.perf_counter() - start)
+            report["methods"][method] = {
+                "seconds": round(statistics.median(timings), 3),
+                "rows": len(df),
+                "mb": round(frame_bytes(df) / 2**20, 1),
+                "dtypes": {column: str(dtype) for column, dtype in df.dtypes.items()},
+            }
+    baseline = report["methods"]["read_sql"]["seconds"]
+    for result in report["methods"].values():
+        result["speedup"] = round(baseline / result["seconds"], 2) if result["seconds"] else None
+    return report
+
+
+def print_report(report):
+    print(f"fetching {report['rows']:,} rows, median of {report['repeat']}, arraysize {report['arraysize']}")
+    print(f"\n{'method':<20}{'seconds':>10}{'speedup':>10}{'MB':>10}  dtypes")
+    for method, result in report["methods"].items():
+        dtypes = ", ".join(f"{column}={dtype}" for column, dtype in result["dtypes"].items())
+        print(f"{method:<20}{result['seconds']:>10.3f}{result['speedup']:>9.2f}x{result['mb']:>10.1f}  {dtypes}")
+
+
+def main():
+    parser = ArgumentParser(prog="python -m benchmarks.fetch", description="compare result fetch paths")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--arraysize", type=int, default=DEFAULT_ARRAYSIZE)
+    parser.add_argument("--json", help="write the report to this file")
+    args = parser.parse_args()
+
+    report = run_benchmark(args.rows, args.repeat, args.arraysize)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
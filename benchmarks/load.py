@@ -0,0 +1,289 @@
+# ======================================================================================================================
+# import standard library packages
+# ----------------------------------------------------------------------------------------------------------------------
+import os
+import sys
+import json
+import math
+import time
+import random
+import threading
+import urllib.request
+from pathlib import Path
+from argparse import ArgumentParser
+from collections import defaultdict
+
+ROOT = Path(os.path.dirname(os.path.abspath(__file__))).parent
+sys.path.insert(0, str(ROOT))
+
+# ======================================================================================================================
+# import local packages
+# ----------------------------------------------------------------------------------------------------------------------
+from benchmarks.callbacks import DATA_DIR
+from benchmarks.serve import call, start_server
+from benchmarks.synthetic import CITIES, add_generator_args, ensure_data, generator_from_args
+
+
+# relative frequency of the pages a session opens
+PAGE_WEIGHTS = {"/": 1, "/hosts": 3, "/reviews": 3, "/seasonality": 3, "/cleanliness": 2, "/popularity": 3,
+                "/pricechange": 2}
+GRANULARITIES = ["day", "week", "month", "year"]
+
+
+def callback_body(outputs, inputs, state=(), changed=()):
+    """Build the request dash-renderer sends for a callback, ``outputs``, ``inputs`` and ``state`` as (id, property)."""
+    specs = [{"id": id, "property": prop} for id, prop in outputs]
+    output = ".." + "...".join(f"{id}.{prop}" for id, prop in outputs) + ".." if len(outputs) > 1 else \
+        f"{outputs[0][0]}.{outputs[0][1]}"
+    return {
+        "output": output,
+        "outputs": specs if len(outputs) > 1 else specs[0],
+        "inputs": [{"id": id, "property": prop, "value": value} for id, prop, value in inputs],
+        "state": [{"id": id, "property": prop, "value": value} for id, prop, value in state],
+        "changedPropIds": [f"{id}.{prop}" for id, prop in changed],
+    }
+
+
+# -- sessions ----------------------------------------------------------------------------------------------------------
+class Session:
+    """One analyst: opens a page, lets it render, then changes its selections a few times, pausing in between.
+
+    Dropdown choices are drawn from the options the page's dimension callbacks answered with, as a visitor picks from
+    what the dropdown shows. Pauses are exponentially distributed around ``think`` seconds.
+    """
+
+    def __init__(self, base_url, think, seed, record):
+        self.base_url = base_url
+        self.url = f"{base_url}/_dash-update-component"
+        self.think = think
+        self.rng = random.Random(seed)
+        self.record = record
+        self.options = {}
+        self.clicks = 0
+
+    def pause(self):
+        if self.think:
+            time.sleep(self.rng.expovariate(1 / self.think))
+
+    def visit(self, path):
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(f"{self.base_url}{path}", timeout=60) as response:
+                response.read()
+                ok = response.status == 200
+        except OSError:
+            ok = False
+        self.record(f"page {path}", time.perf_counter() - start, ok)
+
+    def callback(self, label, body):
+        seconds, answer = call(self.url, body)
+        self.record(label, seconds, answer is not None)
+        return answer["response"] if answer is not None else {}
+
+    def load_options(self, dropdown_id, dimension, fallback):
+        body = callback_body([(dropdown_id, "options")], [(f"{dropdown_id}-dimension", "data", dimension)])
+        response = self.callback("dimensions.load_options", body)
+        options = response.get(dropdown_id, {}).get("options") or fallback
+        self.options[dimension] = [option["value"] if isinstance(option, dict) else option for option in options]
+
+    def pick(self, dimension, low=1, high=4):
+        values = self.options.get(dimension) or [city for city, _ in CITIES]
+        # popular entries come first in the options, and visitors mostly pick among the first ones
+        weights = [1 / (rank + 1) for rank in range(len(values))]
+        picked = []
+        while len(picked) < min(self.rng.randint(low, high), len(values)):
+            value = self.rng.choices(values, weights)[0]
+            if value not in picked:
+                picked.append(value)
+        return picked
+
+    # -- pages ---------------------------------------------------------------------------------------------------------
+    def home(self, actions):
+        self.callback("home.update_graphs", callback_body(
+            [("total-tuples-table", "data"), ("total-tuples-table", "columns"), ("total-tuples-as-of", "children"),
+             ("total-tuples-refresh", "disabled")],
+            [("total-tuples-table", "data", None), ("total-tuples-refresh", "n_intervals", 0)]))
+
+    def _city_trend(self, label, graph, dimension, cities, actions):
+        self.load_options("city-select", dimension, cities)
+        granularity = "month"
+        for action in range(actions + 1):
+            changed = "city-select" if action == 0 or self.rng.random() < 0.7 else "granularity-select"
+            if action and changed == "city-select":
+                cities = self.pick(dimension)
+            elif action:
+                granularity = self.rng.choice(GRANULARITIES)
+            if action:
+                self.pause()
+            self.callback(label, callback_body([(graph, "figure")],
+                                               [("city-select", "value", cities),
+                                                ("granularity-select", "value", granularity)],
+                                               changed=[(changed, "value")]))
+
+    def hosts(self, actions):
+        self._city_trend("hosts.update_graph", "num_host_graph", "listing_cities", ["London", "Paris"], actions)
+
+    def reviews(self, actions):
+        self._city_trend("reviews.update_review_trend", "avg-review-trend-graph", "review_cities",
+                         ["Paris", "Brooklyn"], actions)
+
+    def seasonality(self, actions):
+        cities, years = ["Paris", "Brooklyn"], [2020, 2021]
+        self.load_options("city-select", "review_cities", cities)
+        self.load_options("year-select", "review_years", years)
+        for action in range(actions + 1):
+            changed = "city-select" if action == 0 or self.rng.random() < 0.5 else "year-select"
+            if action:
+                self.pause()
+                if changed == "city-select":
+                    cities = self.pick("review_cities")
+                else:
+                    years = sorted(self.rng.sample(self.options["review_years"],
+                                                   min(self.rng.randint(1, 5), len(self.options["review_years"]))))
+            self.callback("seasonality.update_cube", callback_body(
+                [("seasonality-cube", "data")],
+                [("city-select", "value", cities), ("year-select", "value", years)],
+                changed=[(changed, "value")]))
+
+    def cleanliness(self, actions):
+        countries = ["France", "United States"]
+        self.load_options("country-select", "review_countries", countries)
+        for action in range(actions + 1):
+            if action:
+                self.pause()
+                countries = self.pick("review_countries")
+            self.callback("cleanliness.update_graph", callback_body(
+                [("cleanliness_graph", "figure")], [("country-select", "value", countries)],
+                changed=[("country-select", "value")]))
+
+    def popularity(self, actions):
+        # the graph renders once with the defaults, then every search is a click with a typed city and a period
+        self.clicks = 0
+        for action in range(actions + 1):
+            city, years = "Paris", 5
+            if action:
+                self.pause()
+                self.clicks += 1
+                city, years = self.pick("listing_cities", 1, 1)[0], self.rng.randint(3, 10)
+            self.callback("popularity.update_popularity_graph", callback_body(
+                [("popularity_graph", "figure")],
+                [("search_button", "n_clicks", self.clicks), ("granularity-select", "value", "year")],
+                [("city_input", "value", city), ("year_dropdown", "value", years)],
+                changed=[("search_button", "n_clicks")] if action else []))
+
+    def price_change(self, actions):
+        self.clicks = 0
+        for action in range(actions + 1):
+            city = None
+            if action:
+                self.pause()
+                self.clicks += 1
+                city = self.pick("listing_cities", 1, 1)[0]
+            self.callback("avgPerYear.update_graph", callback_body(
+                [("candlestick", "figure")], [("city_search_button", "n_clicks", self.clicks)],
+                [("city_input", "value", city)], changed=[("city_search_button", "n_clicks")] if action else []))
+
+    def run(self, until):
+        pages = {"/": self.home, "/hosts": self.hosts, "/reviews": self.reviews, "/seasonality": self.seasonality,
+                 "/cleanliness": self.cleanliness, "/popularity": self.popularity, "/pricechange": self.price_change}
+        # sessions start spread over the first pause instead of all at once
+        self.pause()
+        while time.perf_counter() < until:
+            path = self.rng.choices(list(PAGE_WEIGHTS), list(PAGE_WEIGHTS.values()))[0]
+            self.visit(path)
+            pages[path](self.rng.randint(1, 4))
+            self.pause()
+
+
+# -- load test ---------------------------------------------------------------------------------------------------------
+def percentile(values, q):
+    return values[max(math.ceil(q * len(values)) - 1, 0)] if values else None
+
+
+def summarize(results, elapsed):
+    by_label = defaultdict(list)
+    for label, seconds, ok in results:
+        by_label[label].append((seconds, ok))
+
+    def stats(samples):
+        latencies = sorted(seconds for seconds, ok in samples if ok)
+        errors = sum(not ok for _, ok in samples)
+        return {
+            "requests": len(samples),
+            "errors": errors,
+            "error_rate": round(errors / len(samples), 4) if samples else 0.0,
+            "requests_per_second": round(len(samples) / elapsed, 2),
+            **{f"p{int(q * 100)}_ms": round(percentile(latencies, q) * 1000, 1) if latencies else None
+               for q in (0.5, 0.95, 0.99)},
+        }
+
+    return {"total": stats([sample for samples in by_label.values() for sample in samples]),
+            "callbacks": {label: stats(samples) for label, samples in sorted(by_label.items())}}
+
+
+def run_load(base_url, users=50, think=2.0, duration=60, seed=0):
+    results = []
+    lock = threading.Lock()
+
+    def record(label, seconds, ok):
+        with lock:
+            results.append((label, seconds, ok))
+
+    start = time.perf_counter()
+    until = start + duration
+    sessions = [Session(base_url, think, seed + i, record) for i in range(users)]
+    threads = [threading.Thread(target=session.run, args=(until,), daemon=True) for session in sessions]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return {"users": users, "think": think, "duration": duration, "elapsed": round(elapsed, 1),
+            **summarize(results, elapsed)}
+
+
+def print_report(report):
+    print(f"{report['users']} users, {report['think']}s think time, {report['elapsed']}s")
+    print(f"\n{'callback':<40}{'requests':>10}{'req/s':>10}{'errors':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for label, result in [*report["callbacks"].items(), ("total", report["total"])]:
+        print(f"{label:<40}{result['requests']:>10}{result['requests_per_second']:>10}"
+              f"{result['error_rate']:>10.1%}{result['p50_ms'] or '-':>10}{result['p95_ms'] or '-':>10}"
+              f"{result['p99_ms'] or '-':>10}")
+
+
+def main():
+    parser = ArgumentParser(prog="python -m benchmarks.load",
+                            description="replay concurrent analyst sessions against the Dash callback endpoint")
+    parser.add_argument("--url", help="server to load, by default one is started on the synthetic data")
+    parser.add_argument("--users", type=int, default=50, help="concurrent sessions")
+    parser.add_argument("--think", type=float, default=2.0, help="mean seconds between a session's actions")
+    parser.add_argument("--duration", type=float, default=60)
+    parser.add_argument("--session-seed", type=int, default=0, help="seed of the sessions' choices")
+    parser.add_argument("--server", choices=["serve", "dev"], default="serve")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--rollups", action="store_true", help="build the rollups before starting the server")
+    parser.add_argument("--data", default=str(DATA_DIR), help="where the synthetic snapshot is generated")
+    add_generator_args(parser)
+    parser.add_argument("--json", help="write the report to this file")
+    args = parser.parse_args()
+
+    process = None
+    base_url = args.url
+    if base_url is None:
+        data_dir = Path(args.data).absolute()
+        ensure_data(data_dir, generator_from_args(args))
+        base_url, process = start_server(data_dir, args.server, args.workers, args.rollups, "load.ini")
+    try:
+        report = run_load(base_url.rstrip("/"), args.users, args.think, args.duration, args.session_seed)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=60)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
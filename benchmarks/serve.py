@@ -0,0 +1,200 @@
+# ======================================================================================================================
+# import standard library packages
+# ----------------------------------------------------------------------------------------------------------------------
+import os
+import sys
+import json
+import time
+import socket
+import itertools
+import statistics
+import subprocess
+import urllib.request
+from pathlib import Path
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+
+
+ROOT = Path(os.path.dirname(os.path.abspath(__file__))).parent
+sys.path.insert(0, str(ROOT))
+
+# ======================================================================================================================
+# import local packages
+# ----------------------------------------------------------------------------------------------------------------------
+from benchmarks.callbacks import DATA_DIR, write_config
+from benchmarks.synthetic import add_generator_args, ensure_data, generator_from_args
+
+# page visited first so its callbacks are registered, then the callback requests cycled through
+PAGE = "/seasonality"
+CITIES = [["Paris"], ["Paris", "Brooklyn"], ["London", "Paris"], ["Brooklyn"]]
+YEARS = [[2019], [2020], [2020, 2021]]
+
+
+def callback_body(cities, years):
+    return {
+        "output": "seasonality-cube.data",
+        "outputs": {"id": "seasonality-cube", "property": "data"},
+        "inputs": [{"id": "city-select", "property": "value", "value": cities},
+                   {"id": "year-select", "property": "value", "value": years}],
+        "changedPropIds": ["city-select.value"],
+    }
+
+
+# -- server processes --------------------------------------------------------------------------------------------------
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def server_command(mode, port, workers):
+    if mode == "dev":
+        return [sys.executable, "trendbnb.py", "run", "--host", "127.0.0.1", "--port", str(port)]
+    return [sys.executable, "-m", "trendbnb", "serve", "--workers", str(workers), "--bind", f"127.0.0.1:{port}"]
+
+
+def wait_until_up(url, process, timeout=180):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"server exited with code {process.returncode}")
+        try:
+            with urllib.request.urlopen(url, timeout=5) as response:
+                if response.status == 200:
+                    return
+        except OSError:
+            time.sleep(0.5)
+    raise RuntimeError(f"server did not answer {url} within {timeout}s")
+
+
+def start_server(data_dir, mode, workers, rollups=False, config="serve.ini", page="/hosts"):
+    """Start a server with the app's caches on the synthetic snapshot in ``data_dir``, return its url and process."""
+    env = {**os.environ, "TRENDBNB_CONFIG": str(write_config(data_dir/config, data_dir, rollups, isolated=False))}
+    if rollups:
+        subprocess.run([sys.executable, "trendbnb.py", "rollup-build"], cwd=ROOT, env=env, check=True)
+    port = free_port()
+    process = subprocess.Popen(server_command(mode, port, workers), cwd=ROOT, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        wait_until_up(f"{base_url}{page}", process)
+    except RuntimeError:
+        process.terminate()
+        raise
+    return base_url, process
+
+
+# -- load --------------------------------------------------------------------------------------------------------------
+def send(url, body):
+    request = urllib.request.Request(url, data=json.dumps(body).encode(), headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request, timeout=60) as response:
+        data = response.read()
+    # a callback raising PreventUpdate answers 204 without a body
+    return json.loads(data) if data else {"response": {}}
+
+
+def call(url, body, poll_interval=0.1, timeout=60):
+    """Post a callback request and return the seconds until its result and the answer, None if it failed."""
+    # a background callback answers with its job, which is polled like dash-renderer does until the result is ready
+    start = time.perf_counter()
+    try:
+        answer = send(url, body)
+        if "cacheKey" in answer:
+            poll_url = f"{url}?cacheKey={answer['cacheKey']}&job={answer['job']}"
+            while "response" not in answer and time.perf_counter() - start < timeout:
+                time.sleep(poll_interval)
+                answer = send(poll_url, body)
+        if "response" not in answer:
+            answer = None
+    except (OSError, ValueError):
+        answer = None
+    return time.perf_counter() - start, answer
+
+
+def post(url, body, poll_interval=0.1):
+    seconds, answer = call(url, body, poll_interval)
+    return seconds, answer is not None
+
+
+def drive(base_url, concurrency, duration):
+    url = f"{base_url}/_dash-update-component"
+    bodies = [callback_body(cities, years) for cities, years in itertools.product(CITIES, YEARS)]
+    deadline = time.perf_counter() + duration
+
+    def client(i):
+        results = []
+        for body in itertools.islice(itertools.cycle(bodies), i, None):
+            if time.perf_counter() >= deadline:
+                break
+            results.append(post(url, body))
+        return results
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = [result for client_results in pool.map(client, range(concurrency)) for result in client_results]
+    elapsed = time.perf_counter() - start
+    latencies = sorted(seconds for seconds, ok in results if ok)
+    errors = sum(not ok for _, ok in results)
+    return {
+        "requests": len(results),
+        "errors": errors,
+        "requests_per_second": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 1) if latencies else None,
+        "p95_ms": round(latencies[int(0.95 * (len(latencies) - 1))] * 1000, 1) if latencies else None,
+    }
+
+
+def run_server(data_dir, mode, workers, concurrency, duration):
+    base_url, process = start_server(data_dir, mode, workers, page=PAGE)
+    try:
+        # one untimed round, so both servers are measured with their caches filled
+        for cities, years in itertools.product(CITIES, YEARS):
+            post(f"{base_url}/_dash-update-component", callback_body(cities, years))
+        return drive(base_url, concurrency, duration)
+    finally:
+        process.terminate()
+        process.wait(timeout=60)
+
+
+# -- benchmark ---------------------------------------------------------------------------------------------------------
+def run_benchmark(data_dir, workers=4, concurrency=16, duration=20):
+    report = {"workers": workers, "concurrency": concurrency, "duration": duration, "cpus": os.cpu_count()}
+    report["dev"] = run_server(data_dir, "dev", workers, concurrency, duration)
+    report["serve"] = run_server(data_dir, "serve", workers, concurrency, duration)
+    dev, serve = report["dev"]["requests_per_second"], report["serve"]["requests_per_second"]
+    report["speedup"] = round(serve / dev, 2) if dev else None
+    return report
+
+
+def print_report(report):
+    print(f"{report['concurrency']} concurrent clients for {report['duration']}s, {report['cpus']} CPUs")
+    print(f"\n{'server':<28}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'errors':>10}")
+    for mode, label in [("dev", "dev server"), ("serve", f"serve --workers {report['workers']}")]:
+        result = report[mode]
+        print(f"{label:<28}{result['requests_per_second']:>10}{result['p50_ms']:>10}{result['p95_ms']:>10}"
+              f"{result['errors']:>10}")
+    print(f"\nspeedup: {report['speedup']}x")
+
+
+def main():
+    parser = ArgumentParser(prog="python -m benchmarks.serve",
+                            description="compare callback throughput of the dev server and the multi-worker server")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--data", default=str(DATA_DIR), help="where the synthetic snapshot is generated")
+    add_generator_args(parser)
+    parser.add_argument("--json", help="write the report to this file")
+    args = parser.parse_args()
+
+    data_dir = Path(args.data).absolute()
+    ensure_data(data_dir, generator_from_args(args))
+    report = run_benchmark(data_dir, args.workers, args.concurrency, args.duration)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+# ======================================================================================================================
+# import standard library packages
+# ----------------------------------------------------------------------------------------------------------------------
+import os
+import sys
+import json
+import statistics
+import subprocess
+from pathlib import Path
+from argparse import ArgumentParser
+from configparser import ConfigParser
+
+
+ROOT = Path(os.path.dirname(os.path.abspath(__file__))).parent
+LOCAL_PREFIXES = ("trendbnb", "pages", "config")
+
+# runs in a fresh interpreter under -X importtime, prints its measurements as json on stdout
+CHILD = """
+import sys, time, json, importlib
+
+network = []
+def audit(event, args):
+    if event in ("socket.connect", "socket.getaddrinfo", "urllib.Request"):
+        network.append(f"{event} {args[1] if event == 'socket.connect' else args[0]}")
+sys.addaudithook(audit)
+
+start = time.perf_counter()
+import trendbnb
+startup = time.perf_counter() - start
+
+pages = {}
+for page_name in (trendbnb.page_info if "--pages" in sys.argv else []):
+    start = time.perf_counter()
+    if trendbnb.lazy_pages:
+        trendbnb.import_page(page_name)
+    else:
+        importlib.import_module(f"pages.{page_name}")
+    pages[page_name] = time.perf_counter() - start
+
+print(json.dumps({"startup": startup, "pages": pages, "network": network, "lazy_pages": trendbnb.lazy_pages}))
+"""
+
+
+# -- helper functions --------------------------------------------------------------------------------------------------
+def get_config():
+    cfg = ConfigParser()
+    cfg.read(ROOT/'config'/'config.ini')
+    return cfg
+
+
+def parse_importtime(stderr):
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = {"self_ms": int(self_us) / 1000, "cumulative_ms": int(cumulative_us) / 1000}
+    return modules
+
+
+def run_once(time_pages):
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", CHILD, *(["--pages"] if time_pages else [])],
+                            cwd=ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"importing trendbnb failed:\n{result.stderr[-2000:]}")
+    measurements = json.loads(result.stdout.strip().splitlines()[-1])
+    measurements["modules"] = parse_importtime(result.stderr)
+    return measurements
+
+
+def is_local(name):
+    return name.split(".")[0] in LOCAL_PREFIXES
+
+
+# -- benchmark ---------------------------------------------------------------------------------------------------------
+def run_benchmark(repeat=3, time_pages=False, budget_ms=None, module_budget_ms=None, top=15):
+    runs = [run_once(time_pages) for _ in range(repeat)]
+    startup_ms = statistics.median(run["startup"] for run in runs) * 1000
+    modules = runs[0]["modules"]
+    for name in modules:
+        modules[name]["self_ms"] = statistics.median(run["modules"].get(name, modules[name])["self_ms"] for run in runs)
+        modules[name]["cumulative_ms"] = statistics.median(run["modules"].get(name, modules[name])["cumulative_ms"]
+                                                           for run in runs)
+    pages = {name: statistics.median(run["pages"][name] for run in runs) * 1000 for name in runs[0]["pages"]}
+
+    failures = []
+    if budget_ms is not None and startup_ms > budget_ms:
+        failures.append(f"startup took {startup_ms:.0f} ms, budget is {budget_ms:.0f} ms")
+    if module_budget_ms is not None:
+        for name, timing in modules.items():
+            if is_local(name) and timing["self_ms"] > module_budget_ms:
+                failures.append(f"{name} took {timing['self_ms']:.0f} ms, budget is {module_budget_ms:.0f} ms")
+    if runs[0]["network"]:
+        failures.append(f"network I/O at import: {', '.join(sorted(set(runs[0]['network'])))}")
+
+    return {
+        "lazy_pages": runs[0]["lazy_pages"],
+        "startup_ms": round(startup_ms, 1),
+        "budget_ms": budget_ms,
+        "local_modules": {name: timing for name, timing in modules.items() if is_local(name)},
+        "slowest_modules": dict(sorted(modules.items(), key=lambda item: -item[1]["cumulative_ms"])[:top]),
+        "first_visit_ms": {name: round(ms, 1) for name, ms in pages.items()},
+        "failures": failures,
+    }
+
+
+def print_report(report):
+    budget = "" if report["budget_ms"] is None else f" / budget {report['budget_ms']:.0f} ms"
+    print(f"startup (lazy_pages={report['lazy_pages']}): {report['startup_ms']:.0f} ms{budget}")
+    print(f"\n{'local module':<40}{'self ms':>12}{'cumulative ms':>16}")
+    for name, timing in sorted(report["local_modules"].items(), key=lambda item: -item[1]["self_ms"]):
+        print(f"{name:<40}{timing['self_ms']:>12.1f}{timing['cumulative_ms']:>16.1f}")
+    print(f"\n{'slowest imports':<40}{'self ms':>12}{'cumulative ms':>16}")
+    for name, timing in report["slowest_modules"].items():
+        print(f"{name:<40}{timing['self_ms']:>12.1f}{timing['cumulative_ms']:>16.1f}")
+    if report["first_visit_ms"]:
+        print(f"\n{'page first visit':<40}{'ms':>12}")
+        for name, ms in report["first_visit_ms"].items():
+            print(f"{name:<40}{ms:>12.1f}")
+    for failure in report["failures"]:
+        print(f"FAIL: {failure}")
+
+
+def main():
+    cfg = get_config()
+    parser = ArgumentParser(prog="python -m benchmarks.startup", description="measure trendbnb cold start")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--budget-ms", type=float, default=cfg.getfloat("startup", "budget_ms", fallback=None))
+    parser.add_argument("--module-budget-ms", type=float,
+                        default=cfg.getfloat("startup", "module_budget_ms", fallback=None))
+    parser.add_argument("--pages", action="store_true", help="also time the first visit of every page")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--json", help="write the report to this file")
+    args = parser.parse_args()
+
+    report = run_benchmark(args.repeat, args.pages, args.budget_ms, args.module_budget_ms, args.top)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    sys.exit(1 if report["failures"] else 0)
+
+
+if __name__ == "__main__":
+    main()
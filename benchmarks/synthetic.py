@@ -0,0 +1,213 @@
+# ======================================================================================================================
+# import standard library packages
+# ----------------------------------------------------------------------------------------------------------------------
+import os
+import sys
+import json
+import time
+from pathlib import Path
+from argparse import ArgumentParser
+
+# ======================================================================================================================
+# import non-standard library packages
+# ----------------------------------------------------------------------------------------------------------------------
+import numpy as np
+import pandas as pd
+
+ROOT = Path(os.path.dirname(os.path.abspath(__file__))).parent
+sys.path.insert(0, str(ROOT))
+
+# ======================================================================================================================
+# import local packages
+# ----------------------------------------------------------------------------------------------------------------------
+from pages.snapshot import MANIFEST, write_manifest, write_table
+
+
+# cities in order of popularity, the Zipf distribution gives London and Paris the bulk of the listings
+CITIES = [
+    ("London", "United Kingdom"), ("Paris", "France"), ("Brooklyn", "United States"), ("Rome", "Italy"),
+    ("Manhattan", "United States"), ("Barcelona", "Spain"), ("Amsterdam", "Netherlands"), ("Berlin", "Germany"),
+    ("Sydney", "Australia"), ("Rio de Janeiro", "Brazil"), ("Istanbul", "Turkey"), ("Toronto", "Canada"),
+    ("Mexico City", "Mexico"), ("Bangkok", "Thailand"), ("Cape Town", "South Africa"), ("Hong Kong", "Hong Kong"),
+]
+
+# listings per generated chunk, reviews are written per chunk of listings so memory stays bounded at any scale
+CHUNK_LISTINGS = 25_000
+
+
+# -- synthetic data ----------------------------------------------------------------------------------------------------
+class SyntheticAirbnb:
+    """Deterministic stand-in for the Airbnb tables, written as a snapshot the DuckDB backend reads.
+
+    The same parameters always give the same rows: every chunk draws from its own generator seeded by ``seed``, the
+    table and the chunk number. Listings are spread over ``CITIES`` with Zipf weights ``1 / rank ** skew``, first
+    reviews grow towards ``end`` the way the platform did, and each listing is reviewed between its first and last
+    review date about ``reviews_per_listing`` times on average.
+    """
+
+    def __init__(self, listings=400_000, reviews_per_listing=60, detailed_per_listing=2, listings_per_host=1.6,
+                 skew=1.2, start="2009-01-01", end="2025-12-31", seed=0):
+        self.listings = int(listings)
+        self.hosts = max(int(self.listings / listings_per_host), 1)
+        self.reviews_per_listing = reviews_per_listing
+        self.detailed_per_listing = detailed_per_listing
+        self.listings_per_host = listings_per_host
+        self.skew = skew
+        self.start = pd.Timestamp(start)
+        self.end = pd.Timestamp(end)
+        self.seed = seed
+
+        weights = 1 / np.arange(1, len(CITIES) + 1) ** skew
+        self.city_weights = weights / weights.sum()
+        # per city offsets, so the trends of two cities are told apart in the charts
+        rng = self._rng("cities")
+        self.city_price = rng.lognormal(np.log(110), 0.3, len(CITIES))
+        self.city_rating = rng.normal(0, 2.5, len(CITIES))
+
+    def params(self):
+        return {"listings": self.listings, "hosts": self.hosts, "reviews_per_listing": self.reviews_per_listing,
+                "detailed_per_listing": self.detailed_per_listing, "listings_per_host": self.listings_per_host,
+                "skew": self.skew, "start": self.start.date().isoformat(), "end": self.end.date().isoformat(),
+                "seed": self.seed}
+
+    def _rng(self, table, chunk=0):
+        return np.random.default_rng([self.seed, sum(map(ord, table)), chunk])
+
+    def _dates(self, rng, low, high, growth=1.0):
+        # growth > 1 puts more dates towards high, a power distribution as in the platform's yearly signups
+        span = (high - low).astype("timedelta64[s]").astype(np.int64)
+        offsets = (rng.power(growth, len(span)) * span).astype("timedelta64[s]")
+        return (low + offsets).astype("datetime64[D]").astype("datetime64[ns]")
+
+    def _chunks(self, total, size=CHUNK_LISTINGS):
+        for i, first in enumerate(range(0, total, size)):
+            yield i, np.arange(first, min(first + size, total))
+
+    # -- tables --------------------------------------------------------------------------------------------------------
+    def host(self):
+        for i, ids in self._chunks(self.hosts):
+            rng = self._rng("Host", i)
+            low = np.full(len(ids), self.start - pd.DateOffset(years=1), dtype="datetime64[ns]")
+            high = np.full(len(ids), self.end, dtype="datetime64[ns]")
+            yield pd.DataFrame({
+                "hostid": ids,
+                "hostname": [f"Host {n}" for n in ids],
+                "hostsince": self._dates(rng, low, high, growth=2.0),
+                "hostissuperhost": (rng.random(len(ids)) < 0.2).astype(np.int64),
+            })
+
+    def _listing_chunk(self, i, ids):
+        rng = self._rng("Listing", i)
+        city = rng.choice(len(CITIES), size=len(ids), p=self.city_weights)
+        first = self._dates(rng, np.full(len(ids), self.start, dtype="datetime64[ns]"),
+                            np.full(len(ids), self.end, dtype="datetime64[ns]"), growth=2.0)
+        active = rng.exponential(3 * 365, len(ids)).astype("timedelta64[D]")
+        last = np.minimum(first + active, np.datetime64(self.end.date(), "ns"))
+        # a few hosts run many listings
+        host = (self.hosts * rng.random(len(ids)) ** 2).astype(np.int64)
+        price = np.round(self.city_price[city] * rng.lognormal(0, 0.5, len(ids)), 0)
+        return pd.DataFrame({
+            "listingid": ids,
+            "hostid": host,
+            "city": np.array([name for name, _ in CITIES])[city],
+            "country": np.array([country for _, country in CITIES])[city],
+            "roomtype": rng.choice(["Entire home/apt", "Private room", "Shared room"], len(ids), p=[0.6, 0.37, 0.03]),
+            "dailyprice": price,
+            "firstreview": first,
+            "lastreview": last,
+        })
+
+    def listing(self):
+        for i, ids in self._chunks(self.listings):
+            yield self._listing_chunk(i, ids)
+
+    def review(self):
+        next_id = 0
+        for i, ids in self._chunks(self.listings):
+            listing = self._listing_chunk(i, ids)
+            rng = self._rng("Review", i)
+            counts = rng.geometric(1 / (self.reviews_per_listing + 1), len(ids)) - 1
+            first = np.repeat(listing.firstreview.to_numpy(), counts)
+            last = np.repeat(listing.lastreview.to_numpy(), counts)
+            reviews = len(first)
+            yield pd.DataFrame({
+                "reviewid": np.arange(next_id, next_id + reviews),
+                "listingid": np.repeat(ids, counts),
+                "reviewerid": rng.integers(0, max(self.listings * 20, 1), reviews),
+                "reviewdate": self._dates(rng, first, last),
+            })
+            next_id += reviews
+
+    def detailed_review(self):
+        for i, ids in self._chunks(self.listings):
+            listing = self._listing_chunk(i, ids)
+            rng = self._rng("DetailedReview", i)
+            counts = rng.poisson(self.detailed_per_listing, len(ids))
+            city = np.repeat(pd.Categorical(listing.city, categories=[name for name, _ in CITIES]).codes, counts)
+            rating = np.clip(rng.normal(93, 6, len(city)) + self.city_rating[city], 20, 100).round()
+            yield pd.DataFrame({
+                "listingid": np.repeat(ids, counts),
+                "rating": rating,
+                "cleanliness": np.clip(np.round(rating / 10 + rng.normal(0, 0.6, len(city))), 2, 10),
+                "communication": np.clip(np.round(rng.normal(9.6, 0.7, len(city))), 2, 10),
+                "location": np.clip(np.round(rng.normal(9.5, 0.7, len(city))), 2, 10),
+            })
+
+    def airbnb(self):
+        # one summary row per city, the overview only counts this table
+        counts = pd.concat([chunk.groupby(["city", "country"]).size() for chunk in self.listing()])
+        yield counts.groupby(level=[0, 1]).sum().rename("listings").reset_index()
+
+    def write(self, out_dir, verbose=True):
+        """Write every table into ``out_dir`` and return the manifest, which records the parameters."""
+        out_dir = Path(out_dir)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        tables = {"Host": self.host, "Listing": self.listing, "Review": self.review,
+                  "DetailedReview": self.detailed_review, "AirBnB": self.airbnb}
+        stats = {}
+        for table, chunks in tables.items():
+            start = time.perf_counter()
+            rows = write_table(out_dir, table, chunks())
+            stats[table] = {"rows": rows, "seconds": round(time.perf_counter() - start, 3)}
+            if verbose:
+                print(f"{table}: {rows} rows in {stats[table]['seconds']}s")
+        return write_manifest(out_dir, stats, synthetic=self.params())
+
+
+def ensure_data(out_dir, generator, verbose=True):
+    """Generate the data into ``out_dir`` unless it already holds data written with the same parameters."""
+    path = Path(out_dir)/MANIFEST
+    if path.exists():
+        with open(path) as f:
+            if json.load(f).get("synthetic") == generator.params():
+                return path.parent
+    generator.write(out_dir, verbose)
+    return path.parent
+
+
+def add_generator_args(parser):
+    parser.add_argument("--listings", type=int, default=400_000)
+    parser.add_argument("--reviews-per-listing", type=float, default=60)
+    parser.add_argument("--detailed-per-listing", type=float, default=2)
+    parser.add_argument("--skew", type=float, default=1.2, help="Zipf exponent of the listings per city")
+    parser.add_argument("--start", default="2009-01-01")
+    parser.add_argument("--end", default="2025-12-31")
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def generator_from_args(args):
+    return SyntheticAirbnb(args.listings, args.reviews_per_listing, args.detailed_per_listing, skew=args.skew,
+                           start=args.start, end=args.end, seed=args.seed)
+
+
+def main():
+    parser = ArgumentParser(prog="python -m benchmarks.synthetic",
+                            description="write deterministic synthetic Airbnb tables as a snapshot for the DuckDB backend")
+    parser.add_argument("out_dir", help="snapshot directory, point [snapshot] dir at it")
+    add_generator_args(parser)
+    args = parser.parse_args()
+    generator_from_args(args).write(args.out_dir)
+
+
+if __name__ == "__main__":
+    main()
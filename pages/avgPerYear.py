@@ -1,7 +1,6 @@
 # ======================================================================================================================
 # import standard library packages
 # ----------------------------------------------------------------------------------------------------------------------
-from copy import deepcopy
 
 # ======================================================================================================================
 # import dash library packages
@@ -20,29 +19,16 @@ import sqlalchemy as sa
 # import local packages
 # ----------------------------------------------------------------------------------------------------------------------
 from pages.components import *
-from pages.utils import get_data, get_table, db_query, engine
+from pages.utils import db_query, engine
+from pages.queries import QUERIES
+from pages.rollups import rollups_enabled, price_change
 
 page_name = "avgPerYear"
 city_name = "Amsterdam"
-db_owner = "ANDREW.GOLDSTEIN"
 
-def someQuery(city:str) -> str:
-    return f'''
-    SELECT COUNT(*) 
-    FROM "{db_owner}".Listing L 
-    WHERE L.City = '{city}' 
-    '''
-
-
-# -- plotly figs -------------------------------------------------------------------------------------------------------
-x, y = get_data()
-values, headers = get_table()
-fig = go.Figure(data=[go.Scatter(x=[1, 2, 3], y=[4, 1, 2])])
-fig.update_layout(template="plotly_dark")
 
 # -- customize simple navbar -------------------------------------------------------------------------------------------
-navbar_main = deepcopy(navbar)
-set_active(navbar_main, page_name)
+navbar_main = make_navbar(page_name)
 
 
 layout = dbc.Container(
@@ -126,38 +112,11 @@ layout = dbc.Container(
 def update_graph(n_clicks, selected_city):
     if not selected_city:
         selected_city = "Paris"
-    query = sa.text(f"""
-        WITH MonthlyPriceData AS (
-        SELECT 
-            L.City,
-            TO_CHAR(L.FirstReview, 'YYYY-MM') AS ListingMonth,
-            EXTRACT(YEAR FROM L.FirstReview) AS ListingYear,
-            EXTRACT(MONTH FROM L.FirstReview) AS ListingMonthNumber,
-            AVG(L.DailyPrice) AS AvgDailyPrice
-        FROM "ANDREW.GOLDSTEIN".Listing L
-        WHERE L.City = '{selected_city}'
-        GROUP BY L.City, TO_CHAR(L.FirstReview, 'YYYY-MM'), EXTRACT(YEAR FROM L.FirstReview), EXTRACT(MONTH FROM L.FirstReview)
-    ),
-    PriceChange AS (
-        SELECT ListingMonth, AvgDailyPrice,
-            LAG(AvgDailyPrice) OVER (ORDER BY ListingYear, ListingMonthNumber) AS PrevMonthAvgPrice
-        FROM MonthlyPriceData
-    )
-    SELECT 
-        ListingMonth,
-        ROUND(AvgDailyPrice,0) AS AvgDailyPrice,
-        CASE 
-            WHEN PrevMonthAvgPrice IS NOT NULL THEN
-                ROUND((AvgDailyPrice - PrevMonthAvgPrice) / PrevMonthAvgPrice * 100, 2)
-            ELSE
-                NULL
-        END AS PercentageChange
-    FROM PriceChange
-    ORDER BY ListingMonth
-        """)
-
     params = {"CityName":selected_city}
-    df = db_query(engine, query, params)
+    if rollups_enabled():
+        df = price_change(selected_city)
+    else:
+        df = db_query(engine, QUERIES["avgPerYear.price_change"], params)
     print(df)
     if df.empty:
         #change the title
@@ -0,0 +1,304 @@
+# ======================================================================================================================
+# import standard library packages
+# ----------------------------------------------------------------------------------------------------------------------
+import os
+import json
+import time
+import hashlib
+import tempfile
+import threading
+from pathlib import Path
+from collections import OrderedDict
+
+# ======================================================================================================================
+# import non-standard library packages
+# ----------------------------------------------------------------------------------------------------------------------
+import pandas as pd
+
+
+# -- helper functions --------------------------------------------------------------------------------------------------
+def normalize_sql(query):
+    return " ".join(str(query).split())
+
+
+def frame_bytes(df):
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+# -- result cache ------------------------------------------------------------------------------------------------------
+class ResultCache:
+    """Two-tier cache of query results keyed by normalized SQL text and bound parameters.
+
+    The memory tier is an LRU bounded by the deep size of the cached frames, the optional disk tier stores gzip
+    compressed pickles under ``disk_dir`` so results survive restarts and are shared between worker processes. The
+    disk tier is bounded by ``disk_max_bytes``: every process sums up the directory again once it has written a tenth
+    of the bound, and then removes expired and least recently read entries until it is back under 90% of it.
+    """
+
+    def __init__(self, max_bytes=256 * 2**20, ttl=3600, disk_dir=None, disk_ttl=86400, enabled=True,
+                 disk_max_bytes=1024 * 2**20):
+        self.enabled = enabled
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self.disk_ttl = disk_ttl
+        self.disk_max_bytes = disk_max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        # bytes this process wrote to disk since it last summed up the directory, None before the first time
+        self._disk_written = None
+        self._lock = threading.Lock()
+        self._prune_lock = threading.Lock()
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "expirations": 0,
+                         "disk_writes": 0, "disk_errors": 0, "disk_evictions": 0}
+        if self.disk_dir is not None:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+
+    @classmethod
+    def from_config(cls, cfg, root=None):
+        disk_dir = cfg.get("cache", "disk_dir", fallback="")
+        if disk_dir and root is not None and not os.path.isabs(disk_dir):
+            disk_dir = os.path.join(root, disk_dir)
+        return cls(max_bytes=cfg.getint("cache", "memory_mb", fallback=256) * 2**20,
+                   ttl=cfg.getfloat("cache", "ttl", fallback=3600),
+                   disk_dir=disk_dir if cfg.getboolean("cache", "disk_enabled", fallback=False) else None,
+                   disk_ttl=cfg.getfloat("cache", "disk_ttl", fallback=86400),
+                   enabled=cfg.getboolean("cache", "enabled", fallback=True),
+                   disk_max_bytes=cfg.getint("cache", "disk_mb", fallback=1024) * 2**20)
+
+    def key(self, query, params=None, namespace=""):
+        payload = json.dumps([namespace, normalize_sql(query), params or {}], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    # -- memory tier ---------------------------------------------------------------------------------------------------
+    def _get_memory(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            df, size, stored = entry
+            if time.time() - stored > self.ttl:
+                del self._entries[key]
+                self._bytes -= size
+                self.counters["expirations"] += 1
+                return None
+            self._entries.move_to_end(key)
+            return df
+
+    def _put_memory(self, key, df, stored=None, size=None):
+        size = size if size is not None else frame_bytes(df)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (df, size, stored or time.time())
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+                self.counters["evictions"] += 1
+
+    # -- disk tier -----------------------------------------------------------------------------------------------------
+    def _path(self, key):
+        return self.disk_dir/f"{key}.pkl.gz"
+
+    def _get_disk(self, key):
+        path = self._path(key)
+        try:
+            stored = path.stat().st_mtime
+            if time.time() - stored > self.disk_ttl:
+                path.unlink(missing_ok=True)
+                self._count("expirations")
+                return None, None
+            df = pd.read_pickle(path, compression="gzip")
+            # the access time orders entries for eviction, the modification time stays the time it was stored
+            os.utime(path, (time.time(), stored))
+            return df, stored
+        except FileNotFoundError:
+            return None, None
+        except Exception:
+            self._count("disk_errors")
+            return None, None
+
+    def _put_disk(self, key, df):
+        tmp = None
+        try:
+            # write to a temporary file first so concurrent readers never see a partial entry
+            fd, tmp = tempfile.mkstemp(dir=self.disk_dir, suffix=".tmp")
+            os.close(fd)
+            df.to_pickle(tmp, compression="gzip")
+            size = os.path.getsize(tmp)
+            os.replace(tmp, self._path(key))
+            self._count("disk_writes")
+        except Exception:
+            self._count("disk_errors")
+            if tmp is not None:
+                Path(tmp).unlink(missing_ok=True)
+            return
+        with self._lock:
+            due = self._disk_written is None or self._disk_written + size > self.disk_max_bytes / 10
+            self._disk_written = (self._disk_written or 0) + size
+        if due:
+            self._prune_disk()
+
+    def _prune_disk(self):
+        if not self._prune_lock.acquire(blocking=False):
+            return
+        try:
+            now = time.time()
+            entries = []
+            for path in self.disk_dir.glob("*.pkl.gz"):
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                if now - stat.st_mtime > self.disk_ttl:
+                    path.unlink(missing_ok=True)
+                    self._count("expirations")
+                else:
+                    entries.append((stat.st_atime, stat.st_size, path))
+            total = sum(size for _, size, _ in entries)
+            if total > self.disk_max_bytes:
+                for _, size, path in sorted(entries, key=lambda entry: entry[0]):
+                    if total <= self.disk_max_bytes * 0.9:
+                        break
+                    path.unlink(missing_ok=True)
+                    total -= size
+                    self._count("disk_evictions")
+            with self._lock:
+                self._disk_written = 0
+        finally:
+            self._prune_lock.release()
+
+    # -- public api ----------------------------------------------------------------------------------------------------
+    def get(self, key):
+        if not self.enabled:
+            return None
+        df = self._get_memory(key)
+        if df is not None:
+            self._count("memory_hits")
+            return df.copy()
+        if self.disk_dir is not None:
+            df, stored = self._get_disk(key)
+            if df is not None:
+                self._count("disk_hits")
+                self._put_memory(key, df, stored)
+                return df.copy()
+        self._count("misses")
+        return None
+
+    def put(self, key, df, size=None):
+        if not self.enabled or df is None:
+            return
+        df = df.copy()
+        self._put_memory(key, df, size=size)
+        if self.disk_dir is not None:
+            self._put_disk(key, df)
+
+    def clear(self, disk=True):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+        if disk and self.disk_dir is not None:
+            for path in self.disk_dir.glob("*.pkl.gz"):
+                path.unlink(missing_ok=True)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.counters["memory_hits"] + self.counters["disk_hits"] + self.counters["misses"]
+            hits = self.counters["memory_hits"] + self.counters["disk_hits"]
+            return {
+                **self.counters,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+# -- figure cache ------------------------------------------------------------------------------------------------------
+class FigureCache:
+    """Memory LRU of serialized callback responses, keyed by callback output, input values and data version.
+
+    Entries hold the exact JSON body the callback produced together with its ETag, so a hit skips the query, the
+    figure construction and the serialization.
+    """
+
+    def __init__(self, max_bytes=64 * 2**20, ttl=3600, enabled=True):
+        self.enabled = enabled
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "not_modified": 0, "evictions": 0, "expirations": 0}
+
+    @classmethod
+    def from_config(cls, cfg):
+        return cls(max_bytes=cfg.getint("cache", "figures_mb", fallback=64) * 2**20,
+                   ttl=cfg.getfloat("cache", "ttl", fallback=3600),
+                   enabled=cfg.getboolean("cache", "figures_enabled", fallback=True))
+
+    def key(self, output, values, version=""):
+        payload = json.dumps([output, values, version], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    @staticmethod
+    def etag(body):
+        return hashlib.sha1(body).hexdigest()
+
+    def count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def get(self, key):
+        """Return ``(body, etag)`` for a fresh entry, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.counters["misses"] += 1
+                return None
+            body, etag, stored = entry
+            if time.time() - stored > self.ttl:
+                del self._entries[key]
+                self._bytes -= len(body)
+                self.counters["expirations"] += 1
+                self.counters["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.counters["hits"] += 1
+            return body, etag
+
+    def put(self, key, body, etag):
+        if not self.enabled or len(body) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= len(self._entries.pop(key)[0])
+            self._entries[key] = (body, etag, time.time())
+            self._bytes += len(body)
+            while self._bytes > self.max_bytes:
+                _, (evicted, _, _) = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                self.counters["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.counters["hits"] + self.counters["misses"]
+            return {
+                **self.counters,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hit_ratio": round(self.counters["hits"] / lookups, 4) if lookups else 0.0,
+            }
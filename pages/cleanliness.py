@@ -1,7 +1,6 @@
 # ======================================================================================================================
 # import standard library packages
 # ----------------------------------------------------------------------------------------------------------------------
-from copy import deepcopy
 
 # ======================================================================================================================
 # import dash library packages
@@ -20,34 +19,20 @@ import pandas as pd
 # import local packages
 # ----------------------------------------------------------------------------------------------------------------------
 from pages.components import *
-from pages.utils import db_query, engine
+from pages.utils import db_query, db_query_batched, engine, reuse_connection
+from pages.queries import QUERIES
+from pages.rollups import rollups_enabled, cleanliness_change
 
 
 # -- helper functions --------------------------------------------------------------------------------------------------
-def get_review_countries():
-    df = db_query(engine, """
-                  WITH ReviewData AS (
-            SELECT 
-                L.Country AS Country
-            FROM 
-                Listing L
-                INNER JOIN Review R ON L.ListingID = R.ListingID
-                INNER JOIN DetailedReview DR ON R.ListingID = DR.ListingID
-        )
-        SELECT Country, COUNT(Country) AS Count
-        FROM ReviewData
-        GROUP BY Country
-        ORDER BY COUNT(Country) DESC
-                  """)
-    return df
+
 
 # -- register page -----------------------------------------------------------------------------------------------------
 page_name = "cleanliness"
 register_page(__name__, path=page_info[page_name]["href"])
 
 # -- customize simple navbar -------------------------------------------------------------------------------------------
-navbar_main = deepcopy(navbar)
-set_active(navbar_main, page_name)
+navbar_main = make_navbar(page_name)
 
 # -- layout ------------------------------------------------------------------------------------------------------------
 layout = dbc.Container(
@@ -85,8 +70,9 @@ layout = dbc.Container(
 
             # Country Select
             html.Div("Select Countries"),
+            dcc.Store(id='country-select-dimension', data="review_countries"),
             dcc.Dropdown(id='country-select',
-                         options=get_review_countries().country,
+                         options=["France", "United States"],
                          multi=True,
                          clearable=True,
                          value=["France", "United States"]),
@@ -98,37 +84,15 @@ layout = dbc.Container(
 @callback(Output("cleanliness_graph", "figure"),
         [Input("country-select", "value")],
           )
+@reuse_connection
 def update_graph(countries):
-    query = sa.text(""" WITH CleanYears AS(
-                    SELECT EXTRACT(YEAR FROM l.FirstReview) AS Year, AVG(d.Cleanliness) AS CleanAvg
-                    FROM "ANDREW.GOLDSTEIN".Listing l
-                    JOIN "ANDREW.GOLDSTEIN".DetailedReview d ON l.ListingID=d.ListingID
-                    WHERE Country=:CountryName AND d.Cleanliness IS NOT NULL AND l.LastReview IS NOT NULL
-                    GROUP BY EXTRACT(YEAR FROM l.FirstReview)),
-                    
-                    CleanChange AS(
-                    SELECT Year, CleanAvg, 
-                    LAG(CleanAvg) OVER (ORDER BY Year) AS PrevYearCleanAvg
-                    FROM CleanYears)
-                    
-                    SELECT Year, ROUND(CleanAvg, 2) AS CleanAvg, 
-                    CASE
-                        WHEN PrevYearCleanAvg IS NOT NULL THEN
-                            ROUND((CleanAvg - PrevYearCleanAvg) / PrevYearCleanAvg * 100, 2)
-                        ELSE
-                            0
-                        END AS PercentageChange
-                    FROM CleanChange
-                    ORDER BY Year
-                    """)
-
-    dfs = []
-    for country in countries:
-        params = {"CountryName": country}
-        df_country = db_query(engine, query, params)
-        df_country["country"] = country
-        dfs.append(df_country)
-    df_merged = pd.concat(dfs)
+    if rollups_enabled():
+        df_merged = cleanliness_change(countries)
+    else:
+        df_merged = db_query_batched(engine, QUERIES["cleanliness.cleanliness_change"], "CountryNames", countries,
+                                     key_column="country")
+    # keep the selection order so bar colours stay stable between interactions
+    df_merged = df_merged.sort_values("country", key=lambda s: s.map(countries.index), kind="stable")
 
     fig = px.bar(data_frame=df_merged,
                  x=df_merged['year'],
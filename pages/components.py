@@ -3,6 +3,7 @@
 # ----------------------------------------------------------------------------------------------------------------------
 import os
 from pathlib import Path
+from functools import lru_cache
 
 
 # ======================================================================================================================
@@ -10,8 +11,8 @@ from pathlib import Path
 # ----------------------------------------------------------------------------------------------------------------------
 from dash import Dash, html, dcc, page_registry, page_container, Input, Output, State, callback
 import dash_bootstrap_components as dbc
-from dash_bootstrap_templates import load_figure_template, ThemeChangerAIO
-from pandas.core.computation import align
+from dash_bootstrap_templates import load_figure_template, template_from_url, ThemeChangerAIO
+import plotly.graph_objects as go
 
 # ======================================================================================================================
 # import non-standard library packages
@@ -37,11 +38,53 @@ FOOTER_STYLE = {
 templates = ["bootstrap", "cerulean", "cosmo", "cyborg", "darkly", "flatly", "journal", "litera",
              "lumen", "lux", "materia", "minty", "morph", "pulse", "quartz", "sandstone", "simplex",
              "sketchy", "slate", "solar", "spacelab", "superhero", "united", "vapor", "yeti", "zephyr"]
-load_figure_template(templates)
+
+
+@lru_cache(maxsize=None)
+def use_figure_template(template):
+    # building a template parses the theme's css, so only do it for themes that are actually selected
+    load_figure_template(template)
+    return template
+
 
 # -- init config -------------------------------------------------------------------------------------------------------
 cfg = get_config()
 
+# -- time granularity --------------------------------------------------------------------------------------------------
+GRANULARITY_OPTIONS = [{"label": label, "value": value}
+                       for label, value in [("Day", "day"), ("Week", "week"), ("Month", "month"), ("Year", "year")]]
+# points per trace sent to the browser, longer series are downsampled
+MAX_POINTS = cfg.getint("charts", "max_points", fallback=2000)
+DOWNSAMPLE_METHOD = cfg.get("charts", "downsample", fallback="lttb")
+
+
+def make_granularity_select(value="month"):
+    return html.Div([
+        html.Div("Granularity"),
+        dbc.RadioItems(id="granularity-select", options=GRANULARITY_OPTIONS, value=value, inline=True),
+    ])
+
+
+# -- slow callbacks ----------------------------------------------------------------------------------------------------
+# long running callbacks run as background jobs, which a newer selection cancels together with their query
+BACKGROUND_CALLBACKS = cfg.getboolean("background", "enabled", fallback=False)
+# milliseconds between the browser's polls for the result of a background callback
+BACKGROUND_INTERVAL = cfg.getint("background", "poll_interval", fallback=500)
+# in the layout meta of figures answering a callback that ran out of time, so they are never cached
+TIMED_OUT = "trendbnb-timed-out"
+
+
+def timed_out_figure(error=None):
+    fig = go.Figure()
+    fig.update_layout(template="plotly_dark",
+                      meta=TIMED_OUT,
+                      xaxis={"visible": False},
+                      yaxis={"visible": False},
+                      annotations=[{"text": "Timed out, try fewer cities or years", "showarrow": False,
+                                    "xref": "paper", "yref": "paper", "x": 0.5, "y": 0.5, "font": {"size": 18}}])
+    return fig
+
+
 # -- init pages --------------------------------------------------------------------------------------------------------
 page_info = {
     "home":{"id": "home-select", "href": "/", "page-title": "Home"},
@@ -55,16 +98,27 @@ page_info = {
 }
 
 # -- navbar components -------------------------------------------------------------------------------------------------
-theme_button = ThemeChangerAIO(aio_id="theme", radio_props={"value": dbc.themes.DARKLY})
-nav_options = dbc.Nav([
-    dbc.NavItem(
-        dbc.NavLink(page_info[link]["page-title"],
-                            href=page_info[link]["href"],
-                            id=page_info[link]["id"]), class_name='nav-pill') for link in page_info], 
-                            class_name='nav-pills',
-    justified=True,
-    style={'margin-top':50}
-)
+# lazily imported pages need a full page load to fetch their callbacks, so links leave the single page app
+external_links = cfg.getboolean("startup", "lazy_pages", fallback=False)
+active_style = {'background-color': "var(--bs-dark)", 'border-bottom-left-radius': 0, 'border-bottom-right-radius': 0}
+
+
+def make_nav_options(page_name=None):
+    return dbc.Nav([
+        dbc.NavItem(
+            dbc.NavLink(page_info[link]["page-title"],
+                                href=page_info[link]["href"],
+                                id=page_info[link]["id"],
+                                active=link == page_name,
+                                external_link=external_links,
+                                style=active_style if link == page_name else None), class_name='nav-pill')
+        for link in page_info],
+                                class_name='nav-pills',
+        justified=True,
+        style={'margin-top':50}
+    )
+
+
 contact_info = dbc.Row([
                             dbc.Col([
                                 html.P(
@@ -84,34 +138,35 @@ contact_info = dbc.Row([
                         ], style={'margin-left': "auto", 'margin-right': 10})
 dk_bg = {'background-image': f'url({cfg["navbar"]["dark_bg"]})', 'height': 190, 'background-size': "cover"}
 lt_bg = {'background-image': f'url({cfg["navbar"]["light_bg"]})', 'height': 190, 'background-size': "cover"}
-navbar = html.Div([
-    dbc.Row(
-        html.Div(
-            [
-                html.H2("Airbnb Trend Analysis")
-            ], className="navbar", style={'height': 100, 'text-align': "center", 'margin': "auto"}
+
+
+def make_navbar(page_name=None):
+    """Build the navbar with the link of ``page_name`` highlighted."""
+    return html.Div([
+        dbc.Row(
+            html.Div(
+                [
+                    html.H2("Airbnb Trend Analysis")
+                ], className="navbar", style={'height': 100, 'text-align': "center", 'margin': "auto"}
+            ),
         ),
-    ),
-    dbc.Row(
-        dbc.Col(nav_options, style={'margin-left': "10%", 'margin-right': "10%"})
-    ),
-],
-    style=dk_bg, id="nav"
-)
+        dbc.Row(
+            dbc.Col(make_nav_options(page_name), style={'margin-left': "10%", 'margin-right': "10%"})
+        ),
+    ],
+        style=dk_bg, id="nav"
+    )
 
 
-def set_active(navbar_main, page_name):
-    for nav in navbar_main.children[1].children.children.children:
-        if nav.children.id == page_info[page_name]['id']:
-            nav.children.active = True
-            nav.children.style = {'background-color': "var(--bs-dark)", 'border-bottom-left-radius': 0,
-                                  'border-bottom-right-radius': 0}
-    return
+navbar = make_navbar()
 
     
 
 # -- footer ------------------------------------------------------------------------------------------------------------
-footer = html.Footer(theme_button, style=FOOTER_STYLE)
+def make_footer():
+    # ThemeChangerAIO builds the figure template of every theme it offers, so it is only created when rendered
+    theme_button = ThemeChangerAIO(aio_id="theme", radio_props={"value": dbc.themes.DARKLY})
+    return html.Footer(theme_button, style=FOOTER_STYLE)
 
 # @callback(
 #     [Output(link["id"], "active") for link in page_info],
@@ -128,6 +183,7 @@ footer = html.Footer(theme_button, style=FOOTER_STYLE)
     prevent_initial_call=True,
 )
 def update_nav_theme(theme):
+    use_figure_template(template_from_url(theme))
     if any([val in theme for val in ['cyborg', 'darkly', 'slate', 'solar', 'superhero', 'vapor']]):
         return dk_bg
     else:
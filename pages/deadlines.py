@@ -0,0 +1,148 @@
+# ======================================================================================================================
+# import standard library packages
+# ----------------------------------------------------------------------------------------------------------------------
+import math
+import time
+import threading
+from functools import wraps
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+
+# -- errors ------------------------------------------------------------------------------------------------------------
+class DeadlineExceeded(Exception):
+    """A query or the callback issuing it ran past its deadline."""
+
+
+class QueryCancelled(Exception):
+    """The in-flight query was cancelled because its job was superseded."""
+
+
+# driver messages of a call that hit oracledb's call_timeout, in thin and thick mode
+TIMEOUT_ERRORS = ("DPY-4024", "DPI-1067", "ORA-03156")
+
+
+# -- callback deadline -------------------------------------------------------------------------------------------------
+# absolute time.monotonic() by which the current callback has to finish
+_deadline = ContextVar("callback_deadline", default=None)
+
+
+@contextmanager
+def deadline(seconds):
+    """Give everything in the block ``seconds`` to finish, or less if an enclosing deadline ends earlier."""
+    if not seconds:
+        yield
+        return
+    until = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(until if current is None else min(current, until))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def query_timeout(seconds):
+    """Return the seconds the next query may run: ``seconds`` capped by what is left of the callback's deadline."""
+    until = _deadline.get()
+    if until is None:
+        return seconds or None
+    left = until - time.monotonic()
+    if left <= 0:
+        raise DeadlineExceeded("callback deadline passed before the query started")
+    return min(seconds, left) if seconds else left
+
+
+def bounded(seconds, fallback):
+    """Run a callback under a deadline of ``seconds`` and answer with ``fallback(error)`` once it is exceeded."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with deadline(seconds):
+                try:
+                    return func(*args, **kwargs)
+                except DeadlineExceeded as e:
+                    return fallback(e)
+        return wrapper
+    return decorator
+
+
+# -- in-flight queries -------------------------------------------------------------------------------------------------
+_in_flight = {}
+_in_flight_lock = threading.Lock()
+_cancelled = threading.Event()
+
+
+def interrupt(dbapi_connection):
+    # oracledb aborts the running call with cancel(), DuckDB with interrupt(); both are safe from another thread
+    stop = getattr(dbapi_connection, "cancel", None) or getattr(dbapi_connection, "interrupt", None)
+    if stop is not None:
+        try:
+            stop()
+        except Exception as e:
+            print(f"cancelling query failed: {e!r}")
+
+
+def cancel_in_flight():
+    """Abort every query this process is running and fail the ones it would start next."""
+    _cancelled.set()
+    with _in_flight_lock:
+        connections = list(_in_flight.values())
+    for dbapi_connection in connections:
+        threading.Thread(target=interrupt, args=(dbapi_connection,), daemon=True).start()
+
+
+def drain(timeout):
+    """Wait up to ``timeout`` seconds for the in-flight queries to return; return whether they all did."""
+    until = time.monotonic() + timeout
+    while time.monotonic() < until:
+        with _in_flight_lock:
+            if not _in_flight:
+                return True
+        time.sleep(0.01)
+    return False
+
+
+@contextmanager
+def guard(connection, timeout):
+    """Bound the query run in the block by ``timeout`` seconds and make it cancellable.
+
+    Oracle enforces the bound itself through the connection's ``call_timeout``, other drivers are interrupted by a
+    timer. A connection whose call was cut short is invalidated so the pool does not hand it out again.
+    """
+    if _cancelled.is_set():
+        raise QueryCancelled("job cancelled")
+    dbapi_connection = connection.connection.dbapi_connection
+    timer, expired = None, threading.Event()
+    previous_call_timeout = getattr(dbapi_connection, "call_timeout", None)
+    if timeout and previous_call_timeout is not None:
+        dbapi_connection.call_timeout = math.ceil(timeout * 1000)
+    elif timeout:
+        def expire():
+            expired.set()
+            interrupt(dbapi_connection)
+
+        timer = threading.Timer(timeout, expire)
+        timer.daemon = True
+        timer.start()
+
+    key = id(dbapi_connection)
+    with _in_flight_lock:
+        _in_flight[key] = dbapi_connection
+    try:
+        yield
+    except Exception as e:
+        timed_out = expired.is_set() or any(code in str(e) for code in TIMEOUT_ERRORS)
+        if timed_out or _cancelled.is_set():
+            connection.invalidate()
+            if _cancelled.is_set():
+                raise QueryCancelled("job cancelled") from e
+            raise DeadlineExceeded("query ran past its deadline") from e
+        raise
+    finally:
+        with _in_flight_lock:
+            _in_flight.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        elif previous_call_timeout is not None and not connection.invalidated:
+            dbapi_connection.call_timeout = previous_call_timeout
@@ -0,0 +1,101 @@
+# ======================================================================================================================
+# import standard library packages
+# ----------------------------------------------------------------------------------------------------------------------
+import time
+import threading
+
+# ======================================================================================================================
+# import dash library packages
+# ----------------------------------------------------------------------------------------------------------------------
+from dash import Input, Output, callback
+
+# ======================================================================================================================
+# import local packages
+# ----------------------------------------------------------------------------------------------------------------------
+from pages.utils import cfg, db_query, engine
+from pages.queries import QUERIES
+
+
+# -- dimension queries -------------------------------------------------------------------------------------------------
+# name -> (query, column holding the option values)
+DIMENSIONS = {
+    "listing_cities": (QUERIES["dimension.listing_cities"], "city"),
+    "review_cities": (QUERIES["dimension.review_cities"], "city"),
+    "review_countries": (QUERIES["dimension.review_countries"], "country"),
+    "review_years": (QUERIES["dimension.review_years"], "year"),
+}
+
+# dropdowns whose options are filled after first paint from the dimension named in their "<id>-dimension" store
+DIMENSION_DROPDOWNS = ["city-select", "country-select", "year-select"]
+
+
+# -- dimension service -------------------------------------------------------------------------------------------------
+class DimensionService:
+    """Process-wide cache of dropdown option lists.
+
+    Lists are loaded on first use and kept for ``refresh_interval`` seconds. After that the stale list is still served
+    while a background thread reloads it, so only the very first request for a dimension waits on the database.
+    """
+
+    def __init__(self, engine, refresh_interval=3600):
+        self.engine = engine
+        self.refresh_interval = refresh_interval
+        self._values = {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    def _load(self, name):
+        query, column = DIMENSIONS[name]
+        df = db_query(self.engine, query, cache=False)
+        if df is None:
+            return None
+        values = [v.item() if hasattr(v, "item") else v for v in df[column].dropna()]
+        with self._lock:
+            self._values[name] = (values, time.time())
+        return values
+
+    def _refresh(self, name):
+        try:
+            self._load(name)
+        finally:
+            with self._lock:
+                self._refreshing.discard(name)
+
+    def get(self, name):
+        if name not in DIMENSIONS:
+            # the name is sent by the browser from the dropdown's dimension store
+            print(f"unknown dimension {name!r}")
+            return []
+        with self._lock:
+            entry = self._values.get(name)
+        if entry is None:
+            return self._load(name) or []
+
+        values, loaded = entry
+        if time.time() - loaded > self.refresh_interval:
+            with self._lock:
+                start = name not in self._refreshing
+                self._refreshing.add(name)
+            if start:
+                threading.Thread(target=self._refresh, args=(name,), daemon=True).start()
+        return values
+
+    def preload(self, names=None):
+        for name in names or DIMENSIONS:
+            self._load(name)
+
+
+dimensions = DimensionService(engine, cfg.getfloat("dimensions", "refresh_interval", fallback=3600))
+
+
+# -- option callbacks --------------------------------------------------------------------------------------------------
+def _register_options_callback(dropdown_id):
+    @callback(Output(dropdown_id, "options"),
+              Input(f"{dropdown_id}-dimension", "data"))
+    def load_options(dimension):
+        return dimensions.get(dimension)
+    return load_options
+
+
+for dropdown_id in DIMENSION_DROPDOWNS:
+    _register_options_callback(dropdown_id)
@@ -0,0 +1,84 @@
+# ======================================================================================================================
+# import non-standard library packages
+# ----------------------------------------------------------------------------------------------------------------------
+import numpy as np
+import pandas as pd
+import sqlalchemy as sa
+
+
+DEFAULT_ARRAYSIZE = 5000
+# Arrow's thread pool does not survive a fork taken while it is busy, so forked background jobs convert on one thread
+ARROW_THREADS = True
+
+
+# -- typed fetch -------------------------------------------------------------------------------------------------------
+def _arrow_fetcher(cursor):
+    # DuckDB cursors hand the result over as one Arrow table, the method was renamed in DuckDB 1.4
+    return getattr(cursor, "to_arrow_table", None) or getattr(cursor, "fetch_arrow_table", None)
+
+
+def _from_arrow(table):
+    import pyarrow as pa
+
+    # SUM/COUNT results arrive as DECIMAL, which pandas would turn into Python Decimal objects
+    for i, field in enumerate(table.schema):
+        if pa.types.is_decimal(field.type):
+            target = pa.int64() if field.type.scale == 0 and field.type.precision <= 18 else pa.float64()
+            table = table.set_column(i, field.name, table.column(i).cast(target, safe=False))
+    return table.to_pandas(use_threads=ARROW_THREADS)
+
+
+def _from_rows(cursor, columns, arraysize):
+    rows = []
+    while True:
+        batch = cursor.fetchmany(arraysize)
+        if not batch:
+            break
+        rows.extend(batch)
+    if not rows:
+        return pd.DataFrame({column: pd.Series(dtype=object) for column in columns})
+    return pd.DataFrame(dict(zip(columns, (np.array(values) for values in zip(*rows)))))
+
+
+def apply_dtypes(df, dtypes):
+    for column, dtype in (dtypes or {}).items():
+        if column in df.columns and df[column].dtype != dtype:
+            try:
+                df[column] = df[column].astype(dtype)
+            except (TypeError, ValueError):
+                # NULLs in an integer column, keep it numeric with NaN instead
+                df[column] = pd.to_numeric(df[column], errors="coerce")
+    return df
+
+
+def fetch_frame(connection, query, params=None, dtypes=None, arraysize=DEFAULT_ARRAYSIZE, arrow=True):
+    """Execute ``query`` and return its result as a typed DataFrame with lower case column names.
+
+    Results are pulled from the driver in ``arraysize`` batches straight into one array per column, or as a single
+    Arrow table where the driver offers one, instead of going through ``pd.read_sql``'s per-row object handling.
+    ``dtypes`` maps lower case column names to the dtype the caller expects. ``arrow=False`` forces the batched path.
+    """
+    if isinstance(query, str):
+        query = sa.text(query)
+    result = connection.execute(query, params or {})
+    try:
+        cursor = result.cursor
+        columns = [description[0].lower() for description in cursor.description]
+        fetch_arrow = _arrow_fetcher(cursor) if arrow else None
+        if fetch_arrow is not None:
+            df = _from_arrow(fetch_arrow())
+            df.columns = columns
+        else:
+            cursor.arraysize = arraysize
+            df = _from_rows(cursor, columns, arraysize)
+    finally:
+        result.close()
+    return apply_dtypes(df, dtypes)
+
+
+def read_frame(connection, query, params=None, dtypes=None):
+    """The ``pd.read_sql`` path, kept for comparison and as a fallback."""
+    df = pd.read_sql(query, connection, params=params)
+    # Oracle folds unquoted identifiers, the embedded backend keeps the alias case
+    df.columns = df.columns.str.lower()
+    return apply_dtypes(df, dtypes)
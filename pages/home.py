@@ -1,7 +1,7 @@
 # ======================================================================================================================
 # import standard library packages
 # ----------------------------------------------------------------------------------------------------------------------
-from copy import deepcopy
+from datetime import datetime
 
 # ======================================================================================================================
 # import dash library packages
@@ -18,10 +18,21 @@ import numpy as np
 # import local packages
 # ----------------------------------------------------------------------------------------------------------------------
 from pages.components import *
-from pages.utils import engine
+from pages.utils import cfg, engine
+from pages.tablecounts import TableCounts
 
 
 # -- helper functions --------------------------------------------------------------------------------------------------
+table_counts = TableCounts.from_config(cfg, engine)
+
+
+def format_as_of(result):
+    if None in result["counts"].values():
+        return "Counting rows"
+    if result["as_of"] is None:
+        return "Estimated from table statistics"
+    as_of = datetime.fromtimestamp(result["as_of"]).strftime("%Y-%m-%d %H:%M")
+    return f"Exact counts as of {as_of}" if result["exact"] else f"Estimated from table statistics as of {as_of}"
 
 
 # -- register page -----------------------------------------------------------------------------------------------------
@@ -29,8 +40,7 @@ page_name = "home"
 register_page(__name__, path=page_info[page_name]["href"])
 
 # -- customize simple navbar -------------------------------------------------------------------------------------------
-navbar_main = deepcopy(navbar)
-set_active(navbar_main, page_name)
+navbar_main = make_navbar(page_name)
 
 # -- layout ------------------------------------------------------------------------------------------------------------
 layout = dbc.Container(
@@ -62,7 +72,10 @@ layout = dbc.Container(
                             columns=[{"name": i, "id": i} for i in ['Data Table']],
                             data=[{'Data Table': "Loading"}],
                         ),
-                    )],
+                    ),
+                    html.Small(id='total-tuples-as-of'),
+                    # polls until the exact counts replace the estimates
+                    dcc.Interval(id='total-tuples-refresh', interval=5000)],
                 ),
                 dbc.Col(
                     html.Div(
@@ -112,23 +125,23 @@ layout = dbc.Container(
 @callback(
     Output('total-tuples-table', 'data'),
     Output('total-tuples-table', 'columns'),
+    Output('total-tuples-as-of', 'children'),
+    Output('total-tuples-refresh', 'disabled'),
     Input('total-tuples-table', 'data'),
+    Input('total-tuples-refresh', 'n_intervals'),
 )
-def update_graphs(value):
-    from pages.utils import db_query
-    table_names = ["Host", "Listing", "AirBnB", "Review", "DetailedReview"]
-    results = {"TableName": [], "TupleCount": []}
-    sum = 0
-    for table in table_names:
-        query = f"SELECT COUNT(*) AS TUPLE_COUNT FROM {table}"
-        df = db_query(engine, query)
-        count = df.tuple_count.values[0]
-        sum += count
-        results["TableName"].append(table)
-        results["TupleCount"].append(count)
+def update_graphs(value, n_intervals=None):
+    result = table_counts.get()
+    if result is None:
+        return [{'Data Table': "Unavailable"}], [{"name": 'Data Table', "id": 'Data Table'}], "", True
+    counts = result["counts"]
+    # counts still unknown show as such, the refresh interval keeps polling until they are in
+    known = None not in counts.values()
+    results = {"TableName": list(counts), "TupleCount": [count if count is not None else "unknown"
+                                                         for count in counts.values()]}
     results["TableName"].append("Total")
-    results["TupleCount"].append(sum)
+    results["TupleCount"].append(sum(counts.values()) if known else "unknown")
     df = pd.DataFrame.from_dict(results)
     data = df.to_dict('records')
     columns = [{"name": i, "id": i} for i in df.columns]
-    return data, columns
+    return data, columns, format_as_of(result), result["exact"]
@@ -1,7 +1,6 @@
 # ======================================================================================================================
 # import standard library packages
 # ----------------------------------------------------------------------------------------------------------------------
-from copy import deepcopy
 
 # ======================================================================================================================
 # import dash library packages
@@ -21,18 +20,13 @@ import numpy as np
 # import local packages
 # ----------------------------------------------------------------------------------------------------------------------
 from pages.components import *
-from pages.utils import db_query, engine
+from pages.utils import db_query, db_query_batched, engine, reuse_connection
+from pages.queries import QUERIES
+from pages.timeseries import align, decimate, period_dates
+from pages.rollups import rollups_enabled, new_hosts
 
 
 # -- helper functions --------------------------------------------------------------------------------------------------
-def get_listing_cities():
-    df = db_query(engine, """
-        SELECT City, COUNT(City) AS Count
-        FROM Listing
-        GROUP BY City
-        ORDER BY COUNT(City) DESC
-                  """)
-    return df
 
 
 # -- register page -----------------------------------------------------------------------------------------------------
@@ -40,8 +34,7 @@ page_name = "hosts"
 register_page(__name__, path=page_info[page_name]["href"])
 
 # -- customize simple navbar -------------------------------------------------------------------------------------------
-navbar_main = deepcopy(navbar)
-set_active(navbar_main, page_name)
+navbar_main = make_navbar(page_name)
 
 # -- layout ------------------------------------------------------------------------------------------------------------
 layout = dbc.Container(
@@ -77,60 +70,41 @@ layout = dbc.Container(
 
             # City Select
             html.Div("Select Cities"),
+            dcc.Store(id='city-select-dimension', data="listing_cities"),
             dcc.Dropdown(id='city-select',
-                         options=get_listing_cities().city,
+                         options=["London", "Paris"],
                          multi=True,
                          clearable=True,
                          value=["London", "Paris"]),
+            make_granularity_select(),
         ], body=True, style={"margin": '20%', "margin-top": 50, 'border-color': "#111111", 'border-style': "solid",
                              'border-width': "1px", 'border-radius': 0}),
 
     ], className="dbc", fluid=True)
 
 @callback(Output("num_host_graph", "figure"),
-        [Input("city-select", "value")]
+        [Input("city-select", "value"),
+         Input("granularity-select", "value")]
           )
-def update_graph(cities):
-    query = sa.text("""
-    WITH HostData AS (
-        SELECT 
-            H.HostID,
-            EXTRACT(YEAR FROM H.HostSince) * 100 + EXTRACT(MONTH FROM H.HostSince) AS RegistrationDate,
-            L.City
-        FROM 
-            Host H
-            INNER JOIN Listing L ON H.HostID = L.HostID
-        WHERE 
-            L.City = :CityName
-    )
-    SELECT RegistrationDate, COUNT(DISTINCT HostID) AS NumberOfHosts
-    FROM HostData
-    WHERE RegistrationDate >= EXTRACT(YEAR FROM SYSDATE) * 100 + EXTRACT(MONTH FROM SYSDATE) - 10 * 100
-    GROUP BY RegistrationDate
-    ORDER BY RegistrationDate
-    """)
-
-    dfs = []
-    for city in cities:
-        params = {"CityName": city}
-        df_city = db_query(engine, query, params)
-        df_city = pd.DataFrame({"Date": df_city.registrationdate, city: df_city.numberofhosts})
-        dfs.append(df_city)
-    df_merged = dfs[0]
-    for df_ in dfs[1:]:
-        df_merged = df_merged.merge(df_, on="Date", how="outer")
-
-    fig = px.line(data_frame=df_merged,
-                      y=cities,
-                      title="Number of New Hosts per Month")
-    tick_locs = np.where(df_merged.Date.astype(str).str.endswith(("01", "04", "07")))[0]
-    tick_text = [f"{v[0:4]}-{v[4:]}" for v in df_merged.Date.astype(str).values[tick_locs]]
+@reuse_connection
+def update_graph(cities, granularity="month"):
+    if rollups_enabled() and granularity == "month":
+        df = new_hosts(cities, years=10)
+        df = df.assign(bucketstart=period_dates(df.registrationdate))
+    else:
+        df = db_query_batched(engine, QUERIES[f"hosts.new_hosts.{granularity}"], "CityNames", cities,
+                              {"NumberOfYears": 10}, key_column="city")
+    # periods without a registration had no new hosts
+    df_merged = align(df, "city", "bucketstart", "numberofhosts", cities, fill_value=0, granularity=granularity)
+
+    fig = px.line(data_frame=decimate(df_merged, MAX_POINTS, DOWNSAMPLE_METHOD),
+                      x="Date",
+                      y="value",
+                      color="variable",
+                      title=f"Number of New Hosts per {granularity.title()}")
     fig.update_layout(template="plotly_dark",
                       showlegend=True,
                       xaxis={'title': "Date",
-                             'tickmode': 'array',
-                             'tickvals': tick_locs,
-                             'ticktext': tick_text,
                              'tickangle': 45},
                       yaxis={'title': f"Number of New Hosts", 'tickformat': "s%"},
                       )
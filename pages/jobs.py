@@ -0,0 +1,130 @@
+# ======================================================================================================================
+# import standard library packages
+# ----------------------------------------------------------------------------------------------------------------------
+import os
+import uuid
+import signal
+import threading
+from pathlib import Path
+
+# ======================================================================================================================
+# import dash library packages
+# ----------------------------------------------------------------------------------------------------------------------
+from dash import DiskcacheManager
+
+# ======================================================================================================================
+# import local packages
+# ----------------------------------------------------------------------------------------------------------------------
+from pages import deadlines, fetch
+from pages.utils import after_fork
+
+
+# -- job processes -----------------------------------------------------------------------------------------------------
+def _cancel_on_sigterm(grace, timeout):
+    # a Python signal handler only runs once the main thread is back in the interpreter, not while it waits in the
+    # driver, so SIGTERM is blocked here and taken by a thread that cancels the queries and then ends the process
+    signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGTERM})
+
+    def watch():
+        if timeout:
+            if signal.sigtimedwait({signal.SIGTERM}, timeout) is None:
+                # the renderer stops polling for a job that ended without a result and keeps the previous figure
+                print(f"background job {os.getpid()} ran past {timeout}s, ending it")
+        else:
+            signal.sigwait({signal.SIGTERM})
+        deadlines.cancel_in_flight()
+        deadlines.drain(grace)
+        os._exit(0)
+
+    threading.Thread(target=watch, name="job-cancel", daemon=True).start()
+
+
+def _reap(job):
+    # a finished job is a zombie until reaped, which psutil refuses to list the children of
+    try:
+        os.waitpid(int(job), os.WNOHANG)
+    except ChildProcessError:
+        pass
+
+
+class CancellingDiskcacheManager(DiskcacheManager):
+    """Background callback manager running each job in a forked process that cancels its query when superseded.
+
+    When a newer input arrives while a job is still running, dash-renderer sends the old job along and Dash terminates
+    it. Instead of killing the process outright, it gets SIGTERM and ``cancel_grace`` seconds to cancel its in-flight
+    query, so the database stops working on a result nobody will see; only then is it killed. A job still
+    running after ``timeout`` seconds, for instance one forked while another thread held a lock it needs, ends itself.
+    """
+
+    def __init__(self, cache, expire=None, cancel_grace=2.0, timeout=None):
+        super().__init__(cache, expire=expire)
+        self.cancel_grace = cancel_grace
+        self.timeout = timeout
+        self._running_at_read = set()
+
+    def build_cache_key(self, fn, args, cache_args_to_ignore):
+        # a result is deleted once the request that started its job has read it, so clients asking for the same
+        # selection at the same time each need their own entry
+        return f"{super().build_cache_key(fn, args, cache_args_to_ignore)}-{uuid.uuid4().hex}"
+
+    def call_job_fn(self, key, job_fn, args, context):
+        grace, timeout = self.cancel_grace, self.timeout
+
+        def run_job(*job_args):
+            # the forked job must not share the parent's pooled connections and query threads
+            after_fork()
+            fetch.ARROW_THREADS = False
+            _cancel_on_sigterm(grace, timeout)
+            job_fn(*job_args)
+
+        return super().call_job_fn(key, run_job, args, context)
+
+    def get_result(self, key, job):
+        # Dash asks whether the job still runs only after finding no result, so a job storing its result and exiting
+        # in between would count as cancelled; one that was running when its result was read is reported as running
+        # once more and its result picked up by the next poll
+        running = bool(job) and super().job_running(job)
+        result = super().get_result(key, job)
+        if result is self.UNDEFINED and running:
+            self._running_at_read.add(int(job))
+        return result
+
+    def job_running(self, job):
+        if job and int(job) in self._running_at_read:
+            self._running_at_read.discard(int(job))
+            return True
+        return super().job_running(job)
+
+    def terminate_job(self, job):
+        if job is None:
+            return
+        if not self.job_running(job):
+            _reap(job)
+            return
+        try:
+            os.kill(int(job), signal.SIGTERM)
+        except ProcessLookupError:
+            return
+        # the job cancels its query and exits by itself within cancel_grace, the request that superseded it does not
+        # wait for that; a timer kills it if it did not
+        timer = threading.Timer(self.cancel_grace, self._kill, args=(job,))
+        timer.daemon = True
+        timer.start()
+
+    def _kill(self, job):
+        if DiskcacheManager.job_running(self, job):
+            super().terminate_job(job)
+        _reap(job)
+
+
+def create_background_manager(cfg):
+    import diskcache
+
+    path = Path(cfg.get("background", "dir", fallback=".cache/jobs"))
+    if not path.is_absolute():
+        path = Path(os.path.dirname(os.path.abspath(__file__))).parent/path
+    path.mkdir(parents=True, exist_ok=True)
+    return CancellingDiskcacheManager(diskcache.Cache(str(path)),
+                                      expire=cfg.getint("background", "expire", fallback=600),
+                                      cancel_grace=cfg.getfloat("background", "cancel_grace", fallback=2),
+                                      timeout=cfg.getfloat("background", "timeout", fallback=0) or None)
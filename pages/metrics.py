@@ -0,0 +1,206 @@
+# ======================================================================================================================
+# import standard library packages
+# ----------------------------------------------------------------------------------------------------------------------
+import time
+import threading
+from bisect import bisect_left
+from contextvars import ContextVar
+
+
+# -- buckets -----------------------------------------------------------------------------------------------------------
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (1_000, 10_000, 50_000, 100_000, 250_000, 500_000, 1_000_000, 5_000_000, 25_000_000)
+
+
+# -- sharded series ----------------------------------------------------------------------------------------------------
+class _Metric:
+    """A labelled metric whose writers never take a lock.
+
+    Every thread increments its own shard, so a write is a couple of list stores without contention. The scrape sums
+    the shards; shards of threads that have exited are folded into a retired total so the dev server's thread per
+    request does not grow the shard table without bound.
+    """
+
+    kind = None
+
+    def __init__(self, name, help, label, width):
+        self.name = name
+        self.help = help
+        self.label = label
+        self.width = width
+        self._local = threading.local()
+        self._shards = {}
+        self._retired = {}
+        self._collect_lock = threading.Lock()
+
+    def _series(self, label_value):
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = {}
+            self._shards[id(shard)] = (threading.current_thread(), shard)
+        series = shard.get(label_value)
+        if series is None:
+            series = shard[label_value] = [0] * self.width
+        return series
+
+    def collect(self):
+        with self._collect_lock:
+            totals = {label_value: list(series) for label_value, series in self._retired.items()}
+            for key, (thread, shard) in list(self._shards.items()):
+                alive = thread.is_alive()
+                for label_value, series in list(shard.items()):
+                    target = totals.setdefault(label_value, [0] * self.width)
+                    for i, value in enumerate(series):
+                        target[i] += value
+                    if not alive:
+                        retired = self._retired.setdefault(label_value, [0] * self.width)
+                        for i, value in enumerate(series):
+                            retired[i] += value
+                if not alive:
+                    self._shards.pop(key, None)
+        return totals
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for label_value, series in sorted(self.collect().items()):
+            lines.extend(self._render_series(f'{self.label}="{_escape(label_value)}"', series))
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, help, label):
+        super().__init__(name, help, label, 1)
+
+    def inc(self, label_value, amount=1):
+        self._series(label_value)[0] += amount
+
+    def _render_series(self, labels, series):
+        return [f"{self.name}{{{labels}}} {series[0]}"]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, label, buckets=LATENCY_BUCKETS):
+        # one slot per bucket, one for +Inf, then sum and count
+        super().__init__(name, help, label, len(buckets) + 3)
+        self.buckets = buckets
+
+    def observe(self, label_value, value):
+        series = self._series(label_value)
+        series[bisect_left(self.buckets, value)] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def _render_series(self, labels, series):
+        lines = []
+        cumulative = 0
+        for bound, count in zip((*self.buckets, "+Inf"), series):
+            cumulative += count
+            lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f"{self.name}_sum{{{labels}}} {series[-2]}")
+        lines.append(f"{self.name}_count{{{labels}}} {series[-1]}")
+        return lines
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# -- app metrics -------------------------------------------------------------------------------------------------------
+callback_seconds = Histogram("trendbnb_callback_duration_seconds", "Dash callback request latency.", "callback")
+figure_seconds = Histogram("trendbnb_figure_build_seconds",
+                           "Callback time spent outside database queries, i.e. shaping and figure construction.",
+                           "callback")
+payload_bytes = Histogram("trendbnb_callback_response_bytes", "Dash callback response payload size.", "callback",
+                          SIZE_BUCKETS)
+query_seconds = Histogram("trendbnb_query_duration_seconds", "Database query latency, cache misses only.", "query")
+query_rows = Counter("trendbnb_query_rows_total", "Rows returned by database queries.", "query")
+query_bytes = Counter("trendbnb_query_bytes_total", "In-memory size of the frames fetched by database queries.",
+                      "query")
+query_errors = Counter("trendbnb_query_errors_total", "Database queries that raised an error.", "query")
+
+METRICS = [callback_seconds, figure_seconds, payload_bytes, query_seconds, query_rows, query_bytes, query_errors]
+
+# name prefix -> function returning a flat dict of numbers, read at scrape time
+GAUGES = {}
+
+
+def register_gauges(prefix, func):
+    GAUGES[prefix] = func
+
+
+# -- callback scope ----------------------------------------------------------------------------------------------------
+# [callback label, start time, seconds spent in queries] for the callback handled by the current request
+_active_callback = ContextVar("active_callback", default=None)
+
+
+def callback_label(func):
+    module = func.__module__.rsplit(".", 1)[-1]
+    return f"{module}.{func.__name__}"
+
+
+def current_callback():
+    state = _active_callback.get()
+    return state[0] if state is not None else None
+
+
+def start_callback(label):
+    return _active_callback.set([label, time.perf_counter(), 0.0])
+
+
+def finish_callback(token, payload_size):
+    state = _active_callback.get()
+    _active_callback.reset(token)
+    if state is None:
+        return
+    label, start, query_time = state
+    elapsed = time.perf_counter() - start
+    callback_seconds.observe(label, elapsed)
+    figure_seconds.observe(label, max(elapsed - query_time, 0.0))
+    if payload_size is not None:
+        payload_bytes.observe(label, payload_size)
+
+
+def discard_callback(token):
+    """End the callback scope without recording it, for a request answered without running the callback."""
+    _active_callback.reset(token)
+
+
+def query_time():
+    """Seconds the callback handled by the current request has spent in queries so far."""
+    state = _active_callback.get()
+    return state[2] if state is not None else 0.0
+
+
+def add_query_time(seconds):
+    state = _active_callback.get()
+    if state is not None:
+        state[2] += seconds
+
+
+def observe_query(name, seconds, rows=0, size=0, failed=False):
+    add_query_time(seconds)
+    if failed:
+        query_errors.inc(name)
+        return
+    query_seconds.observe(name, seconds)
+    query_rows.inc(name, rows)
+    query_bytes.inc(name, size)
+
+
+# -- exposition --------------------------------------------------------------------------------------------------------
+def render():
+    """Return every metric in the Prometheus text exposition format."""
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    for prefix, func in GAUGES.items():
+        for key, value in func().items():
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            lines.append(f"# TYPE {prefix}_{key} gauge")
+            lines.append(f"{prefix}_{key} {value}")
+    return "\n".join(lines) + "\n"
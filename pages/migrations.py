@@ -0,0 +1,263 @@
+# ======================================================================================================================
+# import standard library packages
+# ----------------------------------------------------------------------------------------------------------------------
+import time
+import statistics
+from datetime import datetime
+
+# ======================================================================================================================
+# import non-standard library packages
+# ----------------------------------------------------------------------------------------------------------------------
+import sqlalchemy as sa
+
+# ======================================================================================================================
+# import local packages
+# ----------------------------------------------------------------------------------------------------------------------
+from pages.utils import cfg as app_cfg, db_query
+from pages.queries import DB_OWNER, LISTING_RATING_TABLE, LISTING_RATINGS, QUERIES
+
+
+# -- schema objects ----------------------------------------------------------------------------------------------------
+class Index:
+    """An index created under ``name`` unless the table's owner already has an index by that name.
+
+    ``columns`` are column names or expressions, which make it a function-based index. ``compress`` is the number of
+    leading columns whose repeated values Oracle stores once per leaf block. The index is created in the schema owning
+    the table, which the pages address both by name and through ``DB_OWNER``.
+    """
+
+    def __init__(self, name, table, columns, compress=None):
+        self.name = name
+        self.table = table
+        self.columns = list(columns)
+        self.compress = compress
+
+    def sql(self, owner):
+        columns = ", ".join(self.columns)
+        compress = f" COMPRESS {self.compress}" if self.compress else ""
+        return f'CREATE INDEX "{owner}".{self.name} ON "{owner}".{self.table} ({columns}){compress}'
+
+    def exists(self, connection, owner):
+        # looked up by name in the catalog, SQLAlchemy's inspector does not list every function-based index
+        return connection.execute(sa.text("SELECT COUNT(*) FROM ALL_INDEXES "
+                                          "WHERE OWNER = :Owner AND INDEX_NAME = :IndexName"),
+                                  {"Owner": owner, "IndexName": self.name.upper()}).scalar() > 0
+
+    def apply(self, connection, owner):
+        if self.exists(connection, owner):
+            return "exists"
+        try:
+            connection.execute(sa.text(self.sql(owner)))
+        except sa.exc.DatabaseError as e:
+            # ORA-01408: someone indexed the same column list by hand under another name, which serves just as well
+            if "ORA-01408" not in str(e):
+                raise
+            return "indexed under another name"
+        return "created"
+
+    def __repr__(self):
+        return f"Index({self.name!r} on {self.table})"
+
+
+class GatherStats:
+    """Refresh the optimizer statistics of a table, including the hidden columns behind function-based indexes."""
+
+    def __init__(self, table):
+        self.table = table
+
+    def sql(self, owner):
+        return (f"BEGIN DBMS_STATS.GATHER_TABLE_STATS('{owner}', '{self.table.upper()}', "
+                f"method_opt => 'FOR ALL HIDDEN COLUMNS SIZE AUTO'); END;")
+
+    def apply(self, connection, owner):
+        connection.execute(sa.text(self.sql(owner)))
+        return "gathered"
+
+    def __repr__(self):
+        return f"GatherStats({self.table})"
+
+
+class SummaryTable:
+    """A table filled from ``query`` with ``key`` as its primary key, created unless the owner already has it.
+
+    rollup-build refreshes it later on, creating it here lets the page queries joining it run right after a deploy.
+    """
+
+    def __init__(self, name, query, key):
+        self.name = name
+        self.query = query
+        self.key = key
+
+    def statements(self, owner):
+        return [f'CREATE TABLE "{owner}".{self.name} AS {" ".join(self.query.split())}',
+                f'ALTER TABLE "{owner}".{self.name} ADD CONSTRAINT {self.name}_PK PRIMARY KEY ({self.key})']
+
+    def sql(self, owner):
+        return ";\n    ".join(self.statements(owner))
+
+    def exists(self, connection, owner):
+        return connection.execute(sa.text("SELECT COUNT(*) FROM ALL_TABLES "
+                                          "WHERE OWNER = :Owner AND TABLE_NAME = :TableName"),
+                                  {"Owner": owner, "TableName": self.name.upper()}).scalar() > 0
+
+    def apply(self, connection, owner):
+        if self.exists(connection, owner):
+            return "exists"
+        for statement in self.statements(owner):
+            connection.execute(sa.text(statement))
+        return "created"
+
+    def __repr__(self):
+        return f"SummaryTable({self.name})"
+
+
+class Migration:
+    def __init__(self, version, name, steps):
+        self.version = version
+        self.name = name
+        self.steps = steps
+
+
+# -- migrations --------------------------------------------------------------------------------------------------------
+# Append new versions at the end and never edit an applied one, the schema records each version once it has run.
+MIGRATIONS = [
+    Migration(1, "listing and review join paths", [
+        # every city filtered page starts from the listings of a few cities and joins their reviews, both scanned
+        # from the index alone; cities repeat on every entry, so they are stored once per leaf block
+        Index("Listing_City_ID_IX", "Listing", ["City", "ListingID"], compress=1),
+        Index("Review_Listing_Date_IX", "Review", ["ListingID", "ReviewDate"], compress=1),
+        # the new hosts chart ranges over the registration date and joins Listing on HostID, both read from the index
+        Index("Host_Since_IX", "Host", ["HostSince", "HostID"]),
+    ]),
+    Migration(2, "covering indexes for the rating and price aggregates", [
+        # the rating summary groups DetailedReview by listing, which a fast full scan of
+        # this index answers without reading the table
+        Index("DetailedReview_Ratings_IX", "DetailedReview", ["ListingID", "Rating", "Cleanliness"], compress=1),
+        # the price change chart buckets a city's listings by first review month and averages their price
+        Index("Listing_City_Price_IX", "Listing", ["City", "FirstReview", "DailyPrice"], compress=1),
+        # the cleanliness chart buckets a country's listings by the year of their first review
+        Index("Listing_Country_Review_IX", "Listing", ["Country", "FirstReview", "LastReview", "ListingID"],
+              compress=1),
+    ]),
+    # the hosts and reviews charts bucket with TRUNC(date, mask) only in the select list and GROUP BY, their filters
+    # compare the bare dates; the (ListingID, ReviewDate) and (HostSince, HostID) indexes already hold those dates,
+    # so the buckets are computed from the index without reading the tables, and one index per mask would only slow
+    # down loading. The review year is different: seasonality and popularity filter on the expression itself.
+    Migration(3, "review years", [
+        # seasonality and popularity filter on the review year and the year dropdown lists the distinct ones, an
+        # index on the expression lets Oracle match the predicate instead of computing it for every review
+        Index("Review_Year_IX", "Review", ["EXTRACT(YEAR FROM ReviewDate)", "ListingID"], compress=1),
+        GatherStats("Review"),
+    ]),
+    Migration(4, "listing rating summary", [
+        # the review scores chart and the review city and country dropdowns join the one-row-per-listing rating
+        # summary, which has to exist before they run; rollup-build keeps it up to date from then on
+        SummaryTable(LISTING_RATING_TABLE, LISTING_RATINGS, "ListingID"),
+        GatherStats(LISTING_RATING_TABLE),
+    ]),
+]
+
+
+# -- migration table ---------------------------------------------------------------------------------------------------
+def migration_table(cfg=None):
+    cfg = cfg or app_cfg
+    return sa.Table(cfg.get("migrations", "table", fallback="trendbnb_migrations"), sa.MetaData(),
+                    sa.Column("version", sa.Integer, primary_key=True),
+                    sa.Column("name", sa.String(200), nullable=False),
+                    sa.Column("applied_at", sa.DateTime, nullable=False),
+                    sa.Column("seconds", sa.Float))
+
+
+def applied_versions(engine, table):
+    with engine.connect() as connection:
+        if not sa.inspect(connection).has_table(table.name):
+            return set()
+        return {row.version for row in connection.execute(sa.select(table.c.version))}
+
+
+def pending_migrations(engine, cfg=None):
+    applied = applied_versions(engine, migration_table(cfg))
+    return [migration for migration in MIGRATIONS if migration.version not in applied]
+
+
+# -- timings -----------------------------------------------------------------------------------------------------------
+# page queries run before and after migrating, with the selections the pages open with
+TIMED_QUERIES = {
+    "hosts.new_hosts.month": {"CityNames": ["London", "Paris"], "NumberOfYears": 10},
+    "reviews.review_scores.month": {"CityNames": ["Paris", "Brooklyn"], "NumberOfYears": 15},
+    "seasonality.review_counts": {"CityNames": ["Paris", "Brooklyn"], "Years": [2020, 2021]},
+    "cleanliness.cleanliness_change": {"CountryNames": ["France", "United States"]},
+    "popularity.reviews.year": {"CityName": "Paris", "NumberOfYears": 5},
+    "avgPerYear.price_change": {"CityName": "Paris"},
+    "dimension.review_years": None,
+}
+
+
+def time_queries(engine, repeat=3):
+    """Return the median seconds of each timed query over ``repeat`` runs, after one run that fills the buffers."""
+    timings = {}
+    for name, params in TIMED_QUERIES.items():
+        seconds = []
+        for i in range(max(repeat, 1) + 1):
+            start = time.perf_counter()
+            if db_query(engine, QUERIES[name], params, cache=False) is None:
+                seconds = None
+                break
+            seconds.append(time.perf_counter() - start)
+        timings[name] = round(statistics.median(seconds[1:]), 3) if seconds else None
+    return timings
+
+
+# -- migrate -----------------------------------------------------------------------------------------------------------
+def migrate(engine, cfg=None, dry_run=False, timings=True, verbose=True):
+    """Apply the pending migrations in version order and return what ran, with the query timings around them.
+
+    Safe to run again at any time: applied versions are recorded in the migration table, and an index that already
+    exists, because an earlier run stopped halfway or it was created by hand, is left as it is.
+    """
+    cfg = cfg or app_cfg
+    log = print if verbose else (lambda *args: None)
+    if engine.dialect.name != "oracle":
+        # the DuckDB backend reads views over the Parquet snapshot, which has no indexes to create
+        log(f"nothing to migrate on the {engine.dialect.name} backend")
+        return {"applied": [], "pending": []}
+
+    table = migration_table(cfg)
+    owner = cfg.get("migrations", "owner", fallback=DB_OWNER)
+    pending = pending_migrations(engine, cfg)
+    report = {"applied": [], "pending": [f"{migration.version}: {migration.name}" for migration in pending]}
+    if not pending:
+        log("schema is up to date")
+        return report
+    if dry_run:
+        for migration in pending:
+            log(f"{migration.version}: {migration.name}")
+            for step in migration.steps:
+                log(f"    {step.sql(owner)}")
+        return report
+
+    repeat = cfg.getint("migrations", "timing_repeat", fallback=3)
+    if timings:
+        report["before"] = time_queries(engine, repeat)
+    table.create(engine, checkfirst=True)
+    for migration in pending:
+        start = time.perf_counter()
+        # Oracle commits around every DDL statement, so a failed migration is not recorded and reruns from the
+        # start, skipping the indexes it already created
+        with engine.begin() as connection:
+            steps = {repr(step): step.apply(connection, owner) for step in migration.steps}
+            seconds = round(time.perf_counter() - start, 3)
+            connection.execute(table.insert().values(version=migration.version, name=migration.name,
+                                                     applied_at=datetime.now(), seconds=seconds))
+        report["applied"].append({"version": migration.version, "name": migration.name, "seconds": seconds,
+                                  "steps": steps})
+        log(f"{migration.version}: {migration.name} in {seconds}s")
+        for step, outcome in steps.items():
+            log(f"    {step}: {outcome}")
+    if timings:
+        report["after"] = time_queries(engine, repeat)
+        log(f"\n{'query':<40}{'before s':>10}{'after s':>10}")
+        for name in TIMED_QUERIES:
+            before, after = report["before"][name], report["after"][name]
+            log(f"{name:<40}{before if before is not None else '-':>10}{after if after is not None else '-':>10}")
+    return report
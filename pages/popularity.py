@@ -1,7 +1,6 @@
 # ======================================================================================================================
 # import standard library packages
 # ----------------------------------------------------------------------------------------------------------------------
-from copy import deepcopy
 
 # ======================================================================================================================
 # import dash library packages
@@ -10,49 +9,27 @@ from dash import register_page, html, dcc, Input, Output, State, callback
 import dash_bootstrap_components as dbc
 import plotly.graph_objs as go
 
+# ======================================================================================================================
+# import non-standard library packages
+# ----------------------------------------------------------------------------------------------------------------------
+import pandas as pd
+
 # ======================================================================================================================
 # import local packages
 # ----------------------------------------------------------------------------------------------------------------------
 from pages.components import *
 from pages.utils import db_query, engine  # Import engine
+from pages.queries import QUERIES
+from pages.rollups import rollups_enabled, yearly_reviews
+from pages.timeseries import align, decimate
 
 # Page Configurations
 page_name = "popularity"
-db_owner = "ANDREW.GOLDSTEIN"
-
-# ======================================================================================================================
-# Query Definition
-# ----------------------------------------------------------------------------------------------------------------------
-def popListOverTime(city: str, years: int) -> str:
-    return f'''
-    WITH ReviewCountData AS (
-        SELECT 
-            L.City,
-            EXTRACT(YEAR FROM R.ReviewDate) AS ReviewYear,
-            COUNT(R.ReviewID) AS ReviewCount
-        FROM 
-            "{db_owner}".Review R
-            INNER JOIN "{db_owner}".Listing L ON R.ListingID = L.ListingID
-        WHERE 
-            L.City = '{city}'
-            AND R.ReviewDate >= L.FirstReview
-            AND EXTRACT(YEAR FROM R.ReviewDate) >= EXTRACT(YEAR FROM SYSDATE) - {years}
-        GROUP BY 
-            L.City, EXTRACT(YEAR FROM R.ReviewDate)
-    )
-    SELECT 
-        ReviewYear, 
-        SUM(ReviewCount) AS TotalReviews
-    FROM ReviewCountData
-    GROUP BY ReviewYear
-    ORDER BY ReviewYear
-    '''
 
 # ======================================================================================================================
 # Layout with User Input
 # ----------------------------------------------------------------------------------------------------------------------
-navbar_main = deepcopy(navbar)
-set_active(navbar_main, page_name)
+navbar_main = make_navbar(page_name)
 
 layout = dbc.Container(
     [
@@ -111,6 +88,7 @@ layout = dbc.Container(
                         ],
                         style={"margin-bottom": "20px", "justify-content": "center"},
                     ),
+                    make_granularity_select("year"),
                     dcc.Graph(id="popularity_graph"),
                 ],
             ),
@@ -126,22 +104,29 @@ layout = dbc.Container(
 # ----------------------------------------------------------------------------------------------------------------------
 @callback(
     Output("popularity_graph", "figure"),
-    [Input("search_button", "n_clicks")],
+    [Input("search_button", "n_clicks"), Input("granularity-select", "value")],
     [State("city_input", "value"), State("year_dropdown", "value")]
 )
-def update_popularity_graph(n_clicks, selected_city, selected_years):
+def update_popularity_graph(n_clicks, granularity, selected_city, selected_years):
     if not selected_city:
         selected_city = "Paris"  # Default city
     if not selected_years:
         selected_years = 5  # Default years
-    query = popListOverTime(selected_city, selected_years)
-    query_results = db_query(engine, query)  # Use engine in db_query
+    granularity = granularity or "year"
+    if rollups_enabled() and granularity == "year":
+        query_results = yearly_reviews(selected_city, selected_years)
+        query_results = query_results.assign(bucketstart=pd.to_datetime(query_results.reviewyear.astype(str), format="%Y"))
+    else:
+        query_results = db_query(engine, QUERIES[f"popularity.reviews.{granularity}"],
+                                 {"CityName": selected_city, "NumberOfYears": int(selected_years)})
 
     if query_results is not None and not query_results.empty:
-        query_results["reviewyear"] = query_results["reviewyear"].astype(int)
-        query_results["totalreviews"] = query_results["totalreviews"].astype(int)
-        x = query_results["reviewyear"].tolist()
-        y = query_results["totalreviews"].tolist()
+        # periods without a review count as zero
+        series = align(query_results.assign(city=selected_city), "city", "bucketstart", "totalreviews",
+                       fill_value=0, granularity=granularity)
+        points = decimate(series, MAX_POINTS, DOWNSAMPLE_METHOD)
+        x = points["Date"].tolist()
+        y = points["value"].astype(int).tolist()
     else:
         x, y = [], []
 
@@ -152,14 +137,14 @@ def update_popularity_graph(n_clicks, selected_city, selected_years):
             go.Scatter(
                 x=x,
                 y=y,
-                mode="lines+markers",
+                mode="lines+markers" if len(x) <= 100 else "lines",
                 line=dict(color="royalblue", width=2),
                 marker=dict(size=6, color="darkblue"),
             )
         )
         fig.update_layout(
             title=f"Popularity of Listings Over Time in {selected_city} ({selected_years} years)",
-            xaxis=dict(title="Year", tickmode="linear", dtick=1),
+            xaxis=dict(title="Year", dtick="M12", tickformat="%Y") if granularity == "year" else dict(title="Date"),
             yaxis=dict(title="Total Reviews", rangemode="tozero"),
             template="plotly_dark",
             margin=dict(l=20, r=20, t=40, b=20),
@@ -0,0 +1,274 @@
+# ======================================================================================================================
+# import standard library packages
+# ----------------------------------------------------------------------------------------------------------------------
+import hashlib
+
+# ======================================================================================================================
+# import non-standard library packages
+# ----------------------------------------------------------------------------------------------------------------------
+import sqlalchemy as sa
+
+# ======================================================================================================================
+# import local packages
+# ----------------------------------------------------------------------------------------------------------------------
+from pages.cache import normalize_sql
+
+
+# -- registry ----------------------------------------------------------------------------------------------------------
+class NamedQuery:
+    """A page query with bind variables only, compiled into one reusable statement.
+
+    The same statement text is sent for every selection, so Oracle shares the cursor and the driver's statement cache
+    hits instead of hard parsing each city. ``fingerprint`` is a hash of the normalized SQL: it stays the same across
+    restarts and changes only when the query does, which makes it the key for result caching and plan checks.
+    """
+
+    def __init__(self, name, sql, expanding=(), dtypes=None):
+        self.name = name
+        self.sql = sql
+        self.expanding = tuple(expanding)
+        # lower case column name -> dtype the page expects, applied when the rows are fetched
+        self.dtypes = dict(dtypes or {})
+        self.fingerprint = hashlib.sha1(normalize_sql(sql).encode()).hexdigest()[:16]
+        statement = sa.text(sql)
+        if self.expanding:
+            statement = statement.bindparams(*[sa.bindparam(param, expanding=True) for param in self.expanding])
+        self.statement = statement
+
+    def __repr__(self):
+        return f"NamedQuery({self.name!r}, fingerprint={self.fingerprint!r})"
+
+
+QUERIES = {}
+
+
+def register(name, sql, expanding=(), dtypes=None):
+    QUERIES[name] = NamedQuery(name, sql, expanding, dtypes)
+    return QUERIES[name]
+
+
+def get_query_info():
+    return {name: {"fingerprint": query.fingerprint, "expanding": list(query.expanding), "dtypes": query.dtypes,
+                   "sql": normalize_sql(query.sql)}
+            for name, query in QUERIES.items()}
+
+
+# -- shared fragments --------------------------------------------------------------------------------------------------
+# DetailedReview holds several rows per listing and Review only links to it through ListingID, so joining the two
+# directly yields reviews x detailed reviews rows per listing. Queries join this one-row-per-listing summary instead,
+# which migrate creates as the ListingRating table and rollup-build refreshes, so no page query aggregates
+# DetailedReview again.
+LISTING_RATING_TABLE = "ListingRating"
+LISTING_RATINGS = """
+        SELECT
+            ListingID,
+            SUM(Rating) AS RatingSum,
+            COUNT(Rating) AS RatingCount,
+            SUM(Cleanliness) AS CleanSum,
+            COUNT(Cleanliness) AS CleanCount
+        FROM DetailedReview
+        GROUP BY ListingID
+        """
+
+DB_OWNER = "ANDREW.GOLDSTEIN"
+
+
+# -- page queries ------------------------------------------------------------------------------------------------------
+# chart granularity -> Oracle date mask, TRUNC(date, mask) returns the start of the day, ISO week, month or year
+GRANULARITY_MASKS = {"day": "DD", "week": "IW", "month": "MM", "year": "YYYY"}
+
+
+def register_bucketed(name, sql, expanding=(), dtypes=None):
+    """Register ``sql`` once per granularity as ``<name>.<granularity>`` with ``{mask}`` filled in.
+
+    The mask is part of the statement text rather than a bind variable so every granularity gets its own plan and
+    ``GROUP BY`` matches the select list exactly.
+    """
+    for granularity, mask in GRANULARITY_MASKS.items():
+        register(f"{name}.{granularity}", sql.format(mask=mask), expanding, dtypes)
+
+
+register_bucketed("hosts.new_hosts", """
+    WITH HostData AS (
+        SELECT
+            H.HostID,
+            TRUNC(H.HostSince, '{mask}') AS BucketStart,
+            L.City
+        FROM
+            Host H
+            INNER JOIN Listing L ON H.HostID = L.HostID
+        WHERE
+            L.City IN :CityNames
+            AND H.HostSince >= ADD_MONTHS(TRUNC(SYSDATE, 'MM'), -12 * :NumberOfYears)
+    )
+    SELECT City, BucketStart, COUNT(DISTINCT HostID) AS NumberOfHosts
+    FROM HostData
+    GROUP BY City, BucketStart
+    ORDER BY BucketStart
+    """, expanding=["CityNames"], dtypes={"bucketstart": "datetime64[ns]", "numberofhosts": "int64"})
+
+# one row per reviewed listing and bucket, joined to the listing's rating summary
+register_bucketed("reviews.review_scores", f"""
+    WITH ReviewData AS (
+        SELECT DISTINCT
+            L.City,
+            L.ListingID,
+            TRUNC(R.ReviewDate, '{{mask}}') AS BucketStart
+        FROM
+            Listing L
+            INNER JOIN Review R ON L.ListingID = R.ListingID
+        WHERE
+            L.City IN :CityNames
+            AND R.ReviewDate >= ADD_MONTHS(TRUNC(SYSDATE, 'MM'), -12 * :NumberOfYears)
+    )
+    SELECT RD.City, RD.BucketStart, SUM(LR.RatingSum) / SUM(LR.RatingCount) AS AvgReviewScore
+    FROM ReviewData RD
+    INNER JOIN ListingRating LR ON RD.ListingID = LR.ListingID
+    WHERE LR.RatingCount > 0
+    GROUP BY RD.City, RD.BucketStart
+    ORDER BY RD.BucketStart""", expanding=["CityNames"],
+    dtypes={"bucketstart": "datetime64[ns]", "avgreviewscore": "float64"})
+
+register("seasonality.review_counts", """
+    SELECT
+        L.City,
+        EXTRACT(YEAR FROM R.ReviewDate) AS ReviewYear,
+        EXTRACT(MONTH FROM R.ReviewDate) AS ReviewMonth,
+        COUNT(R.ReviewID) AS ReviewCount
+    FROM
+        Review R
+        INNER JOIN Listing L ON R.ListingID = L.ListingID
+    WHERE
+        L.City IN :CityNames
+        AND EXTRACT(YEAR FROM R.ReviewDate) IN :Years
+    GROUP BY
+        L.City, EXTRACT(YEAR FROM R.ReviewDate), EXTRACT(MONTH FROM R.ReviewDate)
+    """, expanding=["CityNames", "Years"],
+    dtypes={"reviewyear": "int64", "reviewmonth": "int64", "reviewcount": "int64"})
+
+register("cleanliness.cleanliness_change", f""" WITH CleanYears AS(
+                    SELECT Country, EXTRACT(YEAR FROM l.FirstReview) AS Year, AVG(d.Cleanliness) AS CleanAvg
+                    FROM "{DB_OWNER}".Listing l
+                    JOIN "{DB_OWNER}".DetailedReview d ON l.ListingID=d.ListingID
+                    WHERE Country IN :CountryNames AND d.Cleanliness IS NOT NULL AND l.LastReview IS NOT NULL
+                    GROUP BY Country, EXTRACT(YEAR FROM l.FirstReview)),
+
+                    CleanChange AS(
+                    SELECT Country, Year, CleanAvg,
+                    LAG(CleanAvg) OVER (PARTITION BY Country ORDER BY Year) AS PrevYearCleanAvg
+                    FROM CleanYears)
+
+                    SELECT Country, Year, ROUND(CleanAvg, 2) AS CleanAvg,
+                    CASE
+                        WHEN PrevYearCleanAvg IS NOT NULL THEN
+                            ROUND((CleanAvg - PrevYearCleanAvg) / PrevYearCleanAvg * 100, 2)
+                        ELSE
+                            0
+                        END AS PercentageChange
+                    FROM CleanChange
+                    ORDER BY Country, Year
+                    """, expanding=["CountryNames"],
+                    dtypes={"year": "int64", "cleanavg": "float64", "percentagechange": "float64"})
+
+register_bucketed("popularity.reviews", f"""
+    WITH ReviewCountData AS (
+        SELECT
+            TRUNC(R.ReviewDate, '{{mask}}') AS BucketStart,
+            R.ReviewID
+        FROM
+            "{DB_OWNER}".Review R
+            INNER JOIN "{DB_OWNER}".Listing L ON R.ListingID = L.ListingID
+        WHERE
+            L.City = :CityName
+            AND R.ReviewDate >= L.FirstReview
+            AND EXTRACT(YEAR FROM R.ReviewDate) >= EXTRACT(YEAR FROM SYSDATE) - :NumberOfYears
+    )
+    SELECT
+        BucketStart,
+        COUNT(ReviewID) AS TotalReviews
+    FROM ReviewCountData
+    GROUP BY BucketStart
+    ORDER BY BucketStart
+    """, dtypes={"bucketstart": "datetime64[ns]", "totalreviews": "int64"})
+
+register("avgPerYear.price_change", f"""
+    WITH MonthlyPriceData AS (
+        SELECT
+            L.City,
+            TO_CHAR(L.FirstReview, 'YYYY-MM') AS ListingMonth,
+            EXTRACT(YEAR FROM L.FirstReview) AS ListingYear,
+            EXTRACT(MONTH FROM L.FirstReview) AS ListingMonthNumber,
+            AVG(L.DailyPrice) AS AvgDailyPrice
+        FROM "{DB_OWNER}".Listing L
+        WHERE L.City = :CityName
+        GROUP BY L.City, TO_CHAR(L.FirstReview, 'YYYY-MM'), EXTRACT(YEAR FROM L.FirstReview),
+                 EXTRACT(MONTH FROM L.FirstReview)
+    ),
+    PriceChange AS (
+        SELECT ListingMonth, AvgDailyPrice,
+            LAG(AvgDailyPrice) OVER (ORDER BY ListingYear, ListingMonthNumber) AS PrevMonthAvgPrice
+        FROM MonthlyPriceData
+    )
+    SELECT
+        ListingMonth,
+        ROUND(AvgDailyPrice,0) AS AvgDailyPrice,
+        CASE
+            WHEN PrevMonthAvgPrice IS NOT NULL THEN
+                ROUND((AvgDailyPrice - PrevMonthAvgPrice) / PrevMonthAvgPrice * 100, 2)
+            ELSE
+                NULL
+        END AS PercentageChange
+    FROM PriceChange
+    ORDER BY ListingMonth
+    """, dtypes={"avgdailyprice": "float64", "percentagechange": "float64"})
+
+HOME_TABLES = ["Host", "Listing", "AirBnB", "Review", "DetailedReview"]
+
+# exact row counts of every overview table in a single round trip
+register("home.table_counts", "\n    UNION ALL\n".join(
+    f"    SELECT '{table}' AS TableName, COUNT(*) AS TupleCount FROM {table}" for table in HOME_TABLES),
+    dtypes={"tuplecount": "int64"})
+
+# optimizer statistics of the owner's tables, instant but only as fresh as the last DBMS_STATS run
+register("home.table_stats", """
+    SELECT TABLE_NAME AS TableName, NUM_ROWS AS TupleCount, LAST_ANALYZED AS LastAnalyzed
+    FROM ALL_TABLES
+    WHERE OWNER = :Owner
+        AND TABLE_NAME IN :TableNames
+    """, expanding=["TableNames"], dtypes={"tuplecount": "float64"})
+
+
+# -- dimension queries -------------------------------------------------------------------------------------------------
+register("dimension.listing_cities", """
+        SELECT City, COUNT(City) AS Count
+        FROM Listing
+        GROUP BY City
+        ORDER BY COUNT(City) DESC
+        """, dtypes={"count": "int64"})
+
+def _review_dimension(column):
+    return f"""
+        WITH ReviewData AS (
+            SELECT
+                L.{column} AS {column}
+            FROM
+                Listing L
+                INNER JOIN Review R ON L.ListingID = R.ListingID
+                INNER JOIN ListingRating LR ON R.ListingID = LR.ListingID
+        )
+        SELECT {column}, COUNT({column}) AS Count
+        FROM ReviewData
+        GROUP BY {column}
+        ORDER BY COUNT({column}) DESC
+        """
+
+
+register("dimension.review_cities", _review_dimension("City"), dtypes={"count": "int64"})
+register("dimension.review_countries", _review_dimension("Country"), dtypes={"count": "int64"})
+register("dimension.review_years", """
+        SELECT
+            DISTINCT EXTRACT(YEAR FROM ReviewDate) AS YEAR
+        FROM
+            Review
+        ORDER BY YEAR
+        """, dtypes={"year": "int64"})
@@ -1,7 +1,6 @@
 # ======================================================================================================================
 # import standard library packages
 # ----------------------------------------------------------------------------------------------------------------------
-from copy import deepcopy
 
 # ======================================================================================================================
 # import dash library packages
@@ -21,26 +20,13 @@ import pandas as pd
 # import local packages
 # ----------------------------------------------------------------------------------------------------------------------
 from pages.components import *
-from pages.utils import get_data, get_table, db_query, engine
+from pages.utils import get_data, get_table, db_query, db_query_batched, engine, reuse_connection, with_deadline
+from pages.queries import QUERIES
+from pages.timeseries import align, decimate, period_dates
+from pages.rollups import rollups_enabled, review_scores
 
 
 # -- helper functions --------------------------------------------------------------------------------------------------
-def get_review_cities():
-    df = db_query(engine, """
-                  WITH ReviewData AS (
-            SELECT 
-                L.City AS City
-            FROM 
-                Listing L
-                INNER JOIN Review R ON L.ListingID = R.ListingID
-                INNER JOIN DetailedReview DR ON R.ListingID = DR.ListingID
-        )
-        SELECT City, COUNT(City) AS Count
-        FROM ReviewData
-        GROUP BY City
-        ORDER BY COUNT(City) DESC
-                  """)
-    return df
 
 
 # -- register page -----------------------------------------------------------------------------------------------------
@@ -48,8 +34,7 @@ page_name = "reviews"
 register_page(__name__, path=page_info[page_name]["href"])
 
 # -- customize simple navbar -------------------------------------------------------------------------------------------
-navbar_main = deepcopy(navbar)
-set_active(navbar_main, page_name)
+navbar_main = make_navbar(page_name)
 
 # -- layout ------------------------------------------------------------------------------------------------------------
 layout = dbc.Container(
@@ -89,11 +74,13 @@ layout = dbc.Container(
 
             # City Select
             html.Div("Select Cities"),
+            dcc.Store(id='city-select-dimension', data="review_cities"),
             dcc.Dropdown(id='city-select',
-                         options=get_review_cities().city,
+                         options=["Paris", "Brooklyn"],
                          multi=True,
                          clearable=True,
                          value=["Paris", "Brooklyn"]),
+            make_granularity_select(),
 
         ], body=True, style={"margin": '20%', "margin-top": 50, 'border-color': "#111111", 'border-style': "solid",
                              'border-width': "1px", 'border-radius': 0}),
@@ -103,50 +90,31 @@ layout = dbc.Container(
 
 @callback(
     Output("avg-review-trend-graph", "figure"),
-    [Input("city-select", "value")],
+    [Input("city-select", "value"),
+     Input("granularity-select", "value")],
+    background=BACKGROUND_CALLBACKS,
+    interval=BACKGROUND_INTERVAL,
 )
-def update_review_trend(cities):
-    query = sa.text("""
-    WITH ReviewData AS (
-        SELECT 
-            L.City,
-            EXTRACT(YEAR FROM R.ReviewDate) * 100 + EXTRACT(MONTH FROM R.ReviewDate) AS ReviewDate,
-            DR.Rating
-        FROM 
-            Listing L
-            INNER JOIN Review R ON L.ListingID = R.ListingID
-            INNER JOIN DetailedReview DR ON R.ListingID = DR.ListingID
-        WHERE 
-            L.City = :CityName
-    )
-    SELECT :CityName, ReviewDate, AVG(Rating) AS AvgReviewScore
-    FROM ReviewData
-    WHERE ReviewDate >= EXTRACT(YEAR FROM SYSDATE) * 100 + EXTRACT(MONTH FROM SYSDATE) - :NumberOfYears * 100
-    GROUP BY ReviewDate
-    ORDER BY ReviewDate""")
-    dfs = []
-    for city in cities:
-        params = {"CityName": city, "NumberOfYears": 15}
-        df_city = db_query(engine, query, params)
-        df_city = pd.DataFrame({"Date": df_city.reviewdate, city: df_city.avgreviewscore})
-        dfs.append(df_city)
-    df_merged = dfs[0]
-    for df_ in dfs[1:]:
-        df_merged = df_merged.merge(df_, on="Date", how="outer")
-
-
-    fig = px.line(data_frame=df_merged,
-                  y=cities,
+@with_deadline(timed_out_figure)
+@reuse_connection
+def update_review_trend(cities, granularity="month"):
+    if rollups_enabled() and granularity == "month":
+        df = review_scores(cities, years=15)
+        df = df.assign(bucketstart=period_dates(df.reviewdate))
+    else:
+        df = db_query_batched(engine, QUERIES[f"reviews.review_scores.{granularity}"], "CityNames", cities,
+                              {"NumberOfYears": 15}, key_column="city")
+    df_merged = align(df, "city", "bucketstart", "avgreviewscore", cities, granularity=granularity)
+
+    fig = px.line(data_frame=decimate(df_merged, MAX_POINTS, DOWNSAMPLE_METHOD),
+                  x="Date",
+                  y="value",
+                  color="variable",
                   title="Average Review Trend")
-    tick_locs = np.where(df_merged.Date.astype(str).str.endswith(("01", "07")))[0]
-    tick_text = [f"{v[0:4]}-{v[4:]}" for v in df_merged.Date.astype(str).values[tick_locs]]
     fig.update_layout(template="plotly_dark",
                       showlegend=True,
                       xaxis={'title': "Date",
-                             'tickmode': 'array',
-                             'tickvals': tick_locs,
-                             'ticktext': tick_text,
                              'tickangle': 45},
-                      yaxis={'title': f"Average Review Score per Month", 'tickformat': "s%"},
+                      yaxis={'title': f"Average Review Score per {granularity.title()}", 'tickformat': "s%"},
                       )
     return fig
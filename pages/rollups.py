@@ -0,0 +1,306 @@
+# ======================================================================================================================
+# import standard library packages
+# ----------------------------------------------------------------------------------------------------------------------
+import os
+import json
+import time
+import tempfile
+import threading
+from pathlib import Path
+from datetime import datetime
+
+# ======================================================================================================================
+# import non-standard library packages
+# ----------------------------------------------------------------------------------------------------------------------
+import pandas as pd
+import sqlalchemy as sa
+
+# ======================================================================================================================
+# import local packages
+# ----------------------------------------------------------------------------------------------------------------------
+from pages.utils import cfg as app_cfg, db_query
+from pages.queries import LISTING_RATING_TABLE, LISTING_RATINGS
+
+
+# -- rollup definitions ------------------------------------------------------------------------------------------------
+# Each rollup is a city/country x period aggregate small enough to be filtered in memory by the page callbacks.
+ROLLUP_QUERIES = {
+    "review_monthly": """
+        SELECT
+            L.Country,
+            L.City,
+            EXTRACT(YEAR FROM R.ReviewDate) AS Year,
+            EXTRACT(MONTH FROM R.ReviewDate) AS Month,
+            COUNT(R.ReviewID) AS ReviewCount,
+            SUM(CASE WHEN R.ReviewDate >= L.FirstReview THEN 1 ELSE 0 END) AS ReviewCountSinceFirst
+        FROM
+            Review R
+            INNER JOIN Listing L ON R.ListingID = L.ListingID
+        WHERE R.ReviewDate IS NOT NULL
+        GROUP BY L.Country, L.City, EXTRACT(YEAR FROM R.ReviewDate), EXTRACT(MONTH FROM R.ReviewDate)
+        """,
+    # a listing reviewed in a month contributes its ratings to that month once, however many reviews it got
+    "rating_monthly": """
+        WITH ReviewMonths AS (
+            SELECT DISTINCT
+                ListingID,
+                EXTRACT(YEAR FROM ReviewDate) AS Year,
+                EXTRACT(MONTH FROM ReviewDate) AS Month
+            FROM Review
+            WHERE ReviewDate IS NOT NULL
+        )
+        SELECT
+            L.Country,
+            L.City,
+            RM.Year,
+            RM.Month,
+            SUM(LR.RatingSum) AS RatingSum,
+            SUM(LR.RatingCount) AS RatingCount
+        FROM
+            ReviewMonths RM
+            INNER JOIN Listing L ON RM.ListingID = L.ListingID
+            INNER JOIN ListingRating LR ON RM.ListingID = LR.ListingID
+        GROUP BY L.Country, L.City, RM.Year, RM.Month
+        """,
+    "host_monthly": """
+        SELECT
+            L.City,
+            EXTRACT(YEAR FROM H.HostSince) AS Year,
+            EXTRACT(MONTH FROM H.HostSince) AS Month,
+            COUNT(DISTINCT H.HostID) AS NewHosts
+        FROM
+            Host H
+            INNER JOIN Listing L ON H.HostID = L.HostID
+        WHERE H.HostSince IS NOT NULL
+        GROUP BY L.City, EXTRACT(YEAR FROM H.HostSince), EXTRACT(MONTH FROM H.HostSince)
+        """,
+    "cleanliness_yearly": """
+        SELECT
+            L.Country,
+            EXTRACT(YEAR FROM L.FirstReview) AS Year,
+            SUM(LR.CleanSum) AS CleanSum,
+            SUM(LR.CleanCount) AS CleanCount
+        FROM
+            "ANDREW.GOLDSTEIN".Listing L
+            JOIN ListingRating LR ON L.ListingID = LR.ListingID
+        WHERE LR.CleanCount > 0 AND L.LastReview IS NOT NULL
+        GROUP BY L.Country, EXTRACT(YEAR FROM L.FirstReview)
+        """,
+    "price_monthly": """
+        SELECT
+            L.Country,
+            L.City,
+            EXTRACT(YEAR FROM L.FirstReview) AS Year,
+            EXTRACT(MONTH FROM L.FirstReview) AS Month,
+            SUM(L.DailyPrice) AS PriceSum,
+            COUNT(L.DailyPrice) AS PriceCount
+        FROM "ANDREW.GOLDSTEIN".Listing L
+        WHERE L.FirstReview IS NOT NULL
+        GROUP BY L.Country, L.City, EXTRACT(YEAR FROM L.FirstReview), EXTRACT(MONTH FROM L.FirstReview)
+        """,
+}
+
+# yearly rollups derived from the monthly ones without another pass over the raw tables
+DERIVED_ROLLUPS = {
+    "review_yearly": ("review_monthly", ["country", "city", "year"], ["reviewcount", "reviewcountsincefirst"]),
+    "rating_yearly": ("rating_monthly", ["country", "city", "year"], ["ratingsum", "ratingcount"]),
+    "price_yearly": ("price_monthly", ["country", "city", "year"], ["pricesum", "pricecount"]),
+}
+
+MANIFEST = "manifest.json"
+
+
+# -- storage -----------------------------------------------------------------------------------------------------------
+def rollup_dir(cfg=None):
+    cfg = cfg or app_cfg
+    path = Path(cfg.get("rollups", "dir", fallback=".cache/rollups"))
+    if not path.is_absolute():
+        path = Path(os.path.dirname(os.path.abspath(__file__))).parent/path
+    return path
+
+
+def rollups_enabled(cfg=None):
+    cfg = cfg or app_cfg
+    return cfg.getboolean("rollups", "enabled", fallback=False) and (rollup_dir(cfg)/MANIFEST).exists()
+
+
+def _write_frame(df, path):
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    os.close(fd)
+    df.to_pickle(tmp, compression="gzip")
+    os.replace(tmp, path)
+
+
+_frames = {}
+_frames_lock = threading.Lock()
+
+
+def load_rollup(name):
+    """Return a rollup frame, re-reading it from disk only when the build job has replaced the file."""
+    path = rollup_dir()/f"{name}.pkl.gz"
+    mtime = path.stat().st_mtime
+    with _frames_lock:
+        cached = _frames.get(name)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+    df = pd.read_pickle(path, compression="gzip")
+    with _frames_lock:
+        _frames[name] = (mtime, df)
+    return df
+
+
+def get_manifest():
+    path = rollup_dir()/MANIFEST
+    if not path.exists():
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+# -- listing rating summary --------------------------------------------------------------------------------------------
+def build_listing_ratings(engine):
+    """Materialize the one-row-per-listing rating summary the page queries join, return its number of rows.
+
+    Oracle keeps it as a table refreshed in a single transaction, so queries running meanwhile read the previous
+    summary. The DuckDB backend writes it into the snapshot, where every new connection reads it as a view.
+    """
+    if engine.dialect.name == "duckdb":
+        from pages.snapshot import snapshot_dir, write_table
+
+        df = db_query(engine, LISTING_RATINGS, cache=False, name="rollup.listing_ratings")
+        if df is None:
+            raise RuntimeError("listing rating summary query failed")
+        return write_table(snapshot_dir(app_cfg), LISTING_RATING_TABLE, [df])
+
+    with engine.begin() as connection:
+        if sa.inspect(connection).has_table(LISTING_RATING_TABLE.lower()):
+            connection.execute(sa.text(f"DELETE FROM {LISTING_RATING_TABLE}"))
+            connection.execute(sa.text(f"INSERT INTO {LISTING_RATING_TABLE} {LISTING_RATINGS}"))
+        else:
+            connection.execute(sa.text(f"CREATE TABLE {LISTING_RATING_TABLE} AS {LISTING_RATINGS}"))
+            connection.execute(sa.text(f"ALTER TABLE {LISTING_RATING_TABLE} "
+                                       f"ADD CONSTRAINT {LISTING_RATING_TABLE}_PK PRIMARY KEY (ListingID)"))
+        return connection.execute(sa.text(f"SELECT COUNT(*) FROM {LISTING_RATING_TABLE}")).scalar()
+
+
+# -- build job ---------------------------------------------------------------------------------------------------------
+def _tidy(df):
+    df = df.dropna(subset=[c for c in ("year", "month") if c in df.columns]).copy()
+    for column in ("year", "month"):
+        if column in df.columns:
+            df[column] = df[column].astype(int)
+    for column in df.columns:
+        if df[column].dtype == object and column not in ("country", "city"):
+            df[column] = pd.to_numeric(df[column])
+    return df.reset_index(drop=True)
+
+
+def build_rollups(engine, names=None, verbose=True):
+    out_dir = rollup_dir()
+    out_dir.mkdir(parents=True, exist_ok=True)
+    names = names or list(ROLLUP_QUERIES)
+    manifest = get_manifest()
+    manifest.setdefault("rollups", {})
+
+    # the rating rollups and the live review queries read the summary, so it is refreshed first
+    start = time.perf_counter()
+    rows = build_listing_ratings(engine)
+    manifest["listing_ratings"] = {"rows": rows, "seconds": round(time.perf_counter() - start, 3)}
+    if verbose:
+        print(f"listing_ratings: {rows} rows in {manifest['listing_ratings']['seconds']}s")
+
+    frames = {}
+    for name in names:
+        start = time.perf_counter()
+        df = db_query(engine, ROLLUP_QUERIES[name], cache=False, name=f"rollup.{name}")
+        if df is None:
+            raise RuntimeError(f"rollup query '{name}' failed")
+        frames[name] = _tidy(df)
+        manifest["rollups"][name] = {"rows": len(frames[name]), "seconds": round(time.perf_counter() - start, 3)}
+        if verbose:
+            print(f"{name}: {len(frames[name])} rows in {manifest['rollups'][name]['seconds']}s")
+
+    for name, (source, keys, values) in DERIVED_ROLLUPS.items():
+        if source in frames:
+            frames[name] = frames[source].groupby(keys, as_index=False, dropna=False)[values].sum()
+            manifest["rollups"][name] = {"rows": len(frames[name]), "seconds": 0.0}
+
+    for name, df in frames.items():
+        _write_frame(df, out_dir/f"{name}.pkl.gz")
+
+    manifest["built_at"] = datetime.now().isoformat(timespec="seconds")
+    fd, tmp = tempfile.mkstemp(dir=out_dir, suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, out_dir/MANIFEST)
+    return manifest
+
+
+# -- page readers ------------------------------------------------------------------------------------------------------
+# The readers return the same long-format columns as the live page queries so callbacks can use either source.
+def _period(df):
+    return df.year * 100 + df.month
+
+
+def _current_period():
+    now = datetime.now()
+    return now.year * 100 + now.month
+
+
+def new_hosts(cities, years=10):
+    df = load_rollup("host_monthly")
+    df = df[df.city.isin(cities)]
+    df = df.assign(registrationdate=_period(df))
+    df = df[df.registrationdate >= _current_period() - years * 100]
+    return (df.rename(columns={"newhosts": "numberofhosts"})
+              [["city", "registrationdate", "numberofhosts"]]
+              .sort_values("registrationdate", kind="stable"))
+
+
+def review_scores(cities, years=15):
+    df = load_rollup("rating_monthly")
+    df = df[df.city.isin(cities)]
+    df = df.assign(reviewdate=_period(df))
+    df = df[(df.reviewdate >= _current_period() - years * 100) & (df.ratingcount > 0)]
+    # several countries can share a city name, so sum before dividing
+    df = df.groupby(["city", "reviewdate"], as_index=False)[["ratingsum", "ratingcount"]].sum()
+    df["avgreviewscore"] = df.ratingsum / df.ratingcount
+    return df[["city", "reviewdate", "avgreviewscore"]].sort_values("reviewdate", kind="stable")
+
+
+def review_counts(cities, years):
+    df = load_rollup("review_monthly")
+    df = df[df.city.isin(cities) & df.year.isin([int(year) for year in years])]
+    df = df.groupby(["city", "year", "month"], as_index=False)["reviewcount"].sum()
+    return df.rename(columns={"year": "reviewyear", "month": "reviewmonth"})
+
+
+def yearly_reviews(city, years):
+    df = load_rollup("review_yearly")
+    df = df[(df.city == city) & (df.year >= datetime.now().year - int(years))]
+    df = df.groupby("year", as_index=False)["reviewcountsincefirst"].sum()
+    df = df[df.reviewcountsincefirst > 0]
+    return df.rename(columns={"year": "reviewyear", "reviewcountsincefirst": "totalreviews"}).reset_index(drop=True)
+
+
+def cleanliness_change(countries):
+    df = load_rollup("cleanliness_yearly")
+    df = df[df.country.isin(countries)].sort_values(["country", "year"])
+    clean_avg = df.cleansum / df.cleancount
+    prev = clean_avg.groupby(df.country).shift()
+    change = ((clean_avg - prev) / prev * 100).round(2).fillna(0)
+    return pd.DataFrame({"country": df.country, "year": df.year, "cleanavg": clean_avg.round(2),
+                         "percentagechange": change}).reset_index(drop=True)
+
+
+def price_change(city):
+    df = load_rollup("price_monthly")
+    df = df[df.city == city].groupby(["year", "month"], as_index=False)[["pricesum", "pricecount"]].sum()
+    df = df[df.pricecount > 0].sort_values(["year", "month"])
+    avg_price = df.pricesum / df.pricecount
+    prev = avg_price.shift()
+    return pd.DataFrame({
+        "listingmonth": [f"{y:04d}-{m:02d}" for y, m in zip(df.year, df.month)],
+        "avgdailyprice": avg_price.round(0).to_numpy(),
+        "percentagechange": ((avg_price - prev) / prev * 100).round(2).to_numpy(),
+    })
@@ -1,12 +1,12 @@
 # ======================================================================================================================
 # import standard library packages
 # ----------------------------------------------------------------------------------------------------------------------
-from copy import deepcopy
+import warnings
 
 # ======================================================================================================================
 # import dash library packages
 # ----------------------------------------------------------------------------------------------------------------------
-from dash import register_page, html, dcc, Input, Output, callback
+from dash import register_page, html, dcc, Input, Output, callback, clientside_callback, ClientsideFunction
 import dash_bootstrap_components as dbc
 import plotly.express as px
 
@@ -21,42 +21,29 @@ import sqlalchemy as sa
 # import local packages
 # ----------------------------------------------------------------------------------------------------------------------
 from pages.components import *
-from pages.utils import db_query, engine
+from pages.utils import db_query, db_query_batched, engine, reuse_connection, with_deadline
+from pages.queries import QUERIES
+from pages.timeseries import MONTH_NAMES, align
+from pages.rollups import rollups_enabled, review_counts
 
 
 # -- helper functions --------------------------------------------------------------------------------------------------
-def get_review_cities():
-    df = db_query(engine, """
-                  WITH ReviewData AS (
-            SELECT 
-                L.City AS City
-            FROM 
-                Listing L
-                INNER JOIN Review R ON L.ListingID = R.ListingID
-                INNER JOIN DetailedReview DR ON R.ListingID = DR.ListingID
-        )
-        SELECT City, COUNT(City) AS Count
-        FROM ReviewData
-        GROUP BY City
-        ORDER BY COUNT(City) DESC
-                  """)
-    return df
-
-
-def get_review_years():
-    df = db_query(engine,
-                  """
-                SELECT
-                    DISTINCT EXTRACT(YEAR FROM ReviewDate) AS YEAR
-                FROM
-                    Review
-                ORDER BY YEAR
-                  """)
-    return df
-
-
-def norm(array):
-    return (array-array.min())/(array.max()-array.min())
+def build_cube(df, cities, years):
+    """Scatter (city, year, month, count) rows into a dense city x year x month array, NaN where no reviews exist."""
+    years = [int(year) for year in years]
+    if df is None or df.empty or not years:
+        return np.full((len(cities), len(years), 12), np.nan)
+    first = min(years)
+    df = df.assign(period=df.reviewyear.astype(int) * 100 + df.reviewmonth.astype(int))
+    matrix = align(df, "city", "period", "reviewcount", cities, start=first * 100 + 1, end=max(years) * 100 + 12)
+    # rows of the selected years, in selection order, as year x month x city
+    rows = (np.array(years) - first)[:, None] * 12 + np.arange(12)
+    return matrix.to_numpy()[rows].transpose(2, 0, 1)
+
+
+def timed_out_cube(error):
+    # without a cube assets/seasonality.js draws the figure as is, normalized or not
+    return {"figure": timed_out_figure(error).to_plotly_json(), "cube": None}
 
 
 # -- register page -----------------------------------------------------------------------------------------------------
@@ -64,8 +51,7 @@ page_name = "seasonality"
 register_page(__name__, path=page_info[page_name]["href"])
 
 # -- customize simple navbar -------------------------------------------------------------------------------------------
-navbar_main = deepcopy(navbar)
-set_active(navbar_main, page_name)
+navbar_main = make_navbar(page_name)
 
 # -- layout ------------------------------------------------------------------------------------------------------------
 layout = dbc.Container(
@@ -95,23 +81,26 @@ layout = dbc.Container(
                 ], className="summary"
             ),
 
-            # Graph for displaying results
+            # Graph for displaying results, drawn in the browser from the cube in the store
+            dcc.Store(id="seasonality-cube"),
             dcc.Loading(
                 dcc.Graph(id="seasonality_graph"),
             ),
 
             # City Select
             html.Div("Select Cities"),
+            dcc.Store(id='city-select-dimension', data="review_cities"),
             dcc.Dropdown(id='city-select',
-                         options=get_review_cities().city,
+                         options=["Paris", "Brooklyn"],
                          multi=True,
                          clearable=True,
                          value=["Paris", "Brooklyn"]),
 
             # Year Select
             html.Div("Select Years"),
+            dcc.Store(id='year-select-dimension', data="review_years"),
             dcc.Dropdown(id='year-select',
-                         options=get_review_years().year,
+                         options=[2020, 2021],
                          multi=True,
                          clearable=False,
                          value=[2020, 2021]),
@@ -128,66 +117,51 @@ layout = dbc.Container(
     ], className="dbc", fluid=True)
 
 
-@callback(Output("seasonality_graph", "figure"),
+@callback(Output("seasonality-cube", "data"),
           [Input("city-select", "value"),
-           Input("year-select", "value"),
-           Input("normalize", "value")],
+           Input("year-select", "value")],
+          background=BACKGROUND_CALLBACKS,
+          interval=BACKGROUND_INTERVAL,
           )
-def update_graph(cities, years, normalize):
-    normalize = len(normalize) > 0
-    query = sa.text("""
-    WITH MonthlyReviewData AS (
-        SELECT 
-            L.City,
-            EXTRACT(MONTH FROM R.ReviewDate) AS ReviewMonth,
-            COUNT(R.ReviewID) AS ReviewCount
-        FROM 
-            Review R
-            INNER JOIN Listing L ON R.ListingID = L.ListingID
-        WHERE 
-            L.City = :CityName
-            AND R.ReviewDate >= ADD_MONTHS(SYSDATE, -1 * :Year)
-            AND R.ReviewDate < ADD_MONTHS(SYSDATE, (-1 * :Year)+12)
-        GROUP BY 
-            L.City, EXTRACT(MONTH FROM R.ReviewDate)
-    )
-    SELECT ReviewMonth, ReviewCount
-    FROM MonthlyReviewData
-    ORDER BY ReviewMonth DESC
-    """)
-    dfs = []
-    for city in cities:
-        months = None
-        reviews = None
-        for year in years:
-            params = {"CityName": city, "Year": (2027-year)*12}
-            df = db_query(engine, query, params)
-            if months is None:
-                months = df.reviewmonth
-            if reviews is None:
-                reviews = [df.reviewcount]
-            else:
-                reviews.append(df.reviewcount)
-
-        df_city = pd.DataFrame({"Month": months,
-                                city: norm(np.nansum(reviews, axis=0)) if normalize else np.nanmean(reviews, axis=0)})
-        dfs.append(df_city)
-    df_merged = dfs[0]
-    for df_ in dfs[1:]:
-        df_merged = df_merged.merge(df_, on="Month", how="outer")
+@with_deadline(timed_out_cube)
+@reuse_connection
+def update_cube(cities, years):
+    years = [int(year) for year in years]
+    if rollups_enabled():
+        df = review_counts(cities, years)
+    else:
+        df = db_query_batched(engine, QUERIES["seasonality.review_counts"], "CityNames", cities, {"Years": years},
+                              key_column="city")
+    cube = build_cube(df, cities, years)
+
+    with warnings.catch_warnings():
+        # months without a single review in any selected year stay NaN
+        warnings.simplefilter("ignore", RuntimeWarning)
+        values = np.nanmean(cube, axis=1)
+    df_merged = pd.DataFrame(values.T, columns=cities)
+    df_merged.insert(0, "Month", np.arange(1, 13))
 
     fig = px.line(data_frame=df_merged,
                   y=cities,
-                  title=f"Seasonality Trends Over Time {'(Normalized)' if normalize else ''}",)
+                  title="Seasonality Trends Over Time ",)
     fig.update_layout(template="plotly_dark",
                       showlegend=True,
                       xaxis={'title': "Month",
                              'tickmode': 'array',
                              'tickvals': list(range(0, 12)),
-                             'ticktext': ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
-                                          'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'],
+                             'ticktext': MONTH_NAMES,
                              'tickangle': 45},
-                      yaxis={'title': f"Reviewed Listings {'[arb.]' if normalize else '[Count]'}",
-                             'tickformat': "%.0f" if normalize else ""},
+                      yaxis={'title': "Reviewed Listings [Count]",
+                             'tickformat': ""},
                       )
-    return fig
+    # the normalize toggle only rescales these counts, assets/seasonality.js does it without a server round trip
+    return {"figure": fig.to_plotly_json(),
+            "cube": np.where(np.isnan(cube), None, cube).tolist()}
+
+
+clientside_callback(
+    ClientsideFunction(namespace="seasonality", function_name="draw"),
+    Output("seasonality_graph", "figure"),
+    [Input("seasonality-cube", "data"),
+     Input("normalize", "value")],
+)
@@ -0,0 +1,61 @@
+# ======================================================================================================================
+# import standard library packages
+# ----------------------------------------------------------------------------------------------------------------------
+import os
+import threading
+
+# ======================================================================================================================
+# import non-standard library packages
+# ----------------------------------------------------------------------------------------------------------------------
+from gunicorn.app.base import BaseApplication
+
+
+# -- multi-worker server -----------------------------------------------------------------------------------------------
+def get_server_options(cfg, workers=None, bind=None):
+    return {
+        "bind": bind or cfg.get("server", "bind", fallback="0.0.0.0:8060"),
+        "workers": workers or cfg.getint("server", "workers", fallback=os.cpu_count() or 1),
+        "threads": cfg.getint("server", "threads", fallback=1),
+        "max_requests": cfg.getint("server", "max_requests", fallback=1000),
+        "max_requests_jitter": cfg.getint("server", "max_requests_jitter", fallback=100),
+        "timeout": cfg.getint("server", "timeout", fallback=60),
+        "graceful_timeout": cfg.getint("server", "graceful_timeout", fallback=30),
+        "keepalive": cfg.getint("server", "keepalive", fallback=5),
+    }
+
+
+def join_threads(ignore):
+    # a thread still running at fork time may hold a lock the child can never release, so wait for the ones preloading
+    # started; threads from before, such as the database driver's housekeeping, live on for the whole process
+    for thread in threading.enumerate():
+        if thread not in ignore and thread is not threading.current_thread() and not thread.daemon:
+            thread.join()
+
+
+class PreloadedServer(BaseApplication):
+    """gunicorn serving a WSGI app that is fully built in the master process before any worker is forked.
+
+    ``preload`` runs once in the master: imported pages, dimension lists and warmed caches are then shared by every
+    worker through copy-on-write memory instead of being rebuilt per process. ``post_fork`` runs in each new worker.
+    Workers are replaced after ``max_requests`` requests (plus jitter) or on SIGHUP; a retiring worker stops accepting
+    connections and finishes its in-flight requests within ``graceful_timeout`` while its replacement takes over.
+    """
+
+    def __init__(self, application, options, preload=None, post_fork=None):
+        self.application = application
+        self.options = {**options, "preload_app": True}
+        self.preload = preload
+        if post_fork is not None:
+            self.options["post_fork"] = lambda server, worker: post_fork()
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        running = set(threading.enumerate())
+        if self.preload is not None:
+            self.preload()
+        join_threads(running)
+        return self.application
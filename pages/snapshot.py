@@ -0,0 +1,185 @@
+# ======================================================================================================================
+# import standard library packages
+# ----------------------------------------------------------------------------------------------------------------------
+import os
+import re
+import json
+import time
+import shutil
+from pathlib import Path
+from datetime import datetime
+
+# ======================================================================================================================
+# import non-standard library packages
+# ----------------------------------------------------------------------------------------------------------------------
+import sqlalchemy as sa
+import pandas as pd
+
+# ======================================================================================================================
+# import local packages
+# ----------------------------------------------------------------------------------------------------------------------
+from pages.queries import LISTING_RATINGS
+
+
+# -- snapshot layout ---------------------------------------------------------------------------------------------------
+# table -> (partition column written next to the data, expression deriving it from a chunk)
+SNAPSHOT_TABLES = {
+    "Host": ("part_year", lambda df: df.hostsince.dt.year),
+    "Listing": ("part_country", lambda df: df.country),
+    "Review": ("part_year", lambda df: df.reviewdate.dt.year),
+    "DetailedReview": (None, None),
+    "AirBnB": (None, None),
+    "ListingRating": (None, None),
+}
+
+# summaries rollup-build derives from the other tables, written here instead of exported from Oracle:
+# table -> (table it is derived from, query deriving it)
+DERIVED_TABLES = {"ListingRating": ("DetailedReview", LISTING_RATINGS)}
+
+# the pages address some tables through the owning schema of the Oracle deployment
+ORACLE_SCHEMAS = ["ANDREW.GOLDSTEIN"]
+
+MANIFEST = "manifest.json"
+
+
+def snapshot_dir(cfg):
+    path = Path(cfg.get("snapshot", "dir", fallback="data/snapshot"))
+    if not path.is_absolute():
+        path = Path(os.path.dirname(os.path.abspath(__file__))).parent/path
+    return path
+
+
+def get_manifest(cfg):
+    path = snapshot_dir(cfg)/MANIFEST
+    if not path.exists():
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+# -- export ------------------------------------------------------------------------------------------------------------
+def write_table(out_dir, table, chunks):
+    """Write an iterable of DataFrames as the table's Parquet dataset and return the number of rows written."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    part_column, part_func = SNAPSHOT_TABLES[table]
+    table_dir = out_dir/table
+    tmp_dir = out_dir/f".{table}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir()
+
+    rows = 0
+    for i, df in enumerate(chunks):
+        df.columns = df.columns.str.lower()
+        if part_column is not None:
+            df[part_column] = part_func(df).fillna("none").astype(str).str.replace(r"[/\\=]", "_", regex=True)
+        pq.write_to_dataset(pa.Table.from_pandas(df, preserve_index=False), tmp_dir,
+                            partition_cols=[part_column] if part_column else None,
+                            basename_template=f"part-{i:05d}-{{i}}.parquet")
+        rows += len(df)
+
+    # swap the finished dataset in so readers never see a half written table
+    shutil.rmtree(table_dir, ignore_errors=True)
+    os.replace(tmp_dir, table_dir)
+    return rows
+
+
+def write_manifest(out_dir, tables, **extra):
+    manifest = {"tables": tables, "exported_at": datetime.now().isoformat(timespec="seconds"), **extra}
+    with open(out_dir/MANIFEST, "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def export_snapshot(engine, out_dir, tables=None, chunksize=500_000, verbose=True):
+    """Copy the Oracle tables into Parquet datasets, hive-partitioned by country or year where the table has one."""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    stats = {}
+    for table in tables or [table for table in SNAPSHOT_TABLES if table not in DERIVED_TABLES]:
+        start = time.perf_counter()
+        with engine.connect() as connection:
+            chunks = pd.read_sql(sa.text(f"SELECT * FROM {table}"), connection, chunksize=chunksize)
+            rows = write_table(out_dir, table, chunks)
+        stats[table] = {"rows": rows, "partition": SNAPSHOT_TABLES[table][0],
+                        "seconds": round(time.perf_counter() - start, 3)}
+        if verbose:
+            print(f"{table}: {rows} rows in {stats[table]['seconds']}s")
+    return write_manifest(out_dir, stats)
+
+
+# -- embedded engine ---------------------------------------------------------------------------------------------------
+# Oracle built-ins used by the page queries, recreated as DuckDB macros
+DUCKDB_MACROS = [
+    "CREATE OR REPLACE MACRO add_months(d, n) AS CAST(d AS TIMESTAMP) + to_months(CAST(n AS INTEGER))",
+    # strftime needs a constant format, so only the date masks the pages use are mapped
+    "CREATE OR REPLACE MACRO to_char(d, fmt) AS CASE fmt "
+    "WHEN 'YYYY-MM' THEN strftime(CAST(d AS TIMESTAMP), '%Y-%m') "
+    "WHEN 'YYYY' THEN strftime(CAST(d AS TIMESTAMP), '%Y') "
+    "ELSE strftime(CAST(d AS TIMESTAMP), '%Y-%m-%d') END",
+]
+_SYSDATE = re.compile(r"\bSYSDATE\b", re.IGNORECASE)
+# TRUNC(date, mask) with the masks of the chart granularities, numeric TRUNC(x) keeps DuckDB's own function
+_TRUNC_DATE = re.compile(r"\bTRUNC\(\s*([\w.]+)\s*,\s*'(DD|IW|MM|YYYY)'\s*\)", re.IGNORECASE)
+_TRUNC_UNITS = {"DD": "day", "IW": "week", "MM": "month", "YYYY": "year"}
+
+
+def _translate_trunc(match):
+    return f"date_trunc('{_TRUNC_UNITS[match.group(2).upper()]}', CAST({match.group(1)} AS TIMESTAMP))"
+
+
+def translate_oracle(statement):
+    """Rewrite the Oracle built-ins of a page query that DuckDB has no macro for."""
+    return _TRUNC_DATE.sub(_translate_trunc, _SYSDATE.sub("CURRENT_TIMESTAMP", statement))
+
+
+def _table_source(path, part_column):
+    glob = (path/"**"/"*.parquet").as_posix()
+    source = f"read_parquet('{glob}', hive_partitioning = true, union_by_name = true)"
+    if part_column is None:
+        return f"SELECT * FROM {source}"
+    return f"SELECT * EXCLUDE ({part_column}) FROM {source}"
+
+
+def create_snapshot_engine(cfg):
+    """Return a SQLAlchemy engine running the page queries in-process with DuckDB over the Parquet snapshot.
+
+    Every pooled connection is a private in-memory database with views over the snapshot, so DuckDB only scans the
+    columns and row groups a query touches and nothing is copied into memory up front.
+    """
+    root = snapshot_dir(cfg)
+    threads = cfg.getint("snapshot", "threads", fallback=0)
+    engine = sa.create_engine("duckdb:///:memory:", poolclass=sa.pool.QueuePool,
+                              pool_size=cfg.getint("database", "pool_size", fallback=5),
+                              max_overflow=cfg.getint("database", "max_overflow", fallback=10),
+                              pool_timeout=cfg.getfloat("database", "pool_timeout", fallback=30))
+
+    @sa.event.listens_for(engine, "connect")
+    def _register_snapshot(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        if threads:
+            cursor.execute(f"SET threads = {threads}")
+        for macro in DUCKDB_MACROS:
+            cursor.execute(macro)
+        views = []
+        for table, (part_column, _) in SNAPSHOT_TABLES.items():
+            if (root/table).exists():
+                cursor.execute(f"CREATE OR REPLACE VIEW {table} AS {_table_source(root/table, part_column)}")
+                views.append(table)
+        for table, (source, query) in DERIVED_TABLES.items():
+            # until rollup-build has written a summary, it is computed from its source table on every read
+            if table not in views and source in views:
+                cursor.execute(f"CREATE OR REPLACE VIEW {table} AS {query}")
+                views.append(table)
+        for schema in ORACLE_SCHEMAS:
+            cursor.execute(f'CREATE SCHEMA IF NOT EXISTS "{schema}"')
+            for table in views:
+                cursor.execute(f'CREATE OR REPLACE VIEW "{schema}".{table} AS SELECT * FROM main.{table}')
+        cursor.close()
+
+    @sa.event.listens_for(engine, "before_cursor_execute", retval=True)
+    def _translate_oracle(connection, cursor, statement, parameters, context, executemany):
+        return translate_oracle(statement), parameters
+
+    return engine
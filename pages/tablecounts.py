@@ -0,0 +1,107 @@
+# ======================================================================================================================
+# import standard library packages
+# ----------------------------------------------------------------------------------------------------------------------
+import time
+import threading
+from datetime import datetime
+
+# ======================================================================================================================
+# import non-standard library packages
+# ----------------------------------------------------------------------------------------------------------------------
+import pandas as pd
+
+# ======================================================================================================================
+# import local packages
+# ----------------------------------------------------------------------------------------------------------------------
+from pages.queries import DB_OWNER, HOME_TABLES, QUERIES
+from pages.utils import cfg, db_query
+
+
+# -- table counts ------------------------------------------------------------------------------------------------------
+class TableCounts:
+    """Row counts of the overview tables for the home page, answered without scanning the tables on the request path.
+
+    Until exact counts are known the overview shows estimates: ``NUM_ROWS`` from the optimizer statistics on Oracle, or
+    the row counts recorded when the snapshot was exported. Exact counts come from a single ``UNION ALL`` query run in
+    a background thread and are kept for ``ttl`` seconds; once they are older a refresh starts in the background and
+    the previous counts keep being served in the meantime. Without estimates a request waits up to ``wait`` seconds
+    for the count and otherwise gets the counts as unknown.
+    """
+
+    def __init__(self, engine, tables=HOME_TABLES, ttl=86400, owner=DB_OWNER, wait=5):
+        self.engine = engine
+        self.tables = list(tables)
+        self.ttl = ttl
+        self.owner = owner
+        self.wait = wait
+        self.exact = None
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @classmethod
+    def from_config(cls, cfg, engine):
+        return cls(engine, ttl=cfg.getfloat("home", "counts_ttl", fallback=86400),
+                   owner=cfg.get("migrations", "owner", fallback=DB_OWNER),
+                   wait=cfg.getfloat("home", "counts_wait", fallback=5))
+
+    def _estimate(self):
+        if self.engine.dialect.name == "oracle":
+            df = db_query(self.engine, QUERIES["home.table_stats"],
+                          {"Owner": self.owner, "TableNames": [t.upper() for t in self.tables]})
+            if df is None or df.tuplecount.isna().any() or len(df) < len(self.tables):
+                return None
+            names = {table.upper(): table for table in self.tables}
+            counts = {names[name]: int(count) for name, count in zip(df.tablename, df.tuplecount)}
+            analyzed = pd.to_datetime(df.lastanalyzed).min()
+            return self._result(counts, False, analyzed.timestamp() if pd.notna(analyzed) else None)
+
+        from pages.snapshot import get_manifest
+        manifest = get_manifest(cfg)
+        stats = manifest.get("tables", {})
+        if not all(table in stats for table in self.tables):
+            return None
+        exported = manifest.get("exported_at")
+        return self._result({table: stats[table]["rows"] for table in self.tables}, False,
+                            datetime.fromisoformat(exported).timestamp() if exported else None)
+
+    def _result(self, counts, exact, as_of):
+        return {"counts": {table: counts.get(table) for table in self.tables}, "exact": exact, "as_of": as_of}
+
+    def refresh(self):
+        """Count every table exactly, blocking until the query returns."""
+        df = db_query(self.engine, QUERIES["home.table_counts"], cache=False)
+        if df is None:
+            return None
+        result = self._result(dict(zip(df.tablename, df.tuplecount.astype(int))), True, time.time())
+        with self._lock:
+            self.exact = result
+        return result
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            # not a daemon: the interpreter waits for the count instead of tearing down the driver under it
+            self._thread = threading.Thread(target=self.refresh, name="table-counts")
+            self._thread.start()
+
+    def get(self):
+        """Return ``{"counts", "exact", "as_of"}``, exact counts when known, otherwise estimates.
+
+        The counts are None while neither is known.
+        """
+        with self._lock:
+            exact = self.exact
+        if exact is not None and time.time() - exact["as_of"] < self.ttl:
+            return exact
+        self._refresh_in_background()
+        if exact is not None:
+            return exact
+        estimate = self._estimate()
+        if estimate is not None:
+            return estimate
+        # no statistics to fall back on, wait a little for the count
+        self._thread.join(self.wait)
+        if self._thread.is_alive():
+            return self._result({}, False, None)
+        return self.exact
@@ -0,0 +1,127 @@
+# ======================================================================================================================
+# import non-standard library packages
+# ----------------------------------------------------------------------------------------------------------------------
+import numpy as np
+import pandas as pd
+
+
+MONTH_NAMES = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+
+# chart granularity -> pandas frequency of the bucket start dates, weeks start on Monday like Oracle's 'IW'
+GRANULARITIES = {"day": "D", "week": "W-MON", "month": "MS", "year": "YS"}
+
+
+# -- monthly calendar --------------------------------------------------------------------------------------------------
+# periods are YYYYMM integers, the form the page queries and rollups return
+def month_index(start, end):
+    """Return every YYYYMM period from ``start`` to ``end`` inclusive, in order."""
+    start, end = int(start), int(end)
+    months = np.arange((start // 100) * 12 + start % 100 - 1, (end // 100) * 12 + end % 100)
+    return months // 12 * 100 + months % 12 + 1
+
+
+def period_dates(periods):
+    """Return the first day of each YYYYMM period."""
+    periods = np.asarray(periods, dtype=int)
+    return pd.to_datetime(pd.DataFrame({"year": periods // 100, "month": periods % 100, "day": 1})).to_numpy()
+
+
+# -- calendar at any granularity ---------------------------------------------------------------------------------------
+# bucketed periods are the start dates of their day, week, month or year, the form TRUNC(date, mask) returns
+def period_index(start, end, granularity):
+    """Return the start date of every ``granularity`` bucket from ``start`` to ``end`` inclusive, in order."""
+    return pd.date_range(pd.Timestamp(start), pd.Timestamp(end), freq=GRANULARITIES[granularity]).to_numpy()
+
+
+def align(df, entity, period, value, entities=None, start=None, end=None, fill_value=np.nan, granularity=None):
+    """Scatter long (entity, period, value) rows into a dense period x entity frame over a complete calendar.
+
+    Without ``granularity`` periods are YYYYMM integers on a monthly calendar, otherwise they are bucket start dates
+    of that granularity. Rows are indexed by every period from ``start`` to ``end`` (default: the first and last
+    period in ``df``) and columns follow ``entities`` (default: order of appearance). Periods or entities without a
+    row hold ``fill_value``.
+    """
+    has_rows = df is not None and not df.empty and {entity, period, value} <= set(df.columns)
+    if entities is None:
+        entities = list(pd.unique(df[entity])) if has_rows else []
+    if granularity is None:
+        periods = df[period].astype(int).to_numpy() if has_rows else np.array([], dtype=int)
+        calendar_range = month_index
+    else:
+        periods = pd.to_datetime(df[period]).to_numpy() if has_rows else np.array([], dtype="datetime64[ns]")
+        calendar_range = lambda first, last: period_index(first, last, granularity)
+    if start is None:
+        start = periods.min() if len(periods) else None
+    if end is None:
+        end = periods.max() if len(periods) else None
+    calendar = calendar_range(start, end) if start is not None and end is not None else periods[:0]
+
+    matrix = np.full((len(calendar), len(entities)), fill_value, dtype=float)
+    if has_rows and len(calendar):
+        row = pd.Index(calendar).get_indexer(periods)
+        column = pd.Index(entities).get_indexer(df[entity])
+        keep = (row >= 0) & (column >= 0)
+        matrix[row[keep], column[keep]] = df[value].to_numpy(dtype=float)[keep]
+    return pd.DataFrame(matrix, index=pd.Index(calendar, name="Date"), columns=list(entities))
+
+
+# -- downsampling ------------------------------------------------------------------------------------------------------
+def lttb(x, y, budget):
+    """Return the indices of at most ``budget`` points picked by largest-triangle-three-buckets.
+
+    The first and last point are kept. Every bucket in between keeps the point spanning the largest triangle with the
+    point kept from the previous bucket and the mean of the next bucket, which preserves peaks and the line's shape.
+    """
+    n = len(y)
+    if budget >= n or budget < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    edges = np.linspace(1, n - 1, budget - 1).astype(int)
+    keep = np.empty(budget, dtype=int)
+    keep[0], keep[-1] = 0, n - 1
+    previous = 0
+    for i in range(budget - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start, next_end = end, edges[i + 2] if i + 2 < len(edges) else n
+        mean_x, mean_y = x[next_start:next_end].mean(), y[next_start:next_end].mean()
+        area = np.abs((x[previous] - mean_x) * (y[start:end] - y[previous])
+                      - (x[previous] - x[start:end]) * (mean_y - y[previous]))
+        previous = keep[i + 1] = start + int(area.argmax())
+    return keep
+
+
+def minmax(y, budget):
+    """Return the indices of at most ``budget`` points, the minimum and maximum of equal-width buckets in order."""
+    n = len(y)
+    if budget >= n or budget < 4:
+        return np.arange(n)
+    y = np.asarray(y, dtype=float)
+    edges = np.linspace(0, n, budget // 2 + 1).astype(int)
+    keep = []
+    for start, end in zip(edges[:-1], edges[1:]):
+        low, high = start + int(y[start:end].argmin()), start + int(y[start:end].argmax())
+        keep.extend(sorted({low, high}))
+    return np.asarray(keep)
+
+
+def decimate(frame, budget, method="lttb"):
+    """Return a dense period x entity ``frame`` in long form (Date, variable, value) with at most ``budget`` points
+    per entity.
+
+    Entities within budget keep every row, gaps included. Longer ones drop their gaps and are reduced by ``method``,
+    ``lttb`` or ``minmax``, so the payload stays bounded at any granularity.
+    """
+    parts = []
+    for column in frame.columns:
+        series = frame[column]
+        if len(series) > budget:
+            series = series.dropna()
+            x = series.index.to_numpy()
+            x = x.astype("datetime64[ns]").astype(np.int64) if np.issubdtype(x.dtype, np.datetime64) else x
+            index = lttb(x, series.to_numpy(), budget) if method == "lttb" else minmax(series.to_numpy(), budget)
+            series = series.iloc[index]
+        parts.append(pd.DataFrame({"Date": series.index, "variable": column, "value": series.to_numpy()}))
+    if not parts:
+        return pd.DataFrame({"Date": frame.index[:0], "variable": pd.Series(dtype=object), "value": []})
+    return pd.concat(parts, ignore_index=True)
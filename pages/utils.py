@@ -3,7 +3,12 @@
 # ----------------------------------------------------------------------------------------------------------------------
 import os
 import json
+import time
+import threading
 from pathlib import Path
+from functools import wraps
+from contextlib import contextmanager
+from contextvars import ContextVar
 from configparser import ConfigParser
 
 # ======================================================================================================================
@@ -26,17 +31,213 @@ import pandas as pd
 # ======================================================================================================================
 # import local packages
 # ----------------------------------------------------------------------------------------------------------------------
-from config.cred import USERNAME, PASSWORD, HOST, SID
+from pages import deadlines, metrics
+from pages.cache import FigureCache, ResultCache, frame_bytes
+from pages.fetch import fetch_frame, read_frame
+from pages.queries import NamedQuery
 
-username = USERNAME
-password = PASSWORD
-host = HOST
-port = 1521
-sid = SID
 
-dsn = oracledb.makedsn(host, port, sid=sid)
-connection_string = f"oracle+oracledb://{username}:{password}@{host}:{port}/{sid}"
-engine = sa.create_engine(connection_string)
+def get_config():
+    cfg_dir = Path(os.path.dirname(os.path.abspath(__file__))).parent/'config'
+    cfg = ConfigParser()
+    # the file named by TRENDBNB_CONFIG overrides config.ini, which is how the benchmarks point the app at their data
+    cfg.read([cfg_dir/'config.ini', *filter(None, [os.environ.get("TRENDBNB_CONFIG")])])
+    return cfg
+
+
+cfg = get_config()
+
+# typed: rows are fetched in arraysize batches (or as Arrow) into typed columns, read_sql: pandas' row-by-row reader
+FETCH_MODE = cfg.get("database", "fetch", fallback="typed")
+FETCH_ARRAYSIZE = cfg.getint("database", "fetch_arraysize", fallback=5000)
+
+
+# -- timeouts ----------------------------------------------------------------------------------------------------------
+def get_timeout(name, default):
+    """Return the timeout in seconds configured for a query name or callback label, else the ``default`` key's."""
+    return cfg.getfloat("timeouts", name, fallback=cfg.getfloat("timeouts", default, fallback=0)) or None
+
+
+def with_deadline(fallback):
+    """Bound a callback by its ``[timeouts]`` entry (default ``callback``) and answer ``fallback(error)`` past it."""
+    def decorator(func):
+        return deadlines.bounded(get_timeout(metrics.callback_label(func), "callback"), fallback)(func)
+    return decorator
+
+
+# -- connection pool ---------------------------------------------------------------------------------------------------
+def get_pool_options(cfg):
+    return {
+        "pool_size": cfg.getint("database", "pool_size", fallback=5),
+        "max_overflow": cfg.getint("database", "max_overflow", fallback=10),
+        "pool_pre_ping": cfg.getboolean("database", "pool_pre_ping", fallback=True),
+        "pool_recycle": cfg.getint("database", "pool_recycle", fallback=1800),
+        "pool_timeout": cfg.getfloat("database", "pool_timeout", fallback=30),
+    }
+
+
+def create_oracle_engine(cfg):
+    from config.cred import USERNAME, PASSWORD, HOST, SID
+
+    username = USERNAME
+    password = PASSWORD
+    host = HOST
+    port = 1521
+    sid = SID
+
+    connection_string = f"oracle+oracledb://{username}:{password}@{host}:{port}/{sid}"
+    # the registry sends the same bound statements over and over, keep them parsed on every pooled connection
+    connect_args = {"stmtcachesize": cfg.getint("database", "statement_cache_size", fallback=50)}
+    return sa.create_engine(connection_string, connect_args=connect_args, arraysize=FETCH_ARRAYSIZE,
+                            **get_pool_options(cfg))
+
+
+def create_engine(cfg):
+    backend = cfg.get("database", "backend", fallback="oracle")
+    if backend == "oracle":
+        return create_oracle_engine(cfg)
+    if backend == "duckdb":
+        from pages.snapshot import create_snapshot_engine
+        return create_snapshot_engine(cfg)
+    raise ValueError(f"unknown database backend '{backend}'")
+
+
+engine = create_engine(cfg)
+
+
+class PoolStats:
+    """Counters describing how the engine's connection pool behaves under load."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.connects = 0
+        self.overflow_events = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record_wait(self, seconds):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+
+    def record_connect(self, overflow):
+        with self._lock:
+            self.connects += 1
+            if overflow:
+                self.overflow_events += 1
+
+    def record_invalidation(self):
+        with self._lock:
+            self.invalidations += 1
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def snapshot(self, pool):
+        with self._lock:
+            return {
+                "pool_size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "idle": pool.checkedin(),
+                "overflow": max(pool.overflow(), 0),
+                "checkouts": self.checkouts,
+                "connects": self.connects,
+                "overflow_events": self.overflow_events,
+                "invalidations": self.invalidations,
+                "timeouts": self.timeouts,
+                "wait_total_ms": round(self.wait_total * 1000, 3),
+                "wait_avg_ms": round(self.wait_total * 1000 / self.checkouts, 3) if self.checkouts else 0.0,
+                "wait_max_ms": round(self.wait_max * 1000, 3),
+            }
+
+
+pool_stats = PoolStats()
+
+
+@sa.event.listens_for(engine, "connect")
+def _on_pool_connect(dbapi_connection, connection_record):
+    # the overflow counter is bumped before the new connection is created
+    pool_stats.record_connect(engine.pool.overflow() > 0)
+
+
+@sa.event.listens_for(engine, "invalidate")
+def _on_pool_invalidate(dbapi_connection, connection_record, exception):
+    pool_stats.record_invalidation()
+
+
+def get_pool_stats():
+    return pool_stats.snapshot(engine.pool)
+
+
+# -- connection scope --------------------------------------------------------------------------------------------------
+class CallbackConnection:
+    """The connection the queries of one callback share, checked out by the first of them that reaches the database."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.connection = None
+
+    def get(self):
+        if self.connection is None:
+            self.connection = checkout_connection(self.engine)
+        return self.connection
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+_callback_connection = ContextVar("callback_connection", default=None)
+
+
+def checkout_connection(engine):
+    start = time.perf_counter()
+    try:
+        connection = engine.connect()
+    except sa.exc.TimeoutError:
+        pool_stats.record_timeout()
+        raise
+    pool_stats.record_wait(time.perf_counter() - start)
+    return connection
+
+
+@contextmanager
+def db_connection(engine):
+    """Yield the connection of the current callback, or a connection of its own outside of one."""
+    scope = _callback_connection.get()
+    if scope is not None and scope.engine is engine:
+        yield scope.get()
+        return
+
+    connection = checkout_connection(engine)
+    try:
+        yield connection
+    finally:
+        connection.close()
+
+
+def reuse_connection(func):
+    """Run a callback with a single pooled connection shared by every db_query it issues.
+
+    Nothing is checked out up front: a callback answered from the result cache or the rollups never waits on the pool,
+    and one that queries takes its connection in db_query, where a pool timeout is handled like any query error.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        scope = CallbackConnection(engine)
+        token = _callback_connection.set(scope)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _callback_connection.reset(token)
+            scope.close()
+    return wrapper
 
 
 def get_data():
@@ -48,31 +249,176 @@ def get_table():
     headers = [{"name": i, "id": i} for i in df.columns]
     return values, headers
 
-def get_config():
-    cfg_dir = Path(os.path.dirname(os.path.abspath(__file__))).parent/'config'
-    cfg = ConfigParser()
-    cfg.read(cfg_dir/'config.ini')
-    return cfg
 
-def db_query(engine, query = None, params = None):
+# -- result cache ------------------------------------------------------------------------------------------------------
+result_cache = ResultCache.from_config(cfg, root=Path(os.path.dirname(os.path.abspath(__file__))).parent)
+figure_cache = FigureCache.from_config(cfg)
+
+
+def get_cache_stats():
+    return result_cache.stats()
+
+
+def get_figure_cache_stats():
+    return figure_cache.stats()
+
+
+def get_data_version():
+    """Return a token that changes whenever the rollups or the snapshot behind the pages are rebuilt."""
+    from pages.rollups import MANIFEST as ROLLUP_MANIFEST, rollup_dir, rollups_enabled
+    from pages.snapshot import MANIFEST as SNAPSHOT_MANIFEST, snapshot_dir
+
+    backend = cfg.get("database", "backend", fallback="oracle")
+    paths = [snapshot_dir(cfg)/SNAPSHOT_MANIFEST] if backend == "duckdb" else []
+    if rollups_enabled(cfg):
+        paths.append(rollup_dir(cfg)/ROLLUP_MANIFEST)
+    return ":".join([backend] + [str(path.stat().st_mtime_ns) for path in paths if path.exists()])
+
+
+_refresh_cache = ContextVar("refresh_cache", default=False)
+
+
+@contextmanager
+def refreshing_cache():
+    """Make every db_query in the block skip cached results and store what it fetches in their place."""
+    token = _refresh_cache.set(True)
     try:
-        connection = engine.connect()
-        print("Successfully connected to the database.")
-        if query is None:
-            query = "SELECT COUNT(*) FROM Listing"
+        yield
+    finally:
+        _refresh_cache.reset(token)
 
-        df = pd.read_sql(query, connection, params=params)
-        connection.close()
-        del connection
-        del engine
-        return df
 
+def db_query(engine, query = None, params = None, cache = True, name = None):
+    if query is None:
+        query = "SELECT COUNT(*) FROM Listing"
+    # registry queries are cached under their fingerprint and labelled in /metrics by name, other queries fall back
+    # to their SQL text and the callback issuing them
+    cache_query, dtypes = query, None
+    if isinstance(query, NamedQuery):
+        name = name or query.name
+        cache_query, query, dtypes = query.fingerprint, query.statement, query.dtypes
+    name = name or metrics.current_callback() or "adhoc"
+
+    key = None
+    if cache:
+        # results of a previous snapshot or rollup build are never served, whatever their age
+        namespace = f"{engine.url.render_as_string(hide_password=True)}:{get_data_version()}"
+        key = result_cache.key(cache_query, params, namespace=namespace)
+        df = result_cache.get(key) if not _refresh_cache.get() else None
+        if df is not None:
+            return df
+
+    start = time.perf_counter()
+    try:
+        timeout = deadlines.query_timeout(get_timeout(name, "query"))
+        with db_connection(engine) as connection, deadlines.guard(connection, timeout):
+            if FETCH_MODE == "read_sql":
+                df = read_frame(connection, query, params, dtypes)
+            else:
+                df = fetch_frame(connection, query, params, dtypes, FETCH_ARRAYSIZE)
+
+    except (deadlines.DeadlineExceeded, deadlines.QueryCancelled):
+        metrics.observe_query(name, time.perf_counter() - start, failed=True)
+        raise
     except oracledb.DatabaseError as e:
+        metrics.observe_query(name, time.perf_counter() - start, failed=True)
         error, = e.args
         print(f"Error Code: {error.code}")
         print(f"Error Message: {error.message}")
+        return None
     except sa.exc.DatabaseError as e:
+        metrics.observe_query(name, time.perf_counter() - start, failed=True)
         print(f"Error Code: {e}")
+        return None
+    except sa.exc.TimeoutError as e:
+        # every pooled connection stayed busy for pool_timeout, the page shows no data instead of an error
+        metrics.observe_query(name, time.perf_counter() - start, failed=True)
+        print(f"Connection Pool Timeout: {e}")
+        return None
+
+    size = frame_bytes(df)
+    metrics.observe_query(name, time.perf_counter() - start, len(df), size)
+    if key is not None:
+        result_cache.put(key, df, size)
+    return df
+
+
+# -- batched queries ---------------------------------------------------------------------------------------------------
+# Oracle rejects IN lists with more than 1000 expressions
+MAX_IN_LIST = 1000
+
+
+def db_query_batched(engine, query, key_param, keys, params=None, cache=True, name=None, key_column=None):
+    """Run one grouped query for every key in ``keys`` and return the long-format result.
+
+    ``query`` must filter with ``IN :<key_param>`` and return the key as a column so that callers can
+    pivot the result locally instead of issuing one round trip per key.
+
+    With ``key_column`` set, the result is cached per key: a selection that grows by one key only queries that key,
+    and a selection that shrinks is answered from the cache without a query.
+    """
+    keys = list(dict.fromkeys(keys or []))
+    if not keys:
+        return pd.DataFrame()
+    if isinstance(query, str):
+        query = sa.text(query)
+    if not isinstance(query, NamedQuery):
+        query = query.bindparams(sa.bindparam(key_param, expanding=True))
+    elif key_param not in query.expanding:
+        raise ValueError(f"query '{query.name}' does not expand :{key_param}")
+    if key_column is None or not cache or not result_cache.enabled:
+        return _fetch_batched(engine, query, key_param, keys, params, cache, name)
+
+    namespace = f"{engine.url.render_as_string(hide_password=True)}:{get_data_version()}:{key_param}"
+    cache_query = query.fingerprint if isinstance(query, NamedQuery) else query
+    cache_keys = {key: result_cache.key(cache_query, {**(params or {}), key_param: key}, namespace=namespace)
+                  for key in keys}
+    frames = {}
+    if not _refresh_cache.get():
+        for key in keys:
+            df = result_cache.get(cache_keys[key])
+            if df is not None:
+                frames[key] = df
+
+    missing = [key for key in keys if key not in frames]
+    if missing:
+        df = _fetch_batched(engine, query, key_param, missing, params, False, name)
+        if key_column in df.columns:
+            for key, part in _split_by_key(df, key_column, missing).items():
+                result_cache.put(cache_keys[key], part)
+                frames[key] = part
+
+    # empty results come back with object columns, leave them out so they do not upcast the other keys' columns
+    dfs = [frames[key] for key in keys if key in frames and not frames[key].empty]
+    if not dfs:
+        return next(iter(frames.values()), pd.DataFrame())
+    return pd.concat(dfs, ignore_index=True)
+
+
+def _fetch_batched(engine, query, key_param, keys, params, cache, name):
+    batches = [{**(params or {}), key_param: keys[i:i + MAX_IN_LIST]} for i in range(0, len(keys), MAX_IN_LIST)]
+    dfs = [db_query(engine, query, batch, cache=cache, name=name) for batch in batches]
+    dfs = [df for df in dfs if df is not None]
+    if not dfs:
+        return pd.DataFrame()
+    return pd.concat(dfs, ignore_index=True)
+
+
+def _split_by_key(df, key_column, keys):
+    # keys without rows get an empty frame so they are cached as known-empty too
+    groups = dict(iter(df.groupby(key_column, sort=False)))
+    return {key: groups[key].reset_index(drop=True) if key in groups else df.iloc[0:0] for key in keys}
+
+
+# -- worker processes --------------------------------------------------------------------------------------------------
+def prepare_fork():
+    """Release what a forked worker cannot inherit: the open connections."""
+    engine.dispose()
+
+
+def after_fork():
+    """Start a forked worker with its own connection pool instead of sockets copied from the parent."""
+    engine.dispose(close=False)
 
 
 
@@ -0,0 +1,139 @@
+# ======================================================================================================================
+# import standard library packages
+# ----------------------------------------------------------------------------------------------------------------------
+import json
+import time
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+# ======================================================================================================================
+# import local packages
+# ----------------------------------------------------------------------------------------------------------------------
+from pages.utils import refreshing_cache
+
+
+# distinct selections remembered per callback before the least requested ones are dropped
+MAX_TRACKED_SELECTIONS = 500
+
+
+# -- warm-up scheduler -------------------------------------------------------------------------------------------------
+class WarmupScheduler:
+    """Runs page callbacks in the background so their queries are cached before a visitor asks for them.
+
+    ``defaults`` maps a callback label such as ``hosts.update_graph`` to the argument lists it is warmed with, usually
+    the values the page renders with first. The ``top_n`` selections visitors requested most are warmed as well. The
+    first run at boot reads through the cache, later runs every ``interval`` seconds re-query and overwrite the cached
+    results so they never expire between runs. At most ``concurrency`` callbacks run at once.
+    """
+
+    def __init__(self, importer, page_names, defaults, interval=1800, concurrency=2, top_n=5):
+        self.importer = importer
+        self.page_names = {name.lower(): name for name in page_names}
+        self.defaults = {label.lower(): selections for label, selections in defaults.items()}
+        self.interval = interval
+        self.concurrency = concurrency
+        self.top_n = top_n
+        self.requests = {label: Counter() for label in self.defaults}
+        self.last_run = None
+        self._lock = threading.Lock()
+        self._thread = None
+        self._lock_file = None
+
+    @classmethod
+    def from_config(cls, cfg, importer, page_names):
+        section = cfg["warmup"] if cfg.has_section("warmup") else {}
+        settings = {"enabled", "interval", "concurrency", "top_n"}
+        defaults = {label: json.loads(value) for label, value in section.items() if label not in settings}
+        return cls(importer, page_names, defaults,
+                   interval=cfg.getfloat("warmup", "interval", fallback=1800),
+                   concurrency=cfg.getint("warmup", "concurrency", fallback=2),
+                   top_n=cfg.getint("warmup", "top_n", fallback=5))
+
+    def record(self, label, args):
+        """Count a selection sent to a warmed callback, called on the request path so it only touches a counter."""
+        counter = self.requests.get(label.lower())
+        if counter is None:
+            return
+        key = json.dumps(args, sort_keys=True, default=str)
+        with self._lock:
+            counter[key] += 1
+            if len(counter) > MAX_TRACKED_SELECTIONS:
+                kept = counter.most_common(MAX_TRACKED_SELECTIONS // 2)
+                counter.clear()
+                counter.update(dict(kept))
+
+    def selections(self):
+        jobs = []
+        for label, defaults in self.defaults.items():
+            with self._lock:
+                popular = [json.loads(key) for key, _ in self.requests[label].most_common(self.top_n)]
+            seen = set()
+            for args in defaults + popular:
+                key = json.dumps(args, sort_keys=True, default=str)
+                if key not in seen:
+                    seen.add(key)
+                    jobs.append((label, args))
+        return jobs
+
+    def _warm(self, label, args, refresh):
+        page, function = label.split(".", 1)
+        callback = getattr(self.importer(self.page_names[page]), function)
+        start = time.perf_counter()
+        try:
+            if refresh:
+                with refreshing_cache():
+                    callback(*args)
+            else:
+                callback(*args)
+        except Exception as e:
+            print(f"warm-up of {label}{tuple(args)} failed: {e!r}")
+            return None
+        return time.perf_counter() - start
+
+    def run(self, refresh=False):
+        jobs = self.selections()
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="warmup") as pool:
+            timings = list(pool.map(lambda job: self._warm(*job, refresh), jobs))
+        self.last_run = {
+            "finished": time.time(),
+            "refresh": refresh,
+            "jobs": len(jobs),
+            "failed": sum(t is None for t in timings),
+            "seconds": round(sum(t for t in timings if t is not None), 3),
+        }
+        return self.last_run
+
+    def _holds_lock(self, lock_path):
+        # with several worker processes only the one holding the lock refreshes, the others pick the fresh results up
+        # from the shared disk cache. The lock is released when its process exits, so a recycled worker hands it on.
+        if self._lock_file is None:
+            import fcntl  # only the forking server passes a lock, and it only runs on POSIX
+
+            lock_file = open(lock_path, "a")
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                return False
+            self._lock_file = lock_file
+        return True
+
+    def _loop(self, initial, lock_path):
+        if initial:
+            self.run(refresh=False)
+        while True:
+            time.sleep(self.interval)
+            if lock_path is None or self._holds_lock(lock_path):
+                self.run(refresh=True)
+
+    def start(self, initial=True, lock_path=None):
+        """Warm the defaults in a daemon thread, then keep refreshing them, without delaying the server start.
+
+        ``initial=False`` skips the first run when the caches were already warmed, e.g. before forking workers.
+        ``lock_path`` names a lock file shared by worker processes so that only one of them runs the refreshes.
+        """
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, args=(initial, lock_path), name="warmup", daemon=True)
+            self._thread.start()
+        return self._thread
@@ -0,0 +1,91 @@
+# ======================================================================================================================
+# import standard library packages
+# ----------------------------------------------------------------------------------------------------------------------
+import os
+import sys
+import tempfile
+from pathlib import Path
+from configparser import ConfigParser
+
+# ======================================================================================================================
+# import non-standard library packages
+# ----------------------------------------------------------------------------------------------------------------------
+import pandas as pd
+import pytest
+
+ROOT = Path(os.path.dirname(os.path.abspath(__file__))).parent
+sys.path.insert(0, str(ROOT))
+
+# modules importing pages.utils build the configured engine on import, point them at an empty DuckDB snapshot
+# instead of the Oracle database and keep their caches off the disk
+_config_dir = Path(tempfile.mkdtemp(prefix="trendbnb-tests-"))
+_cfg = ConfigParser()
+_cfg.read_dict({
+    "database": {"backend": "duckdb"},
+    "snapshot": {"dir": str(_config_dir/"snapshot")},
+    "cache": {"disk_enabled": "false"},
+    "rollups": {"enabled": "false"},
+    "background": {"enabled": "false"},
+    "warmup": {"enabled": "false"},
+})
+with open(_config_dir/"tests.ini", "w") as f:
+    _cfg.write(f)
+os.environ["TRENDBNB_CONFIG"] = str(_config_dir/"tests.ini")
+
+
+# -- snapshot ----------------------------------------------------------------------------------------------------------
+def snapshot_tables():
+    """A few hosts, listings and reviews in Paris, Rome and Oslo, reviewed over 2024."""
+    listings = pd.DataFrame({
+        "ListingID": [1, 2, 3, 4],
+        "HostID": [1, 1, 2, 3],
+        "City": ["Paris", "Paris", "Rome", "Oslo"],
+        "Country": ["France", "France", "Italy", "Norway"],
+        "FirstReview": pd.to_datetime(["2024-01-05", "2024-02-10", "2024-01-20", "2024-03-01"]),
+        "LastReview": pd.to_datetime(["2024-03-05", "2024-03-10", "2024-02-20", None]),
+        "DailyPrice": [100.0, 120.0, 80.0, 150.0],
+    })
+    hosts = pd.DataFrame({"HostID": [1, 2, 3],
+                          "HostSince": pd.to_datetime(["2023-06-01", "2023-11-15", "2024-02-01"])})
+    reviews = pd.DataFrame({
+        "ReviewID": range(1, 9),
+        "ListingID": [1, 1, 2, 2, 3, 3, 3, 4],
+        "ReviewDate": pd.to_datetime(["2024-01-05", "2024-03-05", "2024-02-10", "2024-03-10",
+                                      "2024-01-20", "2024-02-01", "2024-02-20", "2024-03-01"]),
+    })
+    detailed = pd.DataFrame({"ListingID": [1, 1, 2, 3, 4], "Rating": [4.0, 5.0, 3.0, 4.5, None],
+                             "Cleanliness": [5.0, 4.0, None, 3.0, 4.0]})
+    airbnb = pd.DataFrame({"ID": [1, 2], "City": ["Paris", "Rome"]})
+    return {"Host": hosts, "Listing": listings, "Review": reviews, "DetailedReview": detailed, "AirBnB": airbnb}
+
+
+@pytest.fixture
+def snapshot(tmp_path, monkeypatch):
+    """Write ``snapshot_tables`` as the app's snapshot and return its directory."""
+    from pages import utils
+    from pages.snapshot import write_manifest, write_table
+
+    out_dir = tmp_path/"snapshot"
+    out_dir.mkdir()
+    tables = snapshot_tables()
+    for table, df in tables.items():
+        write_table(out_dir, table, [df.copy()])
+    write_manifest(out_dir, {table: {"rows": len(df)} for table, df in tables.items()})
+    monkeypatch.setitem(utils.cfg["snapshot"], "dir", str(out_dir))
+    return out_dir
+
+
+@pytest.fixture
+def snapshot_engine(snapshot, monkeypatch):
+    """A DuckDB engine over ``snapshot``, set as the app's engine, with empty caches."""
+    from pages import utils
+    from pages.snapshot import create_snapshot_engine
+
+    engine = create_snapshot_engine(utils.cfg)
+    monkeypatch.setattr(utils, "engine", engine)
+    utils.result_cache.clear()
+    utils.figure_cache.clear()
+    yield engine
+    engine.dispose()
+    utils.result_cache.clear()
+    utils.figure_cache.clear()
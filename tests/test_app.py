@@ -0,0 +1,88 @@
+# ======================================================================================================================
+# import standard library packages
+# ----------------------------------------------------------------------------------------------------------------------
+from collections import Counter
+
+# ======================================================================================================================
+# import non-standard library packages
+# ----------------------------------------------------------------------------------------------------------------------
+import pytest
+
+# ======================================================================================================================
+# import local packages
+# ----------------------------------------------------------------------------------------------------------------------
+import trendbnb
+from pages import metrics, popularity
+from pages.utils import figure_cache
+
+POPULARITY = "popularity.update_popularity_graph"
+
+
+def popularity_request(clicks, city="Paris"):
+    return {
+        "output": "popularity_graph.figure",
+        "outputs": {"id": "popularity_graph", "property": "figure"},
+        "inputs": [{"id": "search_button", "property": "n_clicks", "value": clicks},
+                   {"id": "granularity-select", "property": "value", "value": "month"}],
+        "changedPropIds": ["search_button.n_clicks"],
+        "state": [{"id": "city_input", "property": "value", "value": city},
+                  {"id": "year_dropdown", "property": "value", "value": 100}],
+    }
+
+
+def timed_calls(label):
+    series = metrics.callback_seconds.collect().get(label)
+    return series[-1] if series else 0
+
+
+@pytest.fixture
+def client(snapshot_engine, monkeypatch):
+    monkeypatch.setattr(popularity, "engine", snapshot_engine)
+    return trendbnb.app.server.test_client()
+
+
+# -- figure cache ------------------------------------------------------------------------------------------------------
+def test_figure_is_cached_whatever_the_click_count(client):
+    calls = timed_calls(POPULARITY)
+    first = client.post(trendbnb.callback_path, json=popularity_request(1))
+    assert first.status_code == 200 and b"No data found" not in first.data
+    hits = figure_cache.stats()["hits"]
+
+    second = client.post(trendbnb.callback_path, json=popularity_request(2))
+    assert second.data == first.data and second.headers["ETag"] == first.headers["ETag"]
+    assert figure_cache.stats()["hits"] == hits + 1
+    # only the request that ran the callback is timed
+    assert timed_calls(POPULARITY) == calls + 1
+
+    client.post(trendbnb.callback_path, json=popularity_request(3, city="Rome"))
+    assert figure_cache.stats()["hits"] == hits + 1
+    assert timed_calls(POPULARITY) == calls + 2
+
+
+def test_matching_etag_is_not_modified(client):
+    first = client.post(trendbnb.callback_path, json=popularity_request(1))
+    etag = first.headers["ETag"]
+    assert client.post(trendbnb.callback_path, json=popularity_request(1), headers={"If-None-Match": etag}) \
+        .status_code == 304
+    # a client revalidating the response it just got while the figure is built gets the 304 too
+    figure_cache.clear()
+    response = client.post(trendbnb.callback_path, json=popularity_request(1), headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+
+def test_changed_data_version_rebuilds_the_figure(client, monkeypatch):
+    client.post(trendbnb.callback_path, json=popularity_request(1))
+    misses = figure_cache.stats()["misses"]
+    monkeypatch.setattr(trendbnb, "get_data_version", lambda: "rebuilt")
+    client.post(trendbnb.callback_path, json=popularity_request(1))
+    assert figure_cache.stats()["misses"] == misses + 1
+
+
+# -- warm-up -----------------------------------------------------------------------------------------------------------
+def test_visits_are_recorded_but_not_result_polls(client, monkeypatch):
+    monkeypatch.setitem(trendbnb.warmup.requests, POPULARITY, Counter())
+    client.post(trendbnb.callback_path, json=popularity_request(1))
+    client.post(trendbnb.callback_path, json=popularity_request(2))
+    client.post(f"{trendbnb.callback_path}?cacheKey=abc&job=1", json=popularity_request(3))
+    # the click count is left out, so both visits count as the same selection
+    assert trendbnb.warmup.requests[POPULARITY]['[null, "month", "Paris", 100]'] == 2
@@ -0,0 +1,106 @@
+# ======================================================================================================================
+# import standard library packages
+# ----------------------------------------------------------------------------------------------------------------------
+import time
+
+# ======================================================================================================================
+# import non-standard library packages
+# ----------------------------------------------------------------------------------------------------------------------
+import numpy as np
+import pandas as pd
+
+# ======================================================================================================================
+# import local packages
+# ----------------------------------------------------------------------------------------------------------------------
+from pages.cache import FigureCache, ResultCache, frame_bytes, normalize_sql
+
+
+def frame(rows=100, seed=0):
+    return pd.DataFrame({"value": np.random.default_rng(seed).random(rows)})
+
+
+# -- result cache ------------------------------------------------------------------------------------------------------
+def test_key_ignores_whitespace_and_parameter_order():
+    cache = ResultCache()
+    assert normalize_sql("SELECT  1\n FROM x") == "SELECT 1 FROM x"
+    assert cache.key("SELECT 1  FROM x", {"a": 1, "b": 2}) == cache.key("SELECT 1 FROM x", {"b": 2, "a": 1})
+    assert cache.key("SELECT 1", namespace="v1") != cache.key("SELECT 1", namespace="v2")
+
+
+def test_memory_tier_evicts_least_recently_used():
+    size = frame_bytes(frame())
+    cache = ResultCache(max_bytes=int(size * 2.5))
+    for name in ("a", "b"):
+        cache.put(name, frame())
+    cache.get("a")
+    cache.put("c", frame())
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_get_returns_a_copy():
+    cache = ResultCache()
+    cache.put("a", frame())
+    cache.get("a")["value"] = 0
+    assert cache.get("a")["value"].sum() > 0
+
+
+def test_memory_entries_expire(monkeypatch):
+    cache = ResultCache(ttl=10)
+    cache.put("a", frame())
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 11)
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_disk_tier_is_shared(tmp_path):
+    ResultCache(disk_dir=tmp_path).put("a", frame())
+    other = ResultCache(disk_dir=tmp_path)
+    assert other.get("a") is not None
+    assert other.stats()["disk_hits"] == 1
+
+
+def test_failed_disk_write_leaves_no_temporary_file(tmp_path):
+    cache = ResultCache(disk_dir=tmp_path)
+    # a lambda cannot be pickled
+    cache.put("a", pd.DataFrame({"value": [lambda: 1]}))
+    assert cache.stats()["disk_errors"] == 1
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_disk_tier_is_bounded(tmp_path):
+    ResultCache(disk_dir=tmp_path).put("sized", frame(2000, seed=0))
+    entry_bytes = (tmp_path/"sized.pkl.gz").stat().st_size
+    (tmp_path/"sized.pkl.gz").unlink()
+    cache = ResultCache(disk_dir=tmp_path, disk_max_bytes=int(entry_bytes * 3.5))
+    for i in range(3):
+        cache.put(f"e{i}", frame(2000, seed=i + 1))
+    # reading an entry keeps it over the ones written after it
+    cache.clear(disk=False)
+    cache.get("e0")
+    for i in range(3, 5):
+        cache.put(f"e{i}", frame(2000, seed=i + 1))
+    total = sum(path.stat().st_size for path in tmp_path.glob("*.pkl.gz"))
+    assert total <= entry_bytes * 3.5
+    assert (tmp_path/"e0.pkl.gz").exists()
+    assert not (tmp_path/"e1.pkl.gz").exists() and not (tmp_path/"e2.pkl.gz").exists()
+    assert cache.stats()["disk_evictions"] > 0
+
+
+# -- figure cache ------------------------------------------------------------------------------------------------------
+def test_figure_key_includes_data_version():
+    cache = FigureCache()
+    assert cache.key("graph.figure", ["Paris"], "v1") != cache.key("graph.figure", ["Paris"], "v2")
+
+
+def test_figure_cache_evicts_by_bytes():
+    cache = FigureCache(max_bytes=25)
+    cache.put("a", b"x" * 10, "etag-a")
+    cache.put("b", b"x" * 10, "etag-b")
+    assert cache.get("a") == (b"x" * 10, "etag-a")
+    cache.put("c", b"x" * 10, "etag-c")
+    assert cache.get("b") is None
+    assert cache.stats()["evictions"] == 1
+    assert FigureCache.etag(b"body") == FigureCache.etag(b"body")
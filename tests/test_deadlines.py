@@ -0,0 +1,83 @@
+# ======================================================================================================================
+# import standard library packages
+# ----------------------------------------------------------------------------------------------------------------------
+import time
+import threading
+
+# ======================================================================================================================
+# import non-standard library packages
+# ----------------------------------------------------------------------------------------------------------------------
+import pytest
+import sqlalchemy as sa
+
+# ======================================================================================================================
+# import local packages
+# ----------------------------------------------------------------------------------------------------------------------
+from pages import deadlines, utils
+from pages.deadlines import DeadlineExceeded, QueryCancelled, bounded, deadline, guard, query_timeout
+
+SLOW_QUERY = "SELECT COUNT(*) FROM range(1000000000) a, range(1000000) b WHERE a.range + b.range = -1"
+
+
+@pytest.fixture(autouse=True)
+def not_cancelled(monkeypatch):
+    monkeypatch.setattr(deadlines, "_cancelled", threading.Event())
+
+
+# -- callback deadline -------------------------------------------------------------------------------------------------
+def test_query_timeout_is_capped_by_the_deadline():
+    assert query_timeout(60) == 60
+    assert query_timeout(0) is None
+    with deadline(10):
+        assert 9 < query_timeout(60) <= 10
+        assert query_timeout(5) == 5
+        assert 9 < query_timeout(0) <= 10
+        # an inner deadline cannot extend the outer one
+        with deadline(100):
+            assert query_timeout(60) <= 10
+    assert query_timeout(60) == 60
+
+
+def test_passed_deadline_fails_the_next_query():
+    with deadline(0.01):
+        time.sleep(0.02)
+        with pytest.raises(DeadlineExceeded):
+            query_timeout(60)
+
+
+def test_bounded_callback_answers_with_the_fallback():
+    @bounded(0.01, fallback=lambda error: "timed out")
+    def update_graph(wait):
+        time.sleep(wait)
+        query_timeout(60)
+        return "figure"
+
+    assert update_graph(0) == "figure"
+    assert update_graph(0.02) == "timed out"
+
+
+# -- in-flight queries -------------------------------------------------------------------------------------------------
+def test_slow_query_is_interrupted(snapshot_engine):
+    start = time.monotonic()
+    with snapshot_engine.connect() as connection:
+        with pytest.raises(DeadlineExceeded):
+            with guard(connection, 0.1):
+                connection.execute(sa.text(SLOW_QUERY)).fetchall()
+        assert connection.invalidated
+    assert time.monotonic() - start < 5
+
+
+def test_db_query_raises_past_the_query_timeout(snapshot_engine, monkeypatch):
+    monkeypatch.setitem(utils.cfg["timeouts"], "query", "0.1")
+    with pytest.raises(DeadlineExceeded):
+        utils.db_query(snapshot_engine, SLOW_QUERY, cache=False, name="test.slow")
+    # the pool hands out a fresh connection afterwards
+    assert utils.db_query(snapshot_engine, "SELECT 1 AS One", cache=False)["one"].tolist() == [1]
+
+
+def test_cancelled_process_starts_no_query(snapshot_engine):
+    deadlines.cancel_in_flight()
+    with snapshot_engine.connect() as connection:
+        with pytest.raises(QueryCancelled):
+            with guard(connection, None):
+                pass
@@ -0,0 +1,55 @@
+# ======================================================================================================================
+# import standard library packages
+# ----------------------------------------------------------------------------------------------------------------------
+import time
+
+# ======================================================================================================================
+# import local packages
+# ----------------------------------------------------------------------------------------------------------------------
+from pages import dimensions
+from pages.dimensions import DimensionService
+
+
+def counting_queries(monkeypatch):
+    calls = []
+    db_query = dimensions.db_query
+
+    def counted(engine, query, *args, **kwargs):
+        calls.append(query.name)
+        return db_query(engine, query, *args, **kwargs)
+
+    monkeypatch.setattr(dimensions, "db_query", counted)
+    return calls
+
+
+# -- dimension service -------------------------------------------------------------------------------------------------
+def test_options_are_loaded_once(snapshot_engine, monkeypatch):
+    calls = counting_queries(monkeypatch)
+    service = DimensionService(snapshot_engine)
+    cities = service.get("listing_cities")
+    # most listed first
+    assert cities[0] == "Paris" and sorted(cities[1:]) == ["Oslo", "Rome"]
+    assert service.get("review_years") == [2024]
+    assert service.get("listing_cities") == cities
+    assert calls == ["dimension.listing_cities", "dimension.review_years"]
+
+
+def test_stale_options_are_served_while_they_reload(snapshot_engine, monkeypatch):
+    service = DimensionService(snapshot_engine, refresh_interval=60)
+    service.preload(["review_years"])
+    values, loaded = service._values["review_years"]
+    service._values["review_years"] = (["stale"], loaded - 120)
+    assert service.get("review_years") == ["stale"]
+    for _ in range(100):
+        if service._values["review_years"][0] == [2024]:
+            break
+        time.sleep(0.01)
+    assert service.get("review_years") == [2024]
+
+
+def test_unknown_dimension_has_no_options(snapshot_engine, monkeypatch):
+    calls = counting_queries(monkeypatch)
+    service = DimensionService(snapshot_engine)
+    assert service.get("listings; DROP TABLE Listing") == []
+    assert service.get(None) == []
+    assert calls == []
@@ -0,0 +1,65 @@
+# ======================================================================================================================
+# import non-standard library packages
+# ----------------------------------------------------------------------------------------------------------------------
+import pandas as pd
+import pytest
+import sqlalchemy as sa
+
+# ======================================================================================================================
+# import local packages
+# ----------------------------------------------------------------------------------------------------------------------
+from pages.fetch import apply_dtypes, fetch_frame, read_frame
+from pages.queries import QUERIES
+
+COUNTS = "SELECT City, SUM(ListingID) AS IDSum, COUNT(*) AS Listings FROM Listing GROUP BY City ORDER BY City"
+
+
+@pytest.fixture
+def connection(snapshot_engine):
+    with snapshot_engine.connect() as connection:
+        yield connection
+
+
+# -- typed fetch -------------------------------------------------------------------------------------------------------
+@pytest.mark.parametrize("arrow", [True, False])
+def test_columns_are_lower_case_and_typed(connection, arrow):
+    df = fetch_frame(connection, COUNTS, dtypes={"idsum": "int64", "listings": "int64"}, arrow=arrow)
+    assert list(df.columns) == ["city", "idsum", "listings"]
+    assert df["city"].tolist() == ["Oslo", "Paris", "Rome"]
+    assert df["idsum"].tolist() == [4, 3, 3]
+    assert df["idsum"].dtype == "int64" and df["listings"].dtype == "int64"
+
+
+def test_decimal_sums_are_numeric_without_dtypes(connection):
+    df = fetch_frame(connection, "SELECT CAST(SUM(ListingID) AS DECIMAL(18, 0)) AS IDSum, "
+                                 "CAST(SUM(ListingID) / 4 AS DECIMAL(10, 2)) AS Quarter FROM Listing")
+    assert df["idsum"].dtype == "int64" and df["quarter"].dtype == "float64"
+    assert df.iloc[0].tolist() == [10, 2.5]
+
+
+def test_small_batches_and_empty_results(connection):
+    df = fetch_frame(connection, "SELECT ListingID FROM Listing ORDER BY ListingID", arraysize=1, arrow=False)
+    assert df["listingid"].tolist() == [1, 2, 3, 4]
+    empty = fetch_frame(connection, "SELECT City FROM Listing WHERE City = 'Lima'", arrow=False)
+    assert list(empty.columns) == ["city"] and empty.empty
+
+
+def test_named_query_binds_expanding_params(connection):
+    query = QUERIES["seasonality.review_counts"]
+    df = fetch_frame(connection, query.statement, {"CityNames": ["Rome"], "Years": [2024]}, query.dtypes)
+    assert df.sort_values("reviewmonth")[["reviewmonth", "reviewcount"]].values.tolist() == [[1, 1], [2, 2]]
+    assert df["reviewcount"].dtype == "int64"
+
+
+def test_matches_read_sql(connection):
+    dtypes = {"idsum": "int64", "listings": "int64"}
+    pd.testing.assert_frame_equal(fetch_frame(connection, COUNTS, dtypes=dtypes),
+                                  read_frame(connection, sa.text(COUNTS), dtypes=dtypes))
+
+
+# -- dtypes ------------------------------------------------------------------------------------------------------------
+def test_nulls_in_an_integer_column_become_nan():
+    df = apply_dtypes(pd.DataFrame({"count": [1, None], "name": ["a", "b"]}, dtype=object),
+                      {"count": "int64", "missing": "int64"})
+    assert df["count"].dtype == "float64" and df["count"].isna().tolist() == [False, True]
+    assert df["name"].dtype == object
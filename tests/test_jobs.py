@@ -0,0 +1,72 @@
+# ======================================================================================================================
+# import standard library packages
+# ----------------------------------------------------------------------------------------------------------------------
+import time
+import shutil
+import subprocess
+from pathlib import Path
+from configparser import ConfigParser
+
+# ======================================================================================================================
+# import non-standard library packages
+# ----------------------------------------------------------------------------------------------------------------------
+import pytest
+
+# ======================================================================================================================
+# import local packages
+# ----------------------------------------------------------------------------------------------------------------------
+from pages.jobs import create_background_manager
+
+diskcache = pytest.importorskip("diskcache")
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def background_config(directory, **settings):
+    cfg = ConfigParser()
+    cfg.read_dict({"background": {"dir": str(directory), "cancel_grace": "0.2", **settings}})
+    return cfg
+
+
+@pytest.fixture
+def manager(tmp_path):
+    manager = create_background_manager(background_config(tmp_path/"jobs"))
+    yield manager
+    manager.handle.close()
+
+
+# -- background manager ------------------------------------------------------------------------------------------------
+def test_settings_and_directory(manager, tmp_path):
+    assert Path(manager.handle.directory) == tmp_path/"jobs"
+    assert manager.cancel_grace == 0.2 and manager.timeout is None
+    assert manager.expire == 600
+
+
+def test_relative_directory_is_under_the_repository(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    relative = Path(".cache")/"test-jobs"
+    manager = create_background_manager(background_config(relative, timeout="150"))
+    try:
+        assert Path(manager.handle.directory) == ROOT/relative
+        assert manager.timeout == 150
+    finally:
+        manager.handle.close()
+        shutil.rmtree(ROOT/relative)
+
+
+def test_each_request_gets_its_own_result(manager):
+    def update_cube(cities, years):
+        pass
+
+    assert manager.build_cache_key(update_cube, [["Paris"], [2024]], []) != \
+        manager.build_cache_key(update_cube, [["Paris"], [2024]], [])
+
+
+def test_terminate_signals_the_job_without_waiting(manager):
+    assert manager.terminate_job(None) is None
+    job = subprocess.Popen(["sleep", "30"])
+    start = time.monotonic()
+    manager.terminate_job(str(job.pid))
+    assert time.monotonic() - start < 0.2
+    # sleep does not handle SIGTERM, it ends as the job would once its query is cancelled
+    assert job.wait(timeout=5) != 0
+    assert not manager.job_running(str(job.pid))
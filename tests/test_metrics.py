@@ -0,0 +1,82 @@
+# ======================================================================================================================
+# import standard library packages
+# ----------------------------------------------------------------------------------------------------------------------
+import threading
+
+# ======================================================================================================================
+# import local packages
+# ----------------------------------------------------------------------------------------------------------------------
+from pages import metrics
+from pages.metrics import Counter, Histogram
+
+
+# -- sharded series ----------------------------------------------------------------------------------------------------
+def test_counter_sums_threads():
+    counter = Counter("test_total", "Test counter.", "query")
+
+    def work():
+        for _ in range(1000):
+            counter.inc("a")
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    counter.inc("b", 5)
+    assert counter.collect() == {"a": [4000], "b": [5]}
+
+
+def test_exited_threads_are_folded_into_retired_totals():
+    counter = Counter("test_total", "Test counter.", "query")
+    thread = threading.Thread(target=counter.inc, args=("a", 3))
+    thread.start()
+    thread.join()
+    assert counter.collect() == {"a": [3]}
+    # the exited thread's shard is gone, its count is kept
+    assert len(counter._shards) == 0
+    counter.inc("a")
+    assert counter.collect() == {"a": [4]}
+    assert counter.collect() == {"a": [4]}
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("test_seconds", "Test histogram.", "callback", buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 5.0):
+        histogram.observe("hosts.update_graph", value)
+    lines = histogram.render()
+    assert lines[:2] == ["# HELP test_seconds Test histogram.", "# TYPE test_seconds histogram"]
+    assert 'test_seconds_bucket{callback="hosts.update_graph",le="0.1"} 1' in lines
+    assert 'test_seconds_bucket{callback="hosts.update_graph",le="1.0"} 3' in lines
+    assert 'test_seconds_bucket{callback="hosts.update_graph",le="+Inf"} 4' in lines
+    assert 'test_seconds_sum{callback="hosts.update_graph"} 6.05' in lines
+    assert 'test_seconds_count{callback="hosts.update_graph"} 4' in lines
+
+
+def test_label_values_are_escaped():
+    counter = Counter("test_total", "Test counter.", "query")
+    counter.inc('say "hi"\n')
+    assert counter.render()[-1] == 'test_total{query="say \\"hi\\"\\n"} 1'
+
+
+# -- callback scope ----------------------------------------------------------------------------------------------------
+def test_query_time_is_attributed_to_the_callback():
+    token = metrics.start_callback("test.callback")
+    try:
+        assert metrics.current_callback() == "test.callback"
+        metrics.observe_query("test.query", 0.25, rows=10, size=100)
+        metrics.observe_query("test.query", 0.5, failed=True)
+        assert metrics.query_time() == 0.75
+    finally:
+        metrics.finish_callback(token, 10)
+    assert metrics.current_callback() is None
+    assert metrics.query_errors.collect()["test.query"] == [1]
+    assert metrics.query_rows.collect()["test.query"] == [10]
+
+
+def test_callback_label():
+    def update_graph():
+        pass
+
+    update_graph.__module__ = "pages.hosts"
+    assert metrics.callback_label(update_graph) == "hosts.update_graph"
@@ -0,0 +1,126 @@
+# ======================================================================================================================
+# import non-standard library packages
+# ----------------------------------------------------------------------------------------------------------------------
+import pytest
+import sqlalchemy as sa
+
+# ======================================================================================================================
+# import local packages
+# ----------------------------------------------------------------------------------------------------------------------
+from pages import migrations
+from pages.migrations import MIGRATIONS, Index, Migration, SummaryTable, migrate
+
+
+class FakeResult:
+    def __init__(self, value):
+        self.value = value
+
+    def scalar(self):
+        return self.value
+
+
+class FakeConnection:
+    """Answers the catalog lookups with ``existing`` and raises ``error`` on CREATE INDEX."""
+
+    def __init__(self, existing=0, error=None):
+        self.existing = existing
+        self.error = error
+        self.statements = []
+
+    def execute(self, statement, params=None):
+        self.statements.append((str(statement), params))
+        if str(statement).startswith("CREATE INDEX") and self.error is not None:
+            raise self.error
+        return FakeResult(self.existing)
+
+
+def database_error(message):
+    return sa.exc.DatabaseError("CREATE INDEX", {}, Exception(message))
+
+
+# -- indexes -----------------------------------------------------------------------------------------------------------
+def test_index_sql_is_qualified_with_the_owner():
+    index = Index("Listing_City_ID_IX", "Listing", ["City", "ListingID"], compress=1)
+    assert index.sql("APP") == 'CREATE INDEX "APP".Listing_City_ID_IX ON "APP".Listing (City, ListingID) COMPRESS 1'
+
+
+def test_existing_index_is_left_alone():
+    connection = FakeConnection(existing=1)
+    assert Index("Host_Since_IX", "Host", ["HostSince"]).apply(connection, "APP") == "exists"
+    assert len(connection.statements) == 1
+    assert connection.statements[0][1] == {"Owner": "APP", "IndexName": "HOST_SINCE_IX"}
+
+
+def test_missing_index_is_created():
+    connection = FakeConnection()
+    assert Index("Host_Since_IX", "Host", ["HostSince"]).apply(connection, "APP") == "created"
+    assert connection.statements[-1][0] == 'CREATE INDEX "APP".Host_Since_IX ON "APP".Host (HostSince)'
+
+
+def test_column_list_indexed_under_another_name():
+    connection = FakeConnection(error=database_error("ORA-01408: such column list already indexed"))
+    assert Index("Host_Since_IX", "Host", ["HostSince"]).apply(connection, "APP") == "indexed under another name"
+    with pytest.raises(sa.exc.DatabaseError):
+        Index("Host_Since_IX", "Host", ["HostSince"]).apply(FakeConnection(error=database_error("ORA-01031")), "APP")
+
+
+# -- summary tables ----------------------------------------------------------------------------------------------------
+def test_summary_table_is_created_with_its_key():
+    connection = FakeConnection()
+    table = SummaryTable("ListingRating", "SELECT ListingID, COUNT(*) AS N\n  FROM DetailedReview GROUP BY ListingID",
+                         "ListingID")
+    assert table.apply(connection, "APP") == "created"
+    assert connection.statements[0][1] == {"Owner": "APP", "TableName": "LISTINGRATING"}
+    assert [statement for statement, _ in connection.statements[1:]] == [
+        'CREATE TABLE "APP".ListingRating AS SELECT ListingID, COUNT(*) AS N FROM DetailedReview GROUP BY ListingID',
+        'ALTER TABLE "APP".ListingRating ADD CONSTRAINT ListingRating_PK PRIMARY KEY (ListingID)',
+    ]
+
+
+def test_existing_summary_table_is_left_to_rollup_build():
+    connection = FakeConnection(existing=1)
+    assert SummaryTable("ListingRating", "SELECT 1", "ListingID").apply(connection, "APP") == "exists"
+    assert len(connection.statements) == 1
+
+
+def test_listing_ratings_are_created_by_a_migration():
+    steps = [step for migration in MIGRATIONS for step in migration.steps]
+    assert any(isinstance(step, SummaryTable) and step.name == "ListingRating" for step in steps)
+
+
+def test_versions_only_grow():
+    versions = [migration.version for migration in MIGRATIONS]
+    assert versions == sorted(set(versions))
+
+
+# -- migrate -----------------------------------------------------------------------------------------------------------
+class RecordingStep:
+    def __init__(self, calls):
+        self.calls = calls
+
+    def sql(self, owner):
+        return "SELECT 1"
+
+    def apply(self, connection, owner):
+        self.calls.append(owner)
+        return "created"
+
+
+def test_migrate_applies_each_version_once(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(migrations, "MIGRATIONS", [Migration(1, "first", [RecordingStep(calls)]),
+                                                   Migration(2, "second", [RecordingStep(calls)])])
+    engine = sa.create_engine(f"sqlite:///{tmp_path/'migrations.db'}")
+    # the bookkeeping is plain SQL, only the steps are Oracle specific
+    monkeypatch.setattr(engine.dialect, "name", "oracle")
+
+    report = migrate(engine, timings=False, verbose=False)
+    assert [applied["version"] for applied in report["applied"]] == [1, 2]
+    assert len(calls) == 2
+    assert migrate(engine, timings=False, verbose=False) == {"applied": [], "pending": []}
+    assert len(calls) == 2
+
+
+def test_nothing_to_migrate_on_duckdb():
+    engine = sa.create_engine("duckdb:///:memory:")
+    assert migrate(engine, timings=False, verbose=False) == {"applied": [], "pending": []}
@@ -0,0 +1,75 @@
+# ======================================================================================================================
+# import non-standard library packages
+# ----------------------------------------------------------------------------------------------------------------------
+import pytest
+
+# ======================================================================================================================
+# import local packages
+# ----------------------------------------------------------------------------------------------------------------------
+from pages import rollups, utils
+from pages.queries import QUERIES
+from pages.rollups import build_listing_ratings, build_rollups, load_rollup, rollups_enabled
+from pages.utils import db_query
+
+REVIEW_SCORES = {"CityNames": ["Paris", "Rome"], "NumberOfYears": 100}
+
+
+# -- listing rating summary --------------------------------------------------------------------------------------------
+def scores(engine):
+    df = db_query(engine, QUERIES["reviews.review_scores.month"], REVIEW_SCORES, cache=False)
+    return {(city, str(bucket.date())): round(score, 4)
+            for city, bucket, score in zip(df.city, df.bucketstart, df.avgreviewscore)}
+
+
+def test_review_scores_before_and_after_the_summary_is_built(snapshot, snapshot_engine):
+    # a fresh snapshot has no ListingRating table, the review queries read the summary computed on the fly
+    assert not (snapshot/"ListingRating").exists()
+    before = scores(snapshot_engine)
+    assert before == {("Paris", "2024-01-01"): 4.5, ("Paris", "2024-02-01"): 3.0, ("Paris", "2024-03-01"): 4.0,
+                      ("Rome", "2024-01-01"): 4.5, ("Rome", "2024-02-01"): 4.5}
+
+    assert build_listing_ratings(snapshot_engine) == 4
+    assert (snapshot/"ListingRating").exists()
+    # connections opened from now on read the table
+    snapshot_engine.dispose()
+    assert scores(snapshot_engine) == before
+
+
+def test_review_dimensions_join_the_summary(snapshot_engine):
+    df = db_query(snapshot_engine, QUERIES["dimension.review_cities"], cache=False)
+    assert dict(zip(df.city, df["count"])) == {"Rome": 3, "Paris": 4, "Oslo": 1}
+
+
+# -- rollups -----------------------------------------------------------------------------------------------------------
+@pytest.fixture
+def built(snapshot_engine, tmp_path, monkeypatch):
+    monkeypatch.setitem(utils.cfg["rollups"], "dir", str(tmp_path/"rollups"))
+    monkeypatch.setitem(utils.cfg["rollups"], "enabled", "true")
+    assert not rollups_enabled()
+    return build_rollups(snapshot_engine, verbose=False)
+
+
+def test_build_writes_every_rollup_and_the_manifest(built):
+    assert rollups_enabled()
+    assert set(built["rollups"]) == set(rollups.ROLLUP_QUERIES) | set(rollups.DERIVED_ROLLUPS)
+    assert built["listing_ratings"]["rows"] == 4
+    assert built["rollups"]["review_monthly"]["rows"] == 6
+
+
+def test_rollups_answer_like_the_live_queries(built, snapshot_engine):
+    live = db_query(snapshot_engine, QUERIES["seasonality.review_counts"], {"CityNames": ["Paris", "Rome"],
+                                                                          "Years": [2024]})
+    rollup = rollups.review_counts(["Paris", "Rome"], [2024])
+    key = ["city", "reviewyear", "reviewmonth"]
+    assert rollup.sort_values(key).to_dict("records") == live.sort_values(key)[rollup.columns].to_dict("records")
+
+    live = db_query(snapshot_engine, QUERIES["cleanliness.cleanliness_change"], {"CountryNames": ["France", "Italy"]})
+    rollup = rollups.cleanliness_change(["France", "Italy"])
+    assert rollup.to_dict("records") == live[rollup.columns].to_dict("records")
+
+
+def test_readers_pick_up_a_rebuild(built, snapshot_engine):
+    first = load_rollup("review_monthly")
+    assert load_rollup("review_monthly") is first
+    build_rollups(snapshot_engine, ["review_monthly"], verbose=False)
+    assert load_rollup("review_monthly") is not first
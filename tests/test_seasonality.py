@@ -0,0 +1,37 @@
+# ======================================================================================================================
+# import non-standard library packages
+# ----------------------------------------------------------------------------------------------------------------------
+import numpy as np
+import pandas as pd
+
+# ======================================================================================================================
+# import local packages
+# ----------------------------------------------------------------------------------------------------------------------
+import trendbnb  # noqa: F401, the page modules register themselves with the app
+from pages import seasonality
+from pages.seasonality import build_cube
+
+
+# -- review cube -------------------------------------------------------------------------------------------------------
+def test_cube_is_city_by_year_by_month():
+    df = pd.DataFrame({"city": ["Paris", "Paris", "Rome"], "reviewyear": [2023, 2024, 2024],
+                       "reviewmonth": [12, 1, 7], "reviewcount": [5, 2, 9]})
+    cube = build_cube(df, ["Rome", "Paris"], [2024, 2023])
+    assert cube.shape == (2, 2, 12)
+    # cities and years keep the selection order
+    assert cube[0, 0, 6] == 9
+    assert cube[1, 0, 0] == 2
+    assert cube[1, 1, 11] == 5
+    assert np.isnan(cube).sum() == 2 * 2 * 12 - 3
+
+
+def test_cube_without_reviews():
+    assert np.isnan(build_cube(pd.DataFrame(), ["Paris"], [2024])).all()
+    assert build_cube(None, ["Paris"], []).shape == (1, 0, 12)
+
+
+def test_update_cube_queries_the_selection(snapshot_engine, monkeypatch):
+    monkeypatch.setattr(seasonality, "engine", snapshot_engine)
+    cube = seasonality.update_cube(["Paris", "Rome"], ["2024"])["cube"]
+    assert cube[0][0][:4] == [1, 1, 2, None]
+    assert cube[1][0][:4] == [1, 2, None, None]
@@ -0,0 +1,85 @@
+# ======================================================================================================================
+# import standard library packages
+# ----------------------------------------------------------------------------------------------------------------------
+import json
+from configparser import ConfigParser
+
+# ======================================================================================================================
+# import non-standard library packages
+# ----------------------------------------------------------------------------------------------------------------------
+import pandas as pd
+import sqlalchemy as sa
+
+# ======================================================================================================================
+# import local packages
+# ----------------------------------------------------------------------------------------------------------------------
+from pages.snapshot import MANIFEST, create_snapshot_engine, get_manifest, translate_oracle, write_manifest, write_table
+
+
+# -- oracle translation ------------------------------------------------------------------------------------------------
+def test_sysdate_becomes_current_timestamp():
+    assert translate_oracle("WHERE d > ADD_MONTHS(SYSDATE, -12)") == "WHERE d > ADD_MONTHS(CURRENT_TIMESTAMP, -12)"
+    # only the whole word
+    assert translate_oracle("SELECT SYSDATE_COLUMN FROM t") == "SELECT SYSDATE_COLUMN FROM t"
+
+
+def test_date_masks_become_date_trunc():
+    assert translate_oracle("TRUNC(R.ReviewDate, 'IW')") == "date_trunc('week', CAST(R.ReviewDate AS TIMESTAMP))"
+    assert translate_oracle("trunc( d ,'yyyy' )") == "date_trunc('year', CAST(d AS TIMESTAMP))"
+    assert translate_oracle("TRUNC(d, 'DD'), TRUNC(d, 'MM')") == \
+        "date_trunc('day', CAST(d AS TIMESTAMP)), date_trunc('month', CAST(d AS TIMESTAMP))"
+
+
+def test_numeric_trunc_is_left_alone():
+    assert translate_oracle("TRUNC(AVG(Rating), 2)") == "TRUNC(AVG(Rating), 2)"
+    assert translate_oracle("TRUNC(d)") == "TRUNC(d)"
+
+
+# -- embedded engine ---------------------------------------------------------------------------------------------------
+def snapshot(tmp_path):
+    cfg = ConfigParser()
+    cfg.read_dict({"snapshot": {"dir": str(tmp_path)}, "database": {"pool_size": "1", "max_overflow": "0"}})
+    listings = pd.DataFrame({"ListingID": [1, 2, 3], "Country": ["France", "France", "Italy"]})
+    reviews = pd.DataFrame({"ListingID": [1, 1, 2], "Rating": [4.0, 5.0, None], "Cleanliness": [3.0, None, 4.0],
+                            "ReviewDate": pd.to_datetime(["2024-01-03", "2024-01-10", "2024-02-01"])})
+    assert write_table(tmp_path, "Listing", [listings]) == 3
+    assert write_table(tmp_path, "DetailedReview", [reviews.iloc[:2], reviews.iloc[2:]]) == 3
+    write_manifest(tmp_path, {"Listing": 3, "DetailedReview": 3}, source="tests")
+    return cfg
+
+
+def test_write_table_partitions_and_replaces(tmp_path):
+    snapshot(tmp_path)
+    assert sorted(path.name for path in (tmp_path/"Listing").iterdir()) == ["part_country=France",
+                                                                            "part_country=Italy"]
+    write_table(tmp_path, "Listing", [pd.DataFrame({"ListingID": [9], "Country": ["Spain"]})])
+    assert [path.name for path in (tmp_path/"Listing").iterdir()] == ["part_country=Spain"]
+    assert not list(tmp_path.glob(".*.tmp"))
+
+
+def test_manifest_round_trip(tmp_path):
+    cfg = snapshot(tmp_path)
+    with open(tmp_path/MANIFEST) as f:
+        assert json.load(f) == get_manifest(cfg)
+    assert get_manifest(cfg)["source"] == "tests"
+
+
+def test_engine_runs_oracle_queries(tmp_path):
+    engine = create_snapshot_engine(snapshot(tmp_path))
+    with engine.connect() as connection:
+        rows = connection.execute(sa.text(
+            "SELECT TRUNC(ReviewDate, 'IW') AS week, COUNT(*) AS n FROM \"ANDREW.GOLDSTEIN\".DetailedReview "
+            "WHERE ReviewDate > ADD_MONTHS(SYSDATE, -1200) GROUP BY TRUNC(ReviewDate, 'IW') ORDER BY week"
+        )).fetchall()
+    assert [(str(week.date()), n) for week, n in rows] == [("2024-01-01", 1), ("2024-01-08", 1), ("2024-01-29", 1)]
+    engine.dispose()
+
+
+def test_listing_ratings_fall_back_to_the_source_table(tmp_path):
+    engine = create_snapshot_engine(snapshot(tmp_path))
+    with engine.connect() as connection:
+        rows = connection.execute(sa.text(
+            "SELECT ListingID, RatingSum, RatingCount, CleanSum, CleanCount FROM ListingRating ORDER BY ListingID"
+        )).fetchall()
+    assert [tuple(row) for row in rows] == [(1, 9.0, 2, 3.0, 1), (2, None, 0, 4.0, 1)]
+    engine.dispose()
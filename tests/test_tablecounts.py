@@ -0,0 +1,58 @@
+# ======================================================================================================================
+# import standard library packages
+# ----------------------------------------------------------------------------------------------------------------------
+import threading
+from types import SimpleNamespace
+
+# ======================================================================================================================
+# import non-standard library packages
+# ----------------------------------------------------------------------------------------------------------------------
+import pandas as pd
+
+# ======================================================================================================================
+# import local packages
+# ----------------------------------------------------------------------------------------------------------------------
+from pages import tablecounts
+from pages.tablecounts import TableCounts
+
+COUNTS = {"Host": 3, "Listing": 4, "AirBnB": 2, "Review": 8, "DetailedReview": 5}
+
+
+def fake_engine(dialect):
+    return SimpleNamespace(dialect=SimpleNamespace(name=dialect))
+
+
+# -- table counts ------------------------------------------------------------------------------------------------------
+def test_estimates_until_the_exact_counts_are_in(snapshot_engine):
+    counts = TableCounts(snapshot_engine)
+    estimate = counts.get()
+    assert estimate["counts"] == COUNTS and not estimate["exact"]
+    counts._thread.join()
+    exact = counts.get()
+    assert exact["counts"] == COUNTS and exact["exact"]
+
+
+def test_statistics_of_the_configured_owner(monkeypatch):
+    calls = []
+
+    def db_query(engine, query, params=None, **kwargs):
+        calls.append((query.name, params))
+        return pd.DataFrame({"tablename": [table.upper() for table in COUNTS], "tuplecount": list(COUNTS.values()),
+                             "lastanalyzed": pd.Timestamp("2024-05-01")})
+
+    monkeypatch.setattr(tablecounts, "db_query", db_query)
+    counts = TableCounts(fake_engine("oracle"), owner="APP")
+    assert counts._estimate()["counts"] == COUNTS
+    assert calls == [("home.table_stats", {"Owner": "APP", "TableNames": [table.upper() for table in COUNTS]})]
+
+
+def test_unknown_counts_when_the_count_takes_too_long(monkeypatch):
+    done = threading.Event()
+    monkeypatch.setattr(TableCounts, "refresh", lambda self: done.wait(5))
+    # the test snapshot has no manifest to estimate from
+    counts = TableCounts(fake_engine("duckdb"), wait=0.05)
+    try:
+        result = counts.get()
+        assert result == {"counts": dict.fromkeys(COUNTS), "exact": False, "as_of": None}
+    finally:
+        done.set()
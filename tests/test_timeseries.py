@@ -0,0 +1,106 @@
+# ======================================================================================================================
+# import non-standard library packages
+# ----------------------------------------------------------------------------------------------------------------------
+import numpy as np
+import pandas as pd
+
+# ======================================================================================================================
+# import local packages
+# ----------------------------------------------------------------------------------------------------------------------
+from pages.timeseries import align, decimate, lttb, minmax, month_index, period_dates, period_index
+
+
+# -- calendar ----------------------------------------------------------------------------------------------------------
+def test_month_index_crosses_years():
+    assert month_index(202311, 202402).tolist() == [202311, 202312, 202401, 202402]
+    assert month_index(202405, 202405).tolist() == [202405]
+
+
+def test_period_dates_are_first_of_month():
+    dates = period_dates([202401, 202412])
+    assert list(pd.DatetimeIndex(dates)) == [pd.Timestamp("2024-01-01"), pd.Timestamp("2024-12-01")]
+
+
+def test_weeks_start_on_monday():
+    weeks = pd.DatetimeIndex(period_index("2024-01-01", "2024-01-31", "week"))
+    assert (weeks.dayofweek == 0).all()
+    assert len(weeks) == 5
+
+
+# -- align -------------------------------------------------------------------------------------------------------------
+def test_align_fills_missing_months():
+    df = pd.DataFrame({"city": ["Paris", "Paris", "Rome"], "period": [202401, 202403, 202402],
+                       "value": [1.0, 3.0, 2.0]})
+    frame = align(df, "city", "period", "value", fill_value=0)
+    assert frame.index.tolist() == [202401, 202402, 202403]
+    assert frame.columns.tolist() == ["Paris", "Rome"]
+    assert frame["Paris"].tolist() == [1.0, 0.0, 3.0]
+    assert frame["Rome"].tolist() == [0.0, 2.0, 0.0]
+
+
+def test_align_keeps_requested_entities_and_range():
+    df = pd.DataFrame({"city": ["Paris", "Oslo"], "period": [202402, 202402], "value": [5.0, 7.0]})
+    frame = align(df, "city", "period", "value", entities=["Rome", "Paris"], start=202401, end=202403)
+    assert frame.columns.tolist() == ["Rome", "Paris"]
+    assert frame.index.tolist() == [202401, 202402, 202403]
+    assert np.isnan(frame["Rome"]).all()
+    assert frame.loc[202402, "Paris"] == 5.0
+
+
+def test_align_by_granularity():
+    df = pd.DataFrame({"city": ["Paris", "Paris"], "bucket": pd.to_datetime(["2024-01-01", "2024-01-15"]),
+                       "value": [1.0, 2.0]})
+    frame = align(df, "city", "bucket", "value", fill_value=0, granularity="week")
+    assert len(frame) == 3
+    assert frame["Paris"].tolist() == [1.0, 0.0, 2.0]
+
+
+def test_align_without_rows():
+    frame = align(pd.DataFrame(), "city", "period", "value", entities=["Paris"])
+    assert frame.empty
+    assert frame.columns.tolist() == ["Paris"]
+
+
+# -- downsampling ------------------------------------------------------------------------------------------------------
+def test_lttb_keeps_ends_and_peak():
+    x = np.arange(1000)
+    y = np.sin(x / 50)
+    y[517] = 100
+    keep = lttb(x, y, 50)
+    assert len(keep) == 50
+    assert keep[0] == 0 and keep[-1] == 999
+    assert 517 in keep
+    assert (np.diff(keep) > 0).all()
+
+
+def test_lttb_within_budget_keeps_everything():
+    assert lttb(np.arange(10), np.arange(10), 20).tolist() == list(range(10))
+
+
+def test_minmax_keeps_bucket_extremes():
+    y = np.zeros(1000)
+    y[100], y[900] = -5, 5
+    keep = minmax(y, 20)
+    assert len(keep) <= 20
+    assert 100 in keep and 900 in keep
+    assert (np.diff(keep) > 0).all()
+
+
+def test_decimate_bounds_long_series_only():
+    index = pd.RangeIndex(5000)
+    frame = pd.DataFrame({"long": np.random.default_rng(0).random(5000),
+                          "short": [np.nan] * 4990 + [1.0] * 10}, index=index)
+    points = decimate(frame[["long"]], 100)
+    assert len(points) == 100
+    assert set(points.columns) == {"Date", "variable", "value"}
+
+    short = decimate(frame.iloc[:50][["short"]], 100)
+    # a series within budget keeps its gaps
+    assert len(short) == 50
+    assert short.value.isna().all()
+
+
+def test_decimate_minmax_and_empty():
+    frame = pd.DataFrame({"a": np.arange(1000.0)})
+    assert len(decimate(frame, 100, "minmax")) <= 100
+    assert decimate(pd.DataFrame(index=pd.RangeIndex(0)), 100).empty
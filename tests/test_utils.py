@@ -0,0 +1,140 @@
+# ======================================================================================================================
+# import non-standard library packages
+# ----------------------------------------------------------------------------------------------------------------------
+import pytest
+import sqlalchemy as sa
+
+# ======================================================================================================================
+# import local packages
+# ----------------------------------------------------------------------------------------------------------------------
+from pages import utils
+from pages.queries import QUERIES
+from pages.snapshot import create_snapshot_engine
+from pages.utils import db_query, pool_stats, reuse_connection
+
+CITY_COUNTS = "SELECT City, COUNT(*) AS N FROM Listing GROUP BY City ORDER BY City"
+PRICES = "SELECT ListingID, DailyPrice FROM Listing ORDER BY ListingID"
+
+
+# -- connection scope --------------------------------------------------------------------------------------------------
+def test_callback_checks_out_on_its_first_query(snapshot_engine):
+    @reuse_connection
+    def callback():
+        return db_query(snapshot_engine, CITY_COUNTS), db_query(snapshot_engine, PRICES)
+
+    checkouts = pool_stats.checkouts
+    counts, prices = callback()
+    assert counts.city.tolist() == ["Oslo", "Paris", "Rome"] and len(prices) == 4
+    # both queries share one connection, which is back in the pool once the callback returns
+    assert pool_stats.checkouts == checkouts + 1
+    assert snapshot_engine.pool.checkedout() == 0
+
+
+def test_cached_callback_never_checks_out(snapshot_engine):
+    @reuse_connection
+    def callback():
+        return db_query(snapshot_engine, CITY_COUNTS)
+
+    callback()
+    checkouts = pool_stats.checkouts
+    for _ in range(5):
+        assert len(callback()) == 3
+    assert pool_stats.checkouts == checkouts
+
+
+def test_exhausted_pool_answers_from_the_cache(snapshot, monkeypatch):
+    for option, value in {"pool_size": "1", "max_overflow": "0", "pool_timeout": "0.1"}.items():
+        monkeypatch.setitem(utils.cfg["database"], option, value)
+    engine = create_snapshot_engine(utils.cfg)
+    monkeypatch.setattr(utils, "engine", engine)
+    utils.result_cache.clear()
+
+    @reuse_connection
+    def callback(query):
+        return db_query(engine, query)
+
+    assert len(callback(CITY_COUNTS)) == 3
+    with engine.connect():
+        assert len(callback(CITY_COUNTS)) == 3
+        # a query that has to reach the database gives up after pool_timeout like after any query error
+        assert callback(PRICES) is None
+    assert len(callback(PRICES)) == 4
+    engine.dispose()
+    utils.result_cache.clear()
+
+
+def test_queries_outside_a_callback_return_their_connection(snapshot_engine):
+    assert len(db_query(snapshot_engine, sa.text(PRICES), cache=False)) == 4
+    assert snapshot_engine.pool.checkedout() == 0
+
+
+# -- batched queries ---------------------------------------------------------------------------------------------------
+def test_one_query_answers_every_key(snapshot_engine):
+    df = utils.db_query_batched(snapshot_engine, QUERIES["seasonality.review_counts"], "CityNames",
+                                ["Paris", "Rome", "Paris"], {"Years": [2024]})
+    totals = df.groupby("city").reviewcount.sum().to_dict()
+    assert totals == {"Paris": 4, "Rome": 3}
+
+
+def test_long_key_lists_are_split_into_in_lists(snapshot_engine, monkeypatch):
+    monkeypatch.setattr(utils, "MAX_IN_LIST", 2)
+    calls = []
+    db_query = utils.db_query
+
+    def counted(engine, query, params=None, **kwargs):
+        calls.append(params["CityNames"])
+        return db_query(engine, query, params, **kwargs)
+
+    monkeypatch.setattr(utils, "db_query", counted)
+    df = utils.db_query_batched(snapshot_engine, QUERIES["seasonality.review_counts"], "CityNames",
+                                ["Paris", "Rome", "Oslo"], {"Years": [2024]})
+    assert calls == [["Paris", "Rome"], ["Oslo"]]
+    assert sorted(df.city.unique()) == ["Oslo", "Paris", "Rome"]
+
+
+def test_batched_query_must_expand_the_key(snapshot_engine):
+    with pytest.raises(ValueError):
+        utils.db_query_batched(snapshot_engine, QUERIES["popularity.reviews.year"], "CityName", ["Paris"])
+    assert utils.db_query_batched(snapshot_engine, QUERIES["seasonality.review_counts"], "CityNames", []).empty
+
+
+# -- per-key cache -----------------------------------------------------------------------------------------------------
+def queried_keys(monkeypatch):
+    calls = []
+    fetch = utils._fetch_batched
+
+    def counted(engine, query, key_param, keys, *args):
+        calls.append(list(keys))
+        return fetch(engine, query, key_param, keys, *args)
+
+    monkeypatch.setattr(utils, "_fetch_batched", counted)
+    return calls
+
+
+def review_counts(engine, cities):
+    df = utils.db_query_batched(engine, QUERIES["seasonality.review_counts"], "CityNames", cities, {"Years": [2024]},
+                                key_column="city")
+    return df.groupby("city").reviewcount.sum().to_dict() if not df.empty else {}
+
+
+def test_only_new_keys_are_queried(snapshot_engine, monkeypatch):
+    calls = queried_keys(monkeypatch)
+    assert review_counts(snapshot_engine, ["Paris", "Rome"]) == {"Paris": 4, "Rome": 3}
+    assert review_counts(snapshot_engine, ["Paris", "Rome", "Oslo"]) == {"Paris": 4, "Rome": 3, "Oslo": 1}
+    assert review_counts(snapshot_engine, ["Rome"]) == {"Rome": 3}
+    assert calls == [["Paris", "Rome"], ["Oslo"]]
+
+
+def test_keys_without_rows_are_cached_as_empty(snapshot_engine, monkeypatch):
+    calls = queried_keys(monkeypatch)
+    assert review_counts(snapshot_engine, ["Berlin"]) == {}
+    assert review_counts(snapshot_engine, ["Berlin", "Oslo"]) == {"Oslo": 1}
+    assert calls == [["Berlin"], ["Oslo"]]
+
+
+def test_refresh_requeries_every_key(snapshot_engine, monkeypatch):
+    calls = queried_keys(monkeypatch)
+    review_counts(snapshot_engine, ["Paris", "Rome"])
+    with utils.refreshing_cache():
+        assert review_counts(snapshot_engine, ["Paris", "Rome"]) == {"Paris": 4, "Rome": 3}
+    assert calls == [["Paris", "Rome"], ["Paris", "Rome"]]
@@ -0,0 +1,66 @@
+# ======================================================================================================================
+# import standard library packages
+# ----------------------------------------------------------------------------------------------------------------------
+from types import SimpleNamespace
+from configparser import ConfigParser
+
+# ======================================================================================================================
+# import local packages
+# ----------------------------------------------------------------------------------------------------------------------
+from pages import utils, warmup
+from pages.warmup import WarmupScheduler
+
+
+def scheduler(calls=None, top_n=2):
+    def update_graph(cities, granularity):
+        calls.append((cities, granularity, utils._refresh_cache.get()))
+
+    page = SimpleNamespace(update_graph=update_graph)
+    return WarmupScheduler(lambda name: page, ["hosts"], {"hosts.update_graph": [[["London"], "month"]]},
+                           top_n=top_n)
+
+
+# -- selections --------------------------------------------------------------------------------------------------------
+def test_defaults_then_most_requested_selections():
+    # London is both a default and the most requested selection, it is warmed once
+    warm = scheduler()
+    for args, times in ((["Paris"], 3), (["Rome"], 1), (["Oslo"], 2), (["London"], 5)):
+        for _ in range(times):
+            warm.record("Hosts.update_graph", [args, "month"])
+    warm.record("reviews.update_review_trend", [["Paris"], "month"])
+    assert warm.selections() == [("hosts.update_graph", [["London"], "month"]),
+                                 ("hosts.update_graph", [["Paris"], "month"])]
+
+
+def test_tracked_selections_are_bounded(monkeypatch):
+    monkeypatch.setattr(warmup, "MAX_TRACKED_SELECTIONS", 10)
+    warm = scheduler()
+    warm.record("hosts.update_graph", [["Paris"], "month"])
+    warm.record("hosts.update_graph", [["Paris"], "month"])
+    for i in range(20):
+        warm.record("hosts.update_graph", [[f"city {i}"], "month"])
+    assert len(warm.requests["hosts.update_graph"]) <= 10
+    assert warm.selections()[1] == ("hosts.update_graph", [["Paris"], "month"])
+
+
+def test_defaults_from_config():
+    cfg = ConfigParser()
+    cfg.read_dict({"warmup": {"enabled": "true", "top_n": "3", "hosts.update_graph": '[[["London"], "year"]]'}})
+    warm = WarmupScheduler.from_config(cfg, None, ["hosts"])
+    assert warm.defaults == {"hosts.update_graph": [[["London"], "year"]]}
+    assert warm.top_n == 3
+
+
+# -- runs --------------------------------------------------------------------------------------------------------------
+def test_refresh_runs_bypass_the_cache():
+    calls = []
+    warm = scheduler(calls)
+    assert warm.run()["jobs"] == 1
+    warm.run(refresh=True)
+    assert calls == [(["London"], "month", False), (["London"], "month", True)]
+
+
+def test_failed_callbacks_are_counted():
+    warm = WarmupScheduler(lambda name: SimpleNamespace(update_graph=lambda *args: 1 / 0), ["hosts"],
+                           {"hosts.update_graph": [[["London"], "month"]]})
+    assert warm.run()["failed"] == 1
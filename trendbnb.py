@@ -1,7 +1,19 @@
+# ======================================================================================================================
+# import standard library packages
+# ----------------------------------------------------------------------------------------------------------------------
+import sys
+import importlib
+import contextvars
+import threading
+from argparse import ArgumentParser
+
 # ======================================================================================================================
 # import dash library packages
 # ----------------------------------------------------------------------------------------------------------------------
-from dash import Dash, html, dcc, page_registry, page_container, Input, Output, State, callback
+import dash
+from dash import Dash, html, dcc, page_registry, page_container, register_page, Input, Output, State, callback
+from dash import _callback, _callback_context
+from flask import Response, g, request
 import dash_bootstrap_components as dbc
 import sqlalchemy as sa
 import pandas as pd
@@ -10,7 +22,12 @@ import oracledb
 # ======================================================================================================================
 # import local packages
 # ----------------------------------------------------------------------------------------------------------------------
-from pages.utils import dbc_css
+from pages.utils import (after_fork, cfg, dbc_css, figure_cache, get_cache_stats, get_data_version,
+                         get_figure_cache_stats, get_pool_stats, prepare_fork, result_cache)
+import pages.dimensions  # registers the callbacks filling the dropdown options
+from pages import metrics
+from pages.queries import get_query_info
+from pages.warmup import WarmupScheduler
 
 # ======================================================================================================================
 # import non-standard library packages
@@ -31,10 +48,34 @@ header = dbc.Row([
 
 
 # -- init dash ---------------------------------------------------------------------------------------------------------
+# with lazy pages only the page metadata is registered at startup and each module is imported on its first visit
+# import_page below reaches into private Dash internals (_callback_context.context_value, _callback.GLOBAL_CALLBACK_MAP
+# and GLOBAL_CALLBACK_LIST, app._got_first_request, app._callback_list, app._setup_server), which only the dash release
+# pinned in requirements.txt is known to have; with any other one every page is imported at startup instead
+LAZY_PAGES_DASH = "2.18."
+
+
+def lazy_pages_supported():
+    if dash.__version__.startswith(LAZY_PAGES_DASH):
+        return True
+    print(f"warning: lazy pages need dash {LAZY_PAGES_DASH}x, importing every page at startup with {dash.__version__}")
+    return False
+
+
+lazy_pages = cfg.getboolean("startup", "lazy_pages", fallback=False) and lazy_pages_supported()
+
+if cfg.getboolean("background", "enabled", fallback=False):
+    from pages.jobs import create_background_manager
+    background_callback_manager = create_background_manager(cfg)
+else:
+    background_callback_manager = None
+
 app = Dash(__name__,
            external_stylesheets=[dbc.themes.DARKLY, dbc.icons.BOOTSTRAP, 'assets/styles.css', dbc_css],
            suppress_callback_exceptions=True,
-           use_pages=True)
+           use_pages=True,
+           pages_folder="" if lazy_pages else "pages",
+           background_callback_manager=background_callback_manager)
 
 app.layout = html.Div([
     header,
@@ -42,6 +83,235 @@ app.layout = html.Div([
 ])
 
 
+# -- lazy pages --------------------------------------------------------------------------------------------------------
+from pages.components import TIMED_OUT, page_info  # the theme changer in components needs the app to exist
+
+page_paths = {info["href"]: page_name for page_name, info in page_info.items()}
+_imported_pages = set()
+_page_lock = threading.Lock()
+
+
+def import_page(page_name):
+    module_name = f"pages.{page_name}"
+    with _page_lock:
+        if page_name in _imported_pages:
+            return sys.modules[module_name]
+        # the page is already registered, so skip the module's own register_page call as Dash does for long callbacks
+        context = contextvars.copy_context()
+        context.run(_callback_context.context_value.set, {"ignore_register_page": True})
+        module = context.run(importlib.import_module, module_name)
+        page_registry[module_name]["layout"] = module.layout
+        if app._got_first_request["setup_server"]:
+            # Dash only collects callbacks declared with dash.callback once, when the server is set up
+            for key in list(_callback.GLOBAL_CALLBACK_MAP):
+                app.callback_map[key] = _callback.GLOBAL_CALLBACK_MAP.pop(key)
+            app._callback_list.extend(_callback.GLOBAL_CALLBACK_LIST)
+            _callback.GLOBAL_CALLBACK_LIST.clear()
+        _imported_pages.add(page_name)
+        return module
+
+
+def lazy_layout(page_name):
+    def layout(**kwargs):
+        return import_page(page_name).layout
+    return layout
+
+
+if lazy_pages:
+    for page_name, info in page_info.items():
+        register_page(f"pages.{page_name}", path=info["href"], name=info["page-title"], layout=lazy_layout(page_name))
+
+    @app.server.before_request
+    def import_requested_page():
+        # import before the browser asks for /_dash-dependencies so the page's callbacks are part of it
+        page_name = page_paths.get(request.path)
+        if page_name is not None:
+            import_page(page_name)
+
+
+# -- warm-up -----------------------------------------------------------------------------------------------------------
+warmup = WarmupScheduler.from_config(cfg, import_page, page_info)
+
+
+# -- worker processes --------------------------------------------------------------------------------------------------
+def preload_workers():
+    """Build everything the server workers share before they are forked, so none of them pays for it again."""
+    if lazy_pages:
+        for page_name in page_info:
+            import_page(page_name)
+    # Dash sets the server up on the first request, a worker's concurrent first requests would race on it
+    with app.server.test_request_context():
+        app._setup_server()
+    pages.dimensions.dimensions.preload()
+    if cfg.getboolean("warmup", "enabled", fallback=False):
+        print(f"warm-up before forking workers: {warmup.run()}")
+    prepare_fork()
+
+
+def start_worker():
+    after_fork()
+    if cfg.getboolean("warmup", "enabled", fallback=False):
+        # without the disk cache the workers share no results, so each one refreshes its own
+        lock_path = result_cache.disk_dir/"warmup.lock" if result_cache.disk_dir is not None else None
+        warmup.start(initial=False, lock_path=lock_path)
+
+
+# -- monitoring --------------------------------------------------------------------------------------------------------
+@app.server.route("/stats/pool")
+def pool_stats():
+    return get_pool_stats()
+
+
+@app.server.route("/stats/cache")
+def cache_stats():
+    return {**get_cache_stats(), "figures": get_figure_cache_stats()}
+
+
+@app.server.route("/stats/queries")
+def query_stats():
+    return get_query_info()
+
+
+@app.server.route("/stats/warmup")
+def warmup_stats():
+    return {"last_run": warmup.last_run, "selections": len(warmup.selections())}
+
+
+metrics.register_gauges("trendbnb_pool", get_pool_stats)
+metrics.register_gauges("trendbnb_cache", get_cache_stats)
+metrics.register_gauges("trendbnb_figure_cache", get_figure_cache_stats)
+callback_path = f"{app.config.routes_pathname_prefix}_dash-update-component"
+
+
+def selection(body):
+    # a button's click count only triggers the callback, the same selection searched again draws the same figure
+    return [None if item.get("property") == "n_clicks" else item.get("value")
+            for item in body.get("inputs", []) + body.get("state", [])]
+
+
+@app.server.before_request
+def start_callback_timer():
+    if request.path == callback_path:
+        body = request.get_json(silent=True) or {}
+        callback = app.callback_map.get(body.get("output"))
+        label = metrics.callback_label(callback["callback"]) if callback else "unknown"
+        g.callback_token = metrics.start_callback(label)
+        # the polls for a background callback's result repeat the request, only the one starting the job is a visit
+        if "cacheKey" not in request.args and "job" not in request.args:
+            warmup.record(label, selection(body))
+
+
+# -- figure cache ------------------------------------------------------------------------------------------------------
+def figure_outputs(body):
+    outputs = body.get("outputs", [])
+    outputs = outputs if isinstance(outputs, list) else [outputs]
+    return bool(outputs) and all(isinstance(o, dict) and o.get("property") == "figure" for o in outputs)
+
+
+def cached_response(body, etag):
+    # dash-renderer never sends If-None-Match, so only other clients ever receive the 304
+    if etag in request.if_none_match:
+        figure_cache.count("not_modified")
+        response = Response(status=304)
+    else:
+        response = Response(body, mimetype="application/json")
+    response.set_etag(etag)
+    return response
+
+
+@app.server.before_request
+def serve_cached_figure():
+    if not figure_cache.enabled or request.path != callback_path:
+        return None
+    body = request.get_json(silent=True) or {}
+    if not figure_outputs(body):
+        return None
+    key = figure_cache.key(body.get("output"), selection(body), get_data_version())
+    entry = figure_cache.get(key)
+    if entry is None:
+        g.figure_key = key
+        return None
+    # the callback does not run, so the request is left out of its latency and figure build time
+    token = g.pop("callback_token", None)
+    if token is not None:
+        metrics.discard_callback(token)
+    return cached_response(*entry)
+
+
+def final_figure(body):
+    # a background callback first answers with its job and then with polls until the result is ready, and a figure
+    # standing in for a timed out callback must be retried on the next request
+    return b'"response"' in body and TIMED_OUT.encode() not in body
+
+
+@app.server.after_request
+def store_figure(response):
+    key = g.pop("figure_key", None)
+    if key is not None and response.status_code == 200 and final_figure(response.get_data()):
+        body = response.get_data()
+        etag = figure_cache.etag(body)
+        figure_cache.put(key, body, etag)
+        if etag in request.if_none_match:
+            return cached_response(body, etag)
+        response.set_etag(etag)
+    return response
+
+
+@app.server.after_request
+def record_callback(response):
+    token = g.pop("callback_token", None)
+    if token is not None:
+        metrics.finish_callback(token, response.content_length)
+    return response
+
+
+@app.server.route("/metrics")
+def prometheus_metrics():
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+
+def parse_args():
+    parser = ArgumentParser(prog="trendbnb")
+    commands = parser.add_subparsers(dest="command")
+    run_parser = commands.add_parser("run", help="start the dashboard (default)")
+    run_parser.add_argument("--host", default="0.0.0.0")
+    run_parser.add_argument("--port", default=8060, type=int)
+    serve_parser = commands.add_parser("serve", help="start the dashboard with several worker processes")
+    serve_parser.add_argument("--workers", type=int, help="worker processes (default: [server] workers)")
+    serve_parser.add_argument("--bind", help="host:port to listen on (default: [server] bind)")
+    rollup_parser = commands.add_parser("rollup-build", help="materialize the aggregate tables read by the pages")
+    rollup_parser.add_argument("names", nargs="*", help="rollups to rebuild (default: all)")
+    snapshot_parser = commands.add_parser("snapshot-export", help="copy the Oracle tables into a Parquet snapshot")
+    snapshot_parser.add_argument("tables", nargs="*", help="tables to export (default: all)")
+    migrate_parser = commands.add_parser("migrate", help="create the indexes behind the page queries")
+    migrate_parser.add_argument("--dry-run", action="store_true", help="list the pending migrations only")
+    migrate_parser.add_argument("--no-timings", action="store_true", help="skip timing the page queries")
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
     debug_mode = True   
-    app.run(host="0.0.0.0", port=8060, debug=False)
+    args = parse_args()
+    if args.command == "rollup-build":
+        from pages.utils import engine
+        from pages.rollups import build_rollups
+        build_rollups(engine, args.names or None)
+    elif args.command == "snapshot-export":
+        from pages.utils import cfg, create_oracle_engine
+        from pages.snapshot import export_snapshot, snapshot_dir
+        export_snapshot(create_oracle_engine(cfg), snapshot_dir(cfg), args.tables or None)
+    elif args.command == "migrate":
+        from pages.utils import engine
+        from pages.migrations import migrate
+        migrate(engine, dry_run=args.dry_run, timings=not args.no_timings)
+    elif args.command == "serve":
+        from pages.server import PreloadedServer, get_server_options
+        options = get_server_options(cfg, args.workers, args.bind)
+        PreloadedServer(app.server, options, preload=preload_workers, post_fork=start_worker).run()
+    else:
+        if background_callback_manager is not None:
+            print("warning: background callbacks fork jobs from the threaded development server and may hang, "
+                  "use serve or set [background] enabled = false")
+        if cfg.getboolean("warmup", "enabled", fallback=False):
+            warmup.start()
+        app.run(host=getattr(args, "host", "0.0.0.0"), port=getattr(args, "port", 8060), debug=False)